@@ -0,0 +1,851 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  cache_store
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from collections import OrderedDict
+
+
+
+# --- CACHE STORE : Jedna SQLite databáze  ( WAL )  pro všechny cache doplňku
+# --- Jmenné prostory  ( 'plugin', 'trakt', 'csfd' ... ),  hodnota jako JSON, čas uložení a volitelná expirace.
+# --- TTL lze určit při uložení  ( expires )  i při čtení  ( max_age ),  podle toho, jak to dělal původní modul.
+
+STORE_FILE = 'cache.db'
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS cache ("
+    " namespace TEXT NOT NULL,"
+    " key TEXT NOT NULL,"
+    " value BLOB NOT NULL,"
+    " created REAL NOT NULL,"
+    " expires REAL,"
+    " PRIMARY KEY (namespace, key)"
+    ") WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)",
+    "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+)
+
+# --- CACHE STORE : Formát hodnoty  ( BLOB )  =  hlavička  [ verze, kódování ]  +  tělo
+# --- 'J' = minifikovaný JSON v UTF-8,  'Z' = totéž přes zlib  ( jen od COMPRESS_MIN_BYTES a když se to vyplatí )
+# --- Starší řádky uložené jako TEXT  ( čistý JSON )  se čtou dál beze změny.
+
+FORMAT_VERSION = 1
+_HEADER_JSON = bytes([FORMAT_VERSION]) + b'J'
+_HEADER_ZLIB = bytes([FORMAT_VERSION]) + b'Z'
+COMPRESS_MIN_BYTES = 2048
+COMPRESS_LEVEL = 6
+
+MEMORY_MAX_ENTRIES = 512             # --- Paměťová vrstva : nejvýš položek
+MEMORY_MAX_BYTES = 8 * 1024 * 1024    # --- Paměťová vrstva : nejvýš bajtů serializovaných hodnot
+MEMORY_TTL = 300                      # --- Sekundy, po které paměť věří položce bez dotazu na disk  ( jiný proces ji mohl změnit )
+
+# --- CACHE STORE : Úklid  ( GC )  -  limity počtu záznamů a bajtů pro každý jmenný prostor
+# --- Nejdřív se mažou prošlé záznamy, pak nejstarší zápisy, dokud jmenný prostor neklesne pod  GC_LOW_WATERMARK  limitu.
+
+NAMESPACE_BUDGETS = {
+    'plugin': (4000, 32 * 1024 * 1024),
+    'trakt': (8000, 32 * 1024 * 1024),
+    'trakt_ids': (20000, 4 * 1024 * 1024),
+    'csfd': (4000, 16 * 1024 * 1024),
+    'streams': (2000, 4 * 1024 * 1024),
+    'validators': (20000, 4 * 1024 * 1024),
+}
+DEFAULT_BUDGET = (5000, 16 * 1024 * 1024)
+GC_LOW_WATERMARK = 0.9          # --- Po překročení limitu se uklízí na 90 %, aby se GC nespouštěl po každém zápisu
+GC_BATCH = 200                  # --- Záznamů smazaných v jedné transakci
+GC_EXPIRED_GRACE = 24 * 3600    # --- Prošlé záznamy se drží ještě den, aby šly obnovit podmíněným dotazem  ( 304 )
+GC_INTERVAL = 6 * 3600          # --- Sekundy mezi automatickými běhy
+GC_STEP_SECONDS = 1.0           # --- Časový strop jednoho automatického běhu, zbytek dořeší další běh
+
+# --- CACHE STORE : HTTP validátory  ( ETag / Last-Modified )  k záznamům cache, jmenný prostor  VALIDATORS_NAMESPACE,
+# --- klíč  '<jmenný prostor>:<klíč>'.  Platí jen pro záznam uložený po nich  ( jinak by 304 potvrdila starší data )
+
+VALIDATORS_NAMESPACE = 'validators'
+
+# --- CACHE STORE : Statistiky  ( zásahy, minutí, prošlá data, vyřazení, latence načtení / uložení )
+# --- Počítají se v paměti procesu, flush_stats je přičte do tabulky meta  ( jeden záznam na den, drží se STATS_DAYS dní )
+# --- Skupina = jmenný prostor, jen 'plugin' se dělí podle prefixu klíče  ( prázdný prefix = zbytek )
+# --- stale_hits  =  minutí  ( prošlý záznam ),  která se přesto obsloužila z cache a obnovila na pozadí
+
+STATS_GROUPS = {
+    'plugin': (('most_watched_', 'most_watched'), ('search_', 'search'), ('', 'tmdb')),
+}
+STATS_EVENTS = ('hits', 'misses', 'stale_hits', 'evictions')     # --- Prošlý záznam vrácený volajícímu = 'misses' + 'stale_hits'
+STATS_DAYS = 7
+STATS_SAMPLES = 500     # --- Nejvýš vzorků latence na skupinu a den  ( drží se nejnovější )
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+
+
+def encode_value(data, compress=True):
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if compress and len(raw) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(raw, COMPRESS_LEVEL)
+        if len(packed) < len(raw):
+            return _HEADER_ZLIB + packed
+    return _HEADER_JSON + raw
+
+
+
+def decode_value(value):
+
+    """
+    CACHE STORE :: DECODE
+    -- Hodnota z databáze  ->  data.  TEXT = starý čistý JSON, BLOB = hlavička formátu.  Chyba = ValueError.
+    """
+
+    if isinstance(value, str):
+        return json.loads(value)
+    header, body = bytes(value[:2]), value[2:]
+    if header == _HEADER_JSON:
+        return json.loads(bytes(body).decode('utf-8'))
+    if header == _HEADER_ZLIB:
+        try:
+            return json.loads(zlib.decompress(body).decode('utf-8'))
+        except zlib.error as e:
+            raise ValueError(str(e))
+    raise ValueError(f"neznámý formát cache {header!r}")
+
+
+
+
+def stats_group(namespace, key):
+    for prefix, group in STATS_GROUPS.get(namespace, ()):
+        if key.startswith(prefix):
+            return group
+    return namespace
+
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+
+class CacheStats:
+
+    """
+    CACHE STORE :: STATS
+    -- Čítače a vzorky latence  ( ms )  za skupinu od posledního  drain().  Bezpečné pro více vláken.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._groups = {}
+
+
+    def _group(self, group):
+        entry = self._groups.get(group)
+        if entry is None:
+            entry = self._groups[group] = dict({event: 0 for event in STATS_EVENTS}, load=[], save=[])
+        return entry
+
+
+    def record(self, group, event, count=1):
+        with self._lock:
+            self._group(group)[event] += count
+
+
+    def timing(self, group, kind, seconds):
+        with self._lock:
+            samples = self._group(group)[kind]
+            samples.append(round(seconds * 1000, 3))
+            if len(samples) > STATS_SAMPLES:
+                del samples[0]
+
+
+    def drain(self):
+        with self._lock:
+            groups, self._groups = self._groups, {}
+        return groups
+
+
+    def snapshot(self):
+        # --- Kopie dosud neuložených čítačů bez vyprázdnění  ( report )
+        with self._lock:
+            return {group: {name: list(value) if isinstance(value, list) else value for name, value in values.items()} for group, values in self._groups.items()}
+
+
+
+
+class MemoryTier:
+
+    """
+    CACHE STORE :: MEMORY TIER
+    -- LRU v paměti procesu před SQLite.  Drží serializovanou hodnotu  ( každý zásah dostane vlastní kopii
+    -- a velikost je přesná ),  vyřazuje nejdéle nepoužité položky podle počtu i součtu bajtů.
+    -- Platnost = kratší z expirace záznamu a  MEMORY_TTL.  Přežije mezi voláními, pokud Kodi znovu použije interpret.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES, max_bytes=MEMORY_MAX_BYTES, ttl=MEMORY_TTL):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[3] <= time.time():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return item
+
+
+    def put(self, key, value, created, expires):
+        if len(value) > self.max_bytes // 4:
+            self.discard(key)
+            return
+        valid_until = time.time() + self.ttl
+        if expires is not None:
+            valid_until = min(valid_until, expires)
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (value, created, expires, valid_until)
+            self.size += len(value)
+            while self._items and (len(self._items) > self.max_entries or self.size > self.max_bytes):
+                self._remove(next(iter(self._items)))
+
+
+    def _remove(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+
+    def discard(self, key):
+        with self._lock:
+            self._remove(key)
+
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                self._remove(key)
+
+
+
+
+class CacheStore:
+
+    """
+    CACHE STORE :: SQLITE
+    -- Jedno spojení na proces sdílené mezi vlákny  ( zámek ),  mezi procesy Kodi  ( plugin, služba )
+    -- se stará WAL a busy timeout.  Chyby databáze se neposílají dál, cache se pak chová jako prázdná.
+    """
+
+    def __init__(self, path, compress=True):
+        self.path = path
+        self.compress = compress
+        self.memory = MemoryTier()
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            return self._conn.execute(sql, args).fetchall()
+
+
+    def get_entry(self, namespace, key):
+
+        """
+        CACHE STORE :: RAW ENTRY
+        -- { 'timestamp', 'expires', 'data' }  bez ohledu na TTL, nebo None.
+        """
+
+        start = time.perf_counter()
+        item = self.memory.get((namespace, key))
+        if item is None:
+            try:
+                rows = self._execute('SELECT value, created, expires FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+            except sqlite3.Error:
+                return None
+            if not rows:
+                return None
+            item = rows[0]
+            self.memory.put((namespace, key), *item)
+        value, created, expires = item[:3]
+        try:
+            entry = {'timestamp': created, 'expires': expires, 'data': decode_value(value)}
+        except ValueError:
+            self.delete(namespace, key)
+            return None
+        self.stats.timing(stats_group(namespace, key), 'load', time.perf_counter() - start)
+        return entry
+
+
+    def get(self, namespace, key, max_age=None):
+        entry = self.get_entry(namespace, key)
+        now = time.time()
+        if entry is None or (entry['expires'] is not None and entry['expires'] <= now) or (max_age is not None and now - entry['timestamp'] >= max_age):
+            self.stats.record(stats_group(namespace, key), 'misses')
+            return None
+        self.stats.record(stats_group(namespace, key), 'hits')
+        return entry['data']
+
+
+    def exists(self, namespace, key, max_age=None):
+        # --- Jen zda záznam je  ( a není starší než max_age ),  bez dekódování hodnoty a bez statistik
+        item = self.memory.get((namespace, key))
+        if item is None:
+            try:
+                rows = self._execute('SELECT created FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+            except sqlite3.Error:
+                return False
+            if not rows:
+                return False
+            created = rows[0][0]
+        else:
+            created = item[1]
+        return max_age is None or time.time() - created < max_age
+
+
+    def record(self, namespace, key, event):
+        # --- Pro volající, kteří čtou přes get_entry a o čerstvosti rozhodují sami  ( hits / misses / stale_hits )
+        self.stats.record(stats_group(namespace, key), event)
+
+
+    def set(self, namespace, key, data, ttl=None, created=None):
+        start = time.perf_counter()
+        created = time.time() if created is None else created
+        expires = created + ttl if ttl is not None else None
+        value = encode_value(data, self.compress)
+        try:
+            self._execute('INSERT OR REPLACE INTO cache (namespace, key, value, created, expires) VALUES (?, ?, ?, ?, ?)',
+                          (namespace, key, value, created, expires))
+        except sqlite3.Error:
+            self.memory.discard((namespace, key))
+            return False
+        self.memory.put((namespace, key), value, created, expires)
+        self.stats.timing(stats_group(namespace, key), 'save', time.perf_counter() - start)
+        return True
+
+
+    def touch(self, namespace, key):
+
+        """
+        CACHE STORE :: TOUCH
+        -- Záznam platí znovu od teď  ( created = teď, expires posunuto o původní délku platnosti ),  hodnota se nepřepisuje.
+        """
+
+        now = time.time()
+        self.memory.discard((namespace, key))
+        try:
+            with self._lock:
+                return self._conn.execute('UPDATE cache SET expires = CASE WHEN expires IS NULL THEN NULL ELSE ? + (expires - created) END, created = ?'
+                                          ' WHERE namespace = ? AND key = ?', (now, now, namespace, key)).rowcount > 0
+        except sqlite3.Error:
+            return False
+
+
+    def validators(self, namespace, key):
+
+        """
+        CACHE STORE :: VALIDATORS
+        -- ( záznam, hlavičky If-None-Match / If-Modified-Since )  pro podmíněnou obnovu,  nebo  ( záznam, {} ).
+        -- Záznam se vrací bez ohledu na TTL, aby šlo po odpovědi 304 použít jeho data.
+        """
+
+        entry = self.get_entry(namespace, key)
+        if entry is None:
+            return None, {}
+        saved = self.get(VALIDATORS_NAMESPACE, f"{namespace}:{key}")
+        if not saved or saved.get('saved', 0) > entry['timestamp']:
+            return entry, {}
+        headers = {}
+        if saved.get('etag'):
+            headers['If-None-Match'] = saved['etag']
+        if saved.get('last_modified'):
+            headers['If-Modified-Since'] = saved['last_modified']
+        return entry, headers
+
+
+    def save_validators(self, namespace, key, etag=None, last_modified=None):
+        if etag or last_modified:
+            self.set(VALIDATORS_NAMESPACE, f"{namespace}:{key}", {'etag': etag, 'last_modified': last_modified, 'saved': time.time()})
+        else:
+            self.delete(VALIDATORS_NAMESPACE, f"{namespace}:{key}")
+
+
+    def delete(self, namespace, key):
+        self.memory.discard((namespace, key))
+        try:
+            self._execute('DELETE FROM cache WHERE namespace = ? AND key = ?', (namespace, key))
+        except sqlite3.Error:
+            pass
+
+
+    def delete_prefix(self, namespace, prefix):
+        self.memory.discard_where(lambda k: k[0] == namespace and k[1].startswith(prefix))
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        try:
+            self._execute("DELETE FROM cache WHERE namespace = ? AND key LIKE ? ESCAPE '\\'", (namespace, escaped + '%'))
+            return True
+        except sqlite3.Error:
+            return False
+
+
+    def keys(self, namespace, prefix=''):
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        try:
+            return [row[0] for row in self._execute("SELECT key FROM cache WHERE namespace = ? AND key LIKE ? ESCAPE '\\'", (namespace, escaped + '%'))]
+        except sqlite3.Error:
+            return []
+
+
+    def clear(self, namespace=None):
+        self.memory.discard_where(lambda k: namespace is None or k[0] == namespace)
+        try:
+            if namespace is None:
+                self._execute('DELETE FROM cache')
+            else:
+                self._execute('DELETE FROM cache WHERE namespace = ?', (namespace,))
+        except sqlite3.Error:
+            pass
+
+
+    def purge_expired(self):
+        try:
+            with self._lock:
+                return self._conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (time.time(),)).rowcount
+        except sqlite3.Error:
+            return 0
+
+
+    def usage(self):
+
+        """
+        CACHE STORE :: USAGE
+        -- { jmenný prostor : ( záznamů, bajtů ) }.  Bajty = délka klíče a uložené hodnoty.
+        """
+
+        try:
+            rows = self._execute('SELECT namespace, COUNT(*), SUM(LENGTH(key) + LENGTH(value)) FROM cache GROUP BY namespace')
+        except sqlite3.Error:
+            return {}
+        return {namespace: (count, size or 0) for namespace, count, size in rows}
+
+
+    def _delete_rows(self, namespace, rows, reclaimed):
+        # --- rows :  [ ( klíč, bajty ) ].  Jedna transakce, výsledek se přičte do  reclaimed[namespace]
+        if not rows:
+            return
+        try:
+            with self._lock:
+                self._conn.execute('BEGIN')
+                self._conn.executemany('DELETE FROM cache WHERE namespace = ? AND key = ?', [(namespace, key) for key, _ in rows])
+                self._conn.execute('COMMIT')
+        except sqlite3.Error:
+            try:
+                self._conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            return
+        for key, _ in rows:
+            self.memory.discard((namespace, key))
+            self.stats.record(stats_group(namespace, key), 'evictions')
+        total = reclaimed.setdefault(namespace, [0, 0])
+        total[0] += len(rows)
+        total[1] += sum(size for _, size in rows)
+
+
+    def collect_garbage(self, budgets=None, deadline=None):
+
+        """
+        CACHE STORE :: GARBAGE COLLECTOR
+        -- Prošlé záznamy ven, pak nejstarší zápisy z jmenných prostorů nad limitem  ( budgets / NAMESPACE_BUDGETS ).
+        -- Maže po dávkách  GC_BATCH,  s  deadline  ( time.time() )  skončí dřív a pokračuje se příště.
+        -- Vrátí  { jmenný prostor : [ smazaných záznamů, uvolněných bajtů ] }.
+        """
+
+        budgets = NAMESPACE_BUDGETS if budgets is None else budgets
+        reclaimed = {}
+
+        def _out_of_time():
+            return deadline is not None and time.time() >= deadline
+
+        # --- GC : Prošlé záznamy
+        while not _out_of_time():
+            try:
+                rows = self._execute('SELECT namespace, key, LENGTH(key) + LENGTH(value) FROM cache WHERE expires IS NOT NULL AND expires <= ? LIMIT ?',
+                                     (time.time() - GC_EXPIRED_GRACE, GC_BATCH))
+            except sqlite3.Error:
+                rows = []
+            if not rows:
+                break
+            by_namespace = {}
+            for namespace, key, size in rows:
+                by_namespace.setdefault(namespace, []).append((key, size))
+            for namespace, items in by_namespace.items():
+                self._delete_rows(namespace, items, reclaimed)
+
+        # --- GC : Limity  ( nejstarší zápis první )
+        for namespace, (count, size) in self.usage().items():
+            max_entries, max_bytes = budgets.get(namespace, DEFAULT_BUDGET)
+            if count <= max_entries and size <= max_bytes:
+                continue
+            excess_entries = count - int(max_entries * GC_LOW_WATERMARK)
+            excess_bytes = size - int(max_bytes * GC_LOW_WATERMARK)
+            while (excess_entries > 0 or excess_bytes > 0) and not _out_of_time():
+                try:
+                    rows = self._execute('SELECT key, LENGTH(key) + LENGTH(value) FROM cache WHERE namespace = ? ORDER BY created LIMIT ?',
+                                         (namespace, GC_BATCH))
+                except sqlite3.Error:
+                    break
+                victims = []
+                for key, item_size in rows:
+                    if excess_entries <= 0 and excess_bytes <= 0:
+                        break
+                    victims.append((key, item_size))
+                    excess_entries -= 1
+                    excess_bytes -= item_size
+                if not victims:
+                    break
+                self._delete_rows(namespace, victims, reclaimed)
+
+        return reclaimed
+
+
+    def file_size(self):
+        size = 0
+        for suffix in ('', '-wal'):
+            try:
+                size += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return size
+
+
+    def vacuum(self):
+        # --- Vrátí uvolněné stránky databáze systému  ( po velkém úklidu, jen na vyžádání - přepisuje celý soubor )
+        try:
+            with self._lock:
+                self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+                self._conn.execute('VACUUM')
+                self._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            return True
+        except sqlite3.Error:
+            return False
+
+
+    def flush_stats(self):
+
+        """
+        CACHE STORE :: FLUSH STATS
+        -- Přičte statistiky procesu do dnešního záznamu  'stats:RRRR-MM-DD'  v tabulce meta  ( jedna transakce,
+        -- souběžné procesy Kodi se nepřepíšou )  a smaže dny starší než  STATS_DAYS.
+        """
+
+        groups = self.stats.drain()
+        if not groups:
+            return
+        name = 'stats:' + time.strftime('%Y-%m-%d')
+        oldest = 'stats:' + time.strftime('%Y-%m-%d', time.localtime(time.time() - STATS_DAYS * 86400))
+        try:
+            with self._lock:
+                self._conn.execute('BEGIN IMMEDIATE')
+                rows = self._conn.execute('SELECT value FROM meta WHERE name = ?', (name,)).fetchall()
+                try:
+                    day = json.loads(rows[0][0]) if rows else {}
+                except ValueError:
+                    day = {}
+                for group, values in groups.items():
+                    target = day.setdefault(group, {})
+                    for event in STATS_EVENTS:
+                        target[event] = target.get(event, 0) + values[event]
+                    for kind in ('load', 'save'):
+                        target[kind] = (target.get(kind, []) + values[kind])[-STATS_SAMPLES:]
+                self._conn.execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, json.dumps(day, separators=(',', ':'))))
+                self._conn.execute("DELETE FROM meta WHERE name LIKE 'stats:%' AND name < ?", (oldest,))
+                self._conn.execute('COMMIT')
+        except sqlite3.Error:
+            try:
+                self._conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+
+
+    def load_stats(self):
+
+        """
+        CACHE STORE :: STATS REPORT
+        -- Souhrn za posledních  STATS_DAYS  dní  ( včetně neuložených čítačů procesu )  po skupinách :
+        -- { skupina : { hits, misses, stale_hits, evictions, entries, bytes, load_p50, load_p95, save_p50, save_p95 } }
+        """
+
+        days = []
+        try:
+            days = [json.loads(value) for value, in self._execute("SELECT value FROM meta WHERE name LIKE 'stats:%'")]
+        except (sqlite3.Error, ValueError):
+            pass
+        days.append(self.stats.snapshot())
+
+        report = {}
+        samples = {}
+        for day in days:
+            for group, values in day.items():
+                target = report.setdefault(group, dict({event: 0 for event in STATS_EVENTS}, entries=0, bytes=0))
+                for event in STATS_EVENTS:
+                    target[event] += values.get(event, 0)
+                for kind in ('load', 'save'):
+                    samples.setdefault((group, kind), []).extend(values.get(kind, []))
+
+        try:
+            rows = self._execute('SELECT namespace, key, LENGTH(key) + LENGTH(value) FROM cache')
+        except sqlite3.Error:
+            rows = []
+        for namespace, key, size in rows:
+            target = report.setdefault(stats_group(namespace, key), dict({event: 0 for event in STATS_EVENTS}, entries=0, bytes=0))
+            target['entries'] += 1
+            target['bytes'] += size
+
+        for group, target in report.items():
+            for kind in ('load', 'save'):
+                values = samples.get((group, kind), [])
+                target[f'{kind}_p50'] = _percentile(values, 50)
+                target[f'{kind}_p95'] = _percentile(values, 95)
+        return report
+
+
+    def get_meta(self, name):
+        try:
+            rows = self._execute('SELECT value FROM meta WHERE name = ?', (name,))
+        except sqlite3.Error:
+            return None
+        return rows[0][0] if rows else None
+
+
+    def set_meta(self, name, value):
+        try:
+            self._execute('INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)', (name, str(value)))
+        except sqlite3.Error:
+            pass
+
+
+    def import_entries(self, namespace, entries):
+
+        """
+        CACHE STORE :: BULK IMPORT
+        -- entries :  ( key, data, created, expires )  v jedné transakci  ( převod starých JSON cache )
+        """
+
+        rows = [(namespace, key, encode_value(data, self.compress), created, expires) for key, data, created, expires in entries]
+        if not rows:
+            return 0
+        try:
+            with self._lock:
+                self._conn.execute('BEGIN')
+                self._conn.executemany('INSERT OR REPLACE INTO cache (namespace, key, value, created, expires) VALUES (?, ?, ?, ?, ?)', rows)
+                self._conn.execute('COMMIT')
+            self.memory.discard_where(lambda k: k[0] == namespace)
+            return len(rows)
+        except sqlite3.Error:
+            try:
+                self._conn.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+            return 0
+
+
+
+def open_store(path, compress=True):
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            directory = os.path.dirname(path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory, exist_ok=True)
+            store = _stores[path] = CacheStore(path, compress)
+        return store
+
+
+
+def get_store():
+
+    """
+    CACHE STORE :: ADDON STORE
+    -- Databáze v profilu doplňku.  Vždy lokální disk : SQLite ve WAL režimu nesmí ležet na síťové složce.
+    """
+
+    import xbmcaddon
+    import xbmcvfs
+
+    addon = xbmcaddon.Addon()
+    profile = xbmcvfs.translatePath(addon.getAddonInfo('profile'))
+    return open_store(os.path.join(profile, STORE_FILE), addon.getSetting('cache_compress') != 'false')
+
+
+
+def maybe_collect_garbage(store, interval=GC_INTERVAL, step_seconds=GC_STEP_SECONDS):
+
+    """
+    CACHE STORE :: INCREMENTAL GC
+    -- Nejvýš jednou za  interval  sekund  ( značka v tabulce meta, platí pro všechny procesy )
+    -- krátký úklid omezený na  step_seconds.  Vrátí výsledek  collect_garbage,  nebo None, když ještě není čas.
+    """
+
+    try:
+        last_run = float(store.get_meta('gc:last') or 0)
+    except ValueError:
+        last_run = 0
+    now = time.time()
+    if now - last_run < interval:
+        return None
+    store.set_meta('gc:last', now)
+    return store.collect_garbage(deadline=now + step_seconds)
+
+
+
+def migrate_json_dir(store, namespace, directory, convert):
+
+    """
+    CACHE STORE :: LEGACY IMPORT
+    -- Jednorázově převede staré  <klíč>.json  soubory z adresáře do jmenného prostoru.
+    -- convert(obsah) -> ( data, created, expires )  nebo None pro soubory, které cache nejsou.
+    -- Staré soubory zůstávají na místě  ( sdílená složka mohla patřit i jiným zařízením )
+    """
+
+    import xbmcvfs
+
+    marker = f"migrated:{namespace}:{directory}"
+    if not directory or store.get_meta(marker):
+        return 0
+
+    entries = []
+    try:
+        _, files = xbmcvfs.listdir(directory)
+    except Exception:
+        files = []
+    for name in files:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with xbmcvfs.File(os.path.join(directory, name), 'r') as f:
+                content = f.read()
+            converted = convert(json.loads(content)) if content else None
+        except Exception:
+            converted = None
+        if converted:
+            entries.append((name[:-5],) + tuple(converted))
+
+    imported = store.import_entries(namespace, entries)
+    store.set_meta(marker, time.time())
+    return imported
+
+
+
+
+if __name__ == "__main__":
+
+    # --- BENCHMARK : python -m resources.lib.cache_store [počet klíčů] [payload.json ...]
+    # --- 1. Uložení + načtení  N  klíčů : JSON soubor na klíč  ( původní cache )  vs. SQLite store.
+    # --- 2. Velikost a čas načtení jednoho záznamu : indent=2 JSON  vs.  minifikovaný  vs.  zlib.
+    # ---    Bez souborů se použijí syntetické payloady ve tvaru sezóny TMDB a výpisu Trakt  extended=full,images.
+
+    import sys
+    import shutil
+    import tempfile
+
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    payload = {'results': [{'id': i, 'title': f'Titul {i}', 'overview': 'x' * 200} for i in range(20)], 'page': 1}
+    workdir = tempfile.mkdtemp()
+
+    def _legacy_save(key):
+        with open(os.path.join(workdir, f"{key}.json"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'timestamp': time.time(), 'data': payload}, ensure_ascii=False, indent=2))
+
+    def _legacy_load(key):
+        path = os.path.join(workdir, f"{key}.json")
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.loads(f.read())
+            if time.time() - data.get('timestamp', 0) < 3600:
+                return data.get('data')
+        return None
+
+    def _bench(func, rounds=total):
+        start = time.perf_counter()
+        for i in range(rounds):
+            func(f"key_{i}")
+        return (time.perf_counter() - start) / rounds * 1000000
+
+    try:
+        store = open_store(os.path.join(workdir, STORE_FILE))
+        print(f"{total} klíčů, čas na klíč")
+        print(f"    JSON soubory   uložení : {_bench(_legacy_save):8.1f} µs   načtení : {_bench(_legacy_load):8.1f} µs")
+        print(f"    SQLite store   uložení : {_bench(lambda k: store.set('bench', k, payload, ttl=3600)):8.1f} µs   načtení : {_bench(lambda k: store.get('bench', k)):8.1f} µs  ( paměťová vrstva )")
+        store.memory = MemoryTier(max_entries=0)
+        print(f"    SQLite store   načtení bez paměťové vrstvy : {_bench(lambda k: store.get('bench', k)):8.1f} µs")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    samples = {}
+    for path in sys.argv[2:]:
+        with open(path, encoding='utf-8') as f:
+            samples[os.path.basename(path)] = json.load(f)
+    if not samples:
+        samples['tmdb sezóna'] = {'id': 1, 'name': 'Řada 1', 'episodes': [{
+            'id': 1000 + i, 'episode_number': i, 'name': f'Epizoda {i}', 'air_date': '2024-01-01', 'runtime': 45,
+            'overview': 'Příběh pokračuje, když se hrdinové vydají na další cestu plnou nebezpečí. ' * 4,
+            'still_path': f'/still{i}.jpg', 'vote_average': 7.8, 'vote_count': 120,
+            'crew': [{'job': 'Director', 'name': f'Režisér {i}', 'id': i}] * 3,
+            'guest_stars': [{'character': f'Postava {j}', 'name': f'Herec {j}', 'id': j, 'profile_path': f'/p{j}.jpg'} for j in range(8)]
+        } for i in range(1, 21)]}
+        samples['trakt výpis'] = [{'rank': i, 'watchers': 100 - i, 'movie': {
+            'title': f'Film {i}', 'year': 2020 + i % 5, 'ids': {'trakt': i, 'slug': f'film-{i}', 'imdb': f'tt{i:07d}', 'tmdb': 5000 + i},
+            'tagline': 'Nic není tak, jak se zdá.', 'overview': 'Dlouhý popis filmu s diakritikou – žluťoučký kůň. ' * 5,
+            'released': '2024-05-01', 'runtime': 120, 'country': 'cz', 'trailer': None, 'homepage': None, 'status': 'released',
+            'rating': 7.1, 'votes': 1000, 'comment_count': 3, 'language': 'cs', 'genres': ['drama', 'thriller'],
+            'images': {k: [f'walter-r2.trakt.tv/images/movies/{i}/{k}.jpg'] for k in ('fanart', 'poster', 'logo', 'clearart', 'banner', 'thumb')}
+        }} for i in range(100)]
+
+    rounds = 200
+    print(f"\nZáznam cache, velikost a čas načtení  ( průměr z {rounds} )")
+    for name, data in samples.items():
+        pretty = json.dumps({'timestamp': time.time(), 'data': data}, ensure_ascii=False, indent=2).encode('utf-8')
+        plain = encode_value(data, compress=False)
+        packed = encode_value(data, compress=True)
+        print(f"  {name}")
+        for label, blob, loader in (('indent=2 JSON', pretty, lambda b: json.loads(b.decode('utf-8'))),
+                                    ('minifikovaný', plain, decode_value),
+                                    ('zlib', packed, decode_value)):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                loader(blob)
+            elapsed = (time.perf_counter() - start) / rounds * 1000000
+            print(f"    {label:14s} : {len(blob):9,d} B   načtení {elapsed:8.1f} µs")
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  cards
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import re
+import html as html_lib
+
+from collections import namedtuple
+
+
+
+
+# --- CARDS : Kompaktní záznam jedné karty výsledku  ( a.video--link )
+
+VideoCard = namedtuple('VideoCard', ['title', 'href', 'size', 'duration'])
+
+
+
+_CARD_OPEN_RE = re.compile(r'<a\s[^>]*?class="[^"]*\bvideo--link\b[^"]*"[^>]*>', re.IGNORECASE)
+_CARD_CLOSE_RE = re.compile(r'</a\s*>', re.IGNORECASE)
+_HREF_RE = re.compile(r'\bhref="([^"]*)"', re.IGNORECASE)
+_TITLE_RE = re.compile(r'<h3\b[^>]*class="[^"]*\bvideo__title\b[^"]*"[^>]*>(.*?)</h3\s*>', re.IGNORECASE | re.DOTALL)
+_SIZE_RE = re.compile(r'<div\b[^>]*class="[^"]*\bvideo__tag--size\b[^"]*"[^>]*>(.*?)</div\s*>', re.IGNORECASE | re.DOTALL)
+_TIME_RE = re.compile(r'<div\b[^>]*class="[^"]*\bvideo__tag--time\b[^"]*"[^>]*>(.*?)</div\s*>', re.IGNORECASE | re.DOTALL)
+_NEXT_PAGE_RE = re.compile(r'<a\s[^>]*\btitle="Zobrazit další"', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+_CARD_CLASS_RE = re.compile(r'(?:^|\s)video--link(?:\s|$)')     # --- SoupStrainer porovnává celý atribut class, ne jednotlivé třídy
+
+
+
+
+def _to_text(page):
+    if page is None:
+        return ''
+    if isinstance(page, bytes):
+        return page.decode('utf-8', 'replace')
+    return page
+
+
+
+def _inner_text(fragment):
+    return html_lib.unescape(_TAG_RE.sub('', fragment)).strip()
+
+
+
+def _field(pattern, segment):
+    match = pattern.search(segment)
+    return _inner_text(match.group(1)) if match else ''
+
+
+
+def _parse_cards_fast(text):
+
+    """
+    CARDS :: FAST PATH
+    -- Streamové procházení surového HTML bez stavby stromu.
+    -- Každá karta je úsek od otevíracího <a class="video--link"> po jeho </a>,
+    -- pole se hledají pouze uvnitř tohoto úseku  ( nemohou se tedy posunout mezi kartami )
+    """
+
+    cards = []
+    for open_match in _CARD_OPEN_RE.finditer(text):
+        href_match = _HREF_RE.search(open_match.group(0))
+        close_match = _CARD_CLOSE_RE.search(text, open_match.end())
+        segment = text[open_match.end():close_match.start() if close_match else len(text)]
+        cards.append(VideoCard(
+            title=_field(_TITLE_RE, segment),
+            href=html_lib.unescape(href_match.group(1)) if href_match else '',
+            size=_field(_SIZE_RE, segment),
+            duration=_field(_TIME_RE, segment)
+        ))
+    return cards
+
+
+
+def _parse_cards_soup(text):
+
+    """
+    CARDS :: FALLBACK
+    -- Pokud rychlá cesta nic nenajde, ale stránka karty obsahuje  ( změna layoutu )
+    -- použije se BeautifulSoup omezený přes SoupStrainer jen na karty.
+    """
+
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(text, 'html.parser', parse_only=SoupStrainer('a', {'class': _CARD_CLASS_RE}))
+    cards = []
+    for v in soup.find_all('a', {'class': 'video--link'}):
+        title_elem = v.find('h3', {'class': 'video__title'})
+        size_elem = v.find('div', {'class': 'video__tag--size'})
+        time_elem = v.find('div', {'class': 'video__tag--time'})
+        cards.append(VideoCard(
+            title=title_elem.text.strip() if title_elem else '',
+            href=v.get('href') or '',
+            size=size_elem.text.strip() if size_elem else '',
+            duration=time_elem.text.strip() if time_elem else ''
+        ))
+    return cards
+
+
+
+def parse_cards(page):
+
+    """
+    CARDS :: PARSE RESULT CARDS
+    -- Vrátí seznam  ( VideoCard )  ze stránky výsledků prehraj.to  ( bytes nebo str )
+    """
+
+    text = _to_text(page)
+    cards = _parse_cards_fast(text)
+    if not cards and 'video--link' in text:
+        cards = _parse_cards_soup(text)
+    return cards
+
+
+
+def has_next_page(page):
+    return bool(_NEXT_PAGE_RE.search(_to_text(page)))
+
+
+
+def parse_search_page(page):
+
+    """
+    CARDS :: PARSE SEARCH PAGE
+    -- Vrátí  ( karty, existuje_další_stránka )  pro stránku hledání nebo sledovaných.
+    """
+
+    text = _to_text(page)
+    return parse_cards(text), has_next_page(text)
+
+
+
+
+if __name__ == "__main__":
+
+    # --- BENCHMARK : python cards.py stranka1.html [stranka2.html ...]
+    # --- Uložené stránky hledání / sledovaných z prehraj.to, porovnání s původním BeautifulSoup parserem.
+
+    import sys
+    import time
+
+    from bs4 import BeautifulSoup
+
+    def _full_tree(page):
+        soup = BeautifulSoup(page, 'html.parser')
+        found = []
+        for v in soup.find_all('a', {'class': 'video--link'}):
+            title_elem = v.find('h3', {'class': 'video__title'})
+            size_elem = v.find('div', {'class': 'video__tag--size'})
+            time_elem = v.find('div', {'class': 'video__tag--time'})
+            found.append((title_elem.text.strip() if title_elem else '', v.get('href'),
+                          size_elem.text.strip() if size_elem else '', time_elem.text.strip() if time_elem else ''))
+        soup.find('a', {'title': 'Zobrazit další'})
+        return found
+
+    def _strainer(page):
+        return _parse_cards_soup(_to_text(page))
+
+    def _bench(func, page, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(page)
+        return (time.perf_counter() - start) / rounds * 1000
+
+    rounds = 20
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            page = f.read()
+        fast = parse_cards(page)
+        full = _full_tree(page)
+        match = [tuple(c) for c in fast] == [tuple(c) for c in full]
+        print(f"{path} : {len(fast)} karet, shoda s BeautifulSoup : {match}")
+        print(f"    html.parser strom   : {_bench(_full_tree, page, rounds):8.2f} ms/stránka")
+        print(f"    SoupStrainer        : {_bench(_strainer, page, rounds):8.2f} ms/stránka")
+        print(f"    cards.parse_cards   : {_bench(parse_search_page, page, rounds):8.2f} ms/stránka")
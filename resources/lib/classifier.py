@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  classifier
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import re
+import math
+
+from functools import lru_cache
+
+from resources.lib.release_parser import DUB_RE, detect_quality
+from resources.lib.utils import convert_size_to_bytes, duration_to_seconds
+
+
+
+
+QUALITY_RANK = {'2160p': 4, '1080p': 3, '720p': 2, '480p': 1, '': 0}
+
+
+
+# --- CLASSIFIER : Váhy skóre relevance
+
+SCORE_QUALITY = 1.0       # --- za stupeň kvality  ( 0 - 4 )
+SCORE_DUB = 2.0           # --- CZ dabing
+SCORE_SIZE = 1.0          # --- velikost, logaritmicky do 0 - 1  ( strop SIZE_CAP )
+SCORE_RUNTIME = 3.0       # --- shoda délky s TMDB runtime  ( 0 - 1 ),  jen když volající runtime zná
+SIZE_CAP = 20 * 1024 ** 3
+RUNTIME_TOLERANCE = 0.5   # --- relativní odchylka délky, při které shoda klesne na nulu
+
+
+
+
+# --- CLASSIFIER : Převody z utils, výsledky pro stejný text se pamatují  ( stejné výsledky hledání se třídí opakovaně )
+
+_size_bytes = lru_cache(maxsize=4096)(convert_size_to_bytes)
+_duration_seconds = lru_cache(maxsize=4096)(duration_to_seconds)
+
+
+
+class SourceClassifier:
+
+    """
+    CLASSIFIER :: SOURCE CLASSIFIER
+    -- Vyloučené výrazy se kompilují jednou při vytvoření, kvalitu a dabing určuje release_parser.
+    -- classify()  zpracuje celou dávku v jednom průchodu : doplní 'quality', 'dub', 'bytes',
+    -- 'seconds', 'score'  a vrátí jen položky, které projdou filtry.
+    -- Shoda délky se počítá jen s runtime od volajícího  ( epizody z TMDB, filmy při řazení podle relevance ).
+    """
+
+    def __init__(self, exclude_terms=(), preferred_qualities=(), prefer_dubbed=False):
+        terms = [t for t in exclude_terms if t]
+        self.exclude_re = re.compile('|'.join(re.escape(t) for t in terms)) if terms else None
+        self.preferred_qualities = frozenset(preferred_qualities)
+        self.prefer_dubbed = prefer_dubbed
+
+
+    def quality(self, title_lower):
+        return detect_quality(title_lower)
+
+
+    def score(self, quality, dub, size_bytes, seconds, runtime):
+        value = SCORE_QUALITY * QUALITY_RANK[quality]
+        if dub:
+            value += SCORE_DUB
+        if size_bytes > 0:
+            value += SCORE_SIZE * min(1.0, math.log1p(size_bytes) / math.log1p(SIZE_CAP))
+        if runtime and seconds:
+            deviation = abs(seconds - runtime) / runtime
+            value += SCORE_RUNTIME * max(0.0, 1.0 - deviation / RUNTIME_TOLERANCE)
+        return value
+
+
+    def classify(self, videos, runtime=0):
+        exclude_re = self.exclude_re
+        preferred = self.preferred_qualities
+        prefer_dubbed = self.prefer_dubbed
+
+        kept = []
+        for v in videos:
+            title_lower = v['title'].lower()
+            if exclude_re is not None and exclude_re.search(title_lower):
+                continue
+
+            quality = self.quality(title_lower)
+            dub = 'dabing' in title_lower and DUB_RE.search(title_lower) is not None
+            if prefer_dubbed and not dub:
+                continue
+            if preferred and quality not in preferred:
+                continue
+
+            size_bytes = _size_bytes(v.get('size_str') or '')
+            seconds = _duration_seconds(v.get('duration_str') or '')
+            v['quality'] = quality
+            v['dub'] = dub
+            v['bytes'] = size_bytes
+            v['seconds'] = seconds
+            v['score'] = self.score(quality, dub, size_bytes, seconds, runtime)
+            kept.append(v)
+        return kept
+
+
+
+@lru_cache(maxsize=8)
+def get_classifier(exclude_terms=(), preferred_qualities=(), prefer_dubbed=False):
+    return SourceClassifier(exclude_terms, preferred_qualities, prefer_dubbed)
+
+
+
+
+if __name__ == "__main__":
+
+    # --- BENCHMARK : python -m resources.lib.classifier [korpus.tsv] [počet]
+    # --- Korpus jako u release_parser  ( název <TAB> sezóna <TAB> epizoda <TAB> kvalita ),  výchozí je
+    # --- resources/fixtures/release_names.tsv.  Kontrola kvality proti korpusu, porovnání s původním filtrem,
+    # --- první průchod  ( studené převody )  i opakované třídění stejné dávky  ( listing, stránkování, auto-play ).
+
+    import os
+    import sys
+    import time
+
+    def _legacy(videos, exclude_terms, preferred_qualities, prefer_dubbed):
+        if exclude_terms:
+            videos = [v for v in videos if not any(ex in v['title'].lower() for ex in exclude_terms)]
+        out = []
+        for v in videos:
+            title_lower = v['title'].lower()
+            quality = ''
+            if '1080p' in title_lower or 'full hd' in title_lower: quality = '1080p'
+            elif '720p' in title_lower or 'hd' in title_lower: quality = '720p'
+            elif '480p' in title_lower or 'sd' in title_lower: quality = '480p'
+            v['quality'] = quality
+            v['dub'] = bool(re.search(r'cz\s*dabing|cz-dabing|český\s*dabing', title_lower, re.IGNORECASE))
+            v['bytes'] = convert_size_to_bytes(v['size_str'])
+            if prefer_dubbed and not v['dub']: continue
+            if preferred_qualities and v['quality'] not in preferred_qualities: continue
+            out.append(v)
+        return out
+
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'release_names.tsv')
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    corpus = []
+    with open(corpus_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                corpus.append((line.rstrip('\n').split('\t') + ['', '', ''])[:4])
+
+    classifier = get_classifier()
+    errors = 0
+    for name, _, _, quality in corpus:
+        if classifier.quality(name.lower()) != quality:
+            errors += 1
+            print(f"    NESHODA : {name}  ->  {classifier.quality(name.lower())!r}  očekáváno {quality!r}")
+    print(f"{len(corpus)} názvů v korpusu, neshod kvality : {errors}")
+
+    # --- Unikátní názvy, aby se neměřila jen cache  ( korpus nemá velikost ani délku )
+    rows = [(f"{corpus[i % len(corpus)][0]} {i}", '', '') for i in range(total)]
+
+    def _batch():
+        return [{'title': t, 'size_str': size, 'duration_str': duration} for t, size, duration in rows]
+
+    def _time(func, rounds=5):
+        best = None
+        for _ in range(rounds):
+            batch = _batch()
+            start = time.perf_counter()
+            result = func(batch)
+            elapsed = (time.perf_counter() - start) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    settings = (('cam',), ('1080p', '720p'), False)
+    legacy_ms, legacy = _time(lambda b: _legacy(b, *settings))
+    _size_bytes.cache_clear()
+    _duration_seconds.cache_clear()
+    batch = _batch()
+    start = time.perf_counter()
+    get_classifier(*settings).classify(batch, runtime=6000)
+    cold_ms = (time.perf_counter() - start) * 1000
+    warm_ms, fast = _time(lambda b: get_classifier(*settings).classify(b, runtime=6000))
+
+    changed = sum(1 for v in _legacy(_batch(), (), (), False) if classifier.quality(v['title'].lower()) != v['quality'])
+    print(f"{len(rows)} názvů  ( nejlepší z 5 )")
+    print(f"    původní filtr              : {legacy_ms:8.1f} ms  ( ponecháno {len(legacy)} )")
+    print(f"    classifier, první průchod  : {cold_ms:8.1f} ms")
+    print(f"    classifier, opakovaně      : {warm_ms:8.1f} ms  ( ponecháno {len(fast)}, vč. skóre )")
+    print(f"    jiná kvalita               : {changed}  ( hd / sd uvnitř slov už se nepočítá )")
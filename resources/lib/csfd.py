@@ -21,7 +21,6 @@ import re
 import json
 import time
 import random
-import requests
 
 from bs4 import BeautifulSoup
 from urllib.parse import quote
@@ -29,7 +28,8 @@ from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
-from resources.lib.utils import log, popinfo
+from resources.lib.utils import log, popinfo, get_session, conditional_get
+from resources.lib.cache_store import get_store, migrate_json_dir
 
 
 
@@ -38,6 +38,7 @@ BASE_URL = "https://www.csfd.cz/"
 CSFD_TIPS_URL = "https://www.csfd.cz/televize/"
 CSFD_ID_REGEX = r'\/film\/(\d+)-'
 TIMEOUT = 30
+CSFD_CACHE_NAMESPACE = 'csfd'
 
 
 
@@ -53,8 +54,8 @@ class CSFD:
 
         self.addon = addon_obj
         self.base_url = BASE_URL
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": random.choice(self.USER_AGENTS)})
+        self.session = get_session()
+        self.headers = {"User-Agent": random.choice(self.USER_AGENTS)}
 
         self.tmdb_api_key = self.addon.getSetting('api_key').strip()
         self.tmdb_base_url = "https://api.themoviedb.org/3"
@@ -65,41 +66,35 @@ class CSFD:
         default_path = "special://userdata/PLAY-DATA/CACHE-CSFD"
         self.cache_dir = xbmcvfs.translatePath(csfd_cache_path_setting or default_path)
         
-        if not xbmcvfs.exists(self.cache_dir):
-            xbmcvfs.mkdirs(self.cache_dir)
+        self._store = None
+
+
+
+    def _cache_store(self):
+        if self._store is None:
+            store = get_store()
+            imported = migrate_json_dir(store, CSFD_CACHE_NAMESPACE, self.cache_dir,
+                                        lambda c: (c['data'], time.time(), c.get('expires', 0)) if isinstance(c, dict) and 'data' in c else None)
+            if imported:
+                log(f"CSFD - Převedeno {imported} starých cache souborů do databáze", level=xbmc.LOGINFO)
+            self._store = store
+        return self._store
 
 
 
     def _load_cache(self, cache_key: str):
-        cache_file = f"{self.cache_dir}/{cache_key}.json"
-        if xbmcvfs.exists(cache_file):
-            try:
-                with xbmcvfs.File(cache_file) as f:
-                    cache_data = json.loads(f.read())
-                if cache_data.get("expires", 0) > time.time():
-                    log(f"CSFD - Loaded cache for {cache_key}", level=xbmc.LOGDEBUG)
-                    return cache_data.get("data", {})
-                else:
-                    log(f"CSFD - Cache expired for {cache_key}", level=xbmc.LOGDEBUG)
-                    xbmcvfs.delete(cache_file)
-            except Exception as e:
-                log(f"CSFD - Error loading cache for {cache_key} : {str(e)}", level=xbmc.LOGERROR)
-        return None
+        data = self._cache_store().get(CSFD_CACHE_NAMESPACE, cache_key)
+        if data is not None:
+            log(f"CSFD - Loaded cache for {cache_key}", level=xbmc.LOGDEBUG)
+        return data
 
 
 
     def _save_cache(self, cache_key: str, data, expires_in: int = 86400) -> None:
-        cache_file = f"{self.cache_dir}/{cache_key}.json"
-        cache_data = {
-            "data": data,
-            "expires": time.time() + expires_in
-        }
-        try:
-            with xbmcvfs.File(cache_file, 'w') as f: # 'w' pro zápis
-                f.write(json.dumps(cache_data, ensure_ascii=False))
-            xbmc.log(f"Saved cache for {cache_key}", level=xbmc.LOGDEBUG)
-        except Exception as e:
-            log(f"CSFD - Error saving cache for {cache_key} : {str(e)}", level=xbmc.LOGERROR)
+        if self._cache_store().set(CSFD_CACHE_NAMESPACE, cache_key, data, ttl=expires_in):
+            log(f"CSFD - Saved cache for {cache_key}", level=xbmc.LOGDEBUG)
+        else:
+            log(f"CSFD - Error saving cache for {cache_key}", level=xbmc.LOGERROR)
 
 
 
@@ -119,7 +114,7 @@ class CSFD:
                 "language": "en-US",
                 "year": year
             }
-            response = self.session.get(search_endpoint, params=params, timeout=TIMEOUT)
+            response = self.session.get(search_endpoint, params=params, headers=self.headers, timeout=TIMEOUT)
             if response.status_code != 200:
                 log(f"CSFD - TMDb search failed for {title} ({year}): {response.status_code}", level=xbmc.LOGERROR)
                 return None, None
@@ -128,7 +123,7 @@ class CSFD:
             if not data.get("results"):
                 params_no_year = params.copy()
                 params_no_year.pop("year", None)
-                response = self.session.get(search_endpoint, params=params_no_year, timeout=TIMEOUT)
+                response = self.session.get(search_endpoint, params=params_no_year, headers=self.headers, timeout=TIMEOUT)
                 data = response.json()
                 if not data.get("results"):
                     log(f"CSFD - No TMDb results for {title} ({year})", level=xbmc.LOGDEBUG)
@@ -161,6 +156,7 @@ class CSFD:
         url = CSFD_TIPS_URL
 
         headers = {
+            **self.headers,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
             "Accept-Language": "cs-CZ,cs;q=0.8,en-US;q=0.5,en;q=0.3",
             "Accept-Encoding": "gzip, deflate, br",
@@ -301,11 +297,15 @@ class CSFD:
         log(f"CSFD - Fetching details for ID : {full_id}", level=xbmc.LOGDEBUG)
         url = f"{self.base_url}film/{full_id}/prehled"
         headers = {
+            **self.headers,
             "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8"
         }
         
         try:
-            response = self.session.get(url, headers=headers, timeout=TIMEOUT)
+            response, cached_data = conditional_get(self.session, url, CSFD_CACHE_NAMESPACE, cache_key, headers=headers, timeout=TIMEOUT)
+            if cached_data is not None:
+                log(f"CSFD - Detail {full_id} not modified (304), cache extended", level=xbmc.LOGDEBUG)
+                return cached_data
             if 600 > response.status_code >= 400:
                 log(f"CSFD - Failed to get detail for {full_id}. Status code: {response.status_code}", level=xbmc.LOGERROR)
                 return {}
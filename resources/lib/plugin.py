@@ -45,13 +45,16 @@ import traceback
 import unicodedata
 import urllib.parse
 
-from bs4 import BeautifulSoup
 from urllib.parse import urlencode, quote, urlparse, parse_qsl
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
-from resources.lib.utils import get_url, log, encode, clean_title_for_tmdb, safe_get, safe_post
+from resources.lib.utils import get_url, log, encode, clean_title_for_tmdb, safe_get, safe_post, get_session, start_background, join_background, abort_requested
+from resources.lib.cards import parse_cards
+from resources.lib.cache_store import get_store, migrate_json_dir, maybe_collect_garbage
 from resources.lib.series_manager import SeriesManager
 from resources.lib.prehrajto import PrehrajTo
+from resources.lib import stream_cache
 from resources.lib.csfd import CSFD
 from resources.lib.tmdb import TMDB
 from resources.lib import tmdb_account
@@ -191,7 +194,7 @@ except Exception as path_init_error:
 #                                                 --- INSTANCE MANAGERS ---                                                        #
 # ================================================================================================================================ #
 
-session = requests.Session()
+session = get_session()
 series_manager = SeriesManager(addon, profile)
 csfd_instance = CSFD(addon)
 GLOBAL_TRAKT_MONITOR = None
@@ -222,6 +225,11 @@ try:
 except ValueError:
     CACHE_TTL_HOURS = 24
 
+try:
+    CACHE_MAX_STALE_HOURS = int(addon.getSetting('cache_max_stale_hours') or '72')
+except ValueError:
+    CACHE_MAX_STALE_HOURS = 72
+
 
 VIEW_MODES = {
     'list': 50,
@@ -286,6 +294,30 @@ def _get_cache_dir():
     return cache_root_path
 
 
+PLUGIN_CACHE_NAMESPACE = 'plugin'
+_plugin_store = None
+
+
+def _cache_store():
+
+    """
+    CACHE :: STORE
+    -- Sdílený SQLite store  ( cache_store ),  při prvním použití převezme staré  PLUGIN_CACHE/<název>.json
+    """
+
+    global _plugin_store
+    if _plugin_store is None:
+        store = get_store()
+        cache_dir = _get_cache_dir()
+        if cache_dir:
+            imported = migrate_json_dir(store, PLUGIN_CACHE_NAMESPACE, cache_dir,
+                                        lambda c: (c['data'], c.get('timestamp', 0), None) if isinstance(c, dict) and 'data' in c else None)
+            if imported:
+                log(f"CACHE - Převedeno {imported} starých cache souborů do databáze", xbmc.LOGINFO)
+        _plugin_store = store
+    return _plugin_store
+
+
 def load_cache(cache_name, ttl_hours=None):
     current_ttl_hours = ttl_hours if ttl_hours is not None else CACHE_TTL_HOURS
 
@@ -293,96 +325,162 @@ def load_cache(cache_name, ttl_hours=None):
         log(f"CACHE - Neplatné TTL ({current_ttl_hours}) pro '{cache_name}', použije se výchozí 1 hodina.", xbmc.LOGWARNING)
         current_ttl_hours = 1
 
-    cache_dir = _get_cache_dir()
+    data = _cache_store().get(PLUGIN_CACHE_NAMESPACE, cache_name, max_age=current_ttl_hours * 3600)
+    if data is not None:
+        log(f"CACHE - Používám cachovaná data pro '{cache_name}' (TTL: {current_ttl_hours}h).", xbmc.LOGINFO)
+    else:
+        log(f"CACHE - Cache '{cache_name}' neexistuje nebo vypršela.", xbmc.LOGDEBUG)
+    return data
 
-    if not cache_dir:
-         log(f"CACHE - Nelze získat cache adresář pro '{cache_name}'.", xbmc.LOGERROR)
-         return None
 
-    cache_path = os.path.join(cache_dir, f"{cache_name}.json")
-    file_handle = None
-    cache_expired = False
+def load_cache_entry(cache_name):
 
-    if xbmcvfs.exists(cache_path):
-        try:
-            file_handle = xbmcvfs.File(cache_path, 'r')
-            content = file_handle.read()
+    """
+    CACHE :: RAW ENTRY
+    -- Vrátí celý záznam  { 'timestamp', 'data' }  bez kontroly TTL a bez mazání.
+    -- Stáří si posuzuje volající  ( stale-while-revalidate u hledání )
+    """
 
-            if not content:
-                 log(f"CACHE - Cache soubor '{cache_name}' je prázdný. Mažu...", xbmc.LOGWARNING)
-                 xbmcvfs.delete(cache_path)
-                 return None
+    return _cache_store().get_entry(PLUGIN_CACHE_NAMESPACE, cache_name)
 
-            data = json.loads(content)
 
-            cache_age_seconds = time.time() - data.get('timestamp', 0)
-            ttl_seconds = current_ttl_hours * 3600
+def load_stale_cache(cache_name):
 
-            if cache_age_seconds < ttl_seconds:
-                log(f"CACHE - Používám cachovaná data pro '{cache_name}' (TTL: {current_ttl_hours}h).", xbmc.LOGINFO)
-                return data.get('data')
-            else:
-                log(f"CACHE - Cache pro '{cache_name}' vypršela (stáří: {cache_age_seconds/3600:.1f}h > TTL: {current_ttl_hours}h). Stahuji nová data ...", xbmc.LOGINFO)
-                cache_expired = True
-                
-        except Exception as e:
-            log(f"CACHE - Chyba při načítání cache '{cache_name}' - smazána : {str(e)}\n{traceback.format_exc()}", xbmc.LOGERROR)
+    """
+    CACHE :: STALE ENTRY
+    -- Data prošlého záznamu, pokud není starší než  CACHE_MAX_STALE_HOURS  ( stale-while-revalidate ),  jinak None.
+    -- 0 = vypnuto, po vypršení TTL se vždy čeká na síť.
+    -- Volá se po  load_cache,  která už zaznamenala 'misses',  tady se přidá jen 'stale_hits'.
+    """
 
-            try:
-                if xbmcvfs.exists(cache_path):
-                    xbmcvfs.delete(cache_path)
-                    log(f"CACHE - Poškozená cache '{cache_name}' smazána.", xbmc.LOGWARNING)
-            except Exception as del_e:
-                log(f"CACHE - Nepodařilo se smazat poškozenou cache '{cache_name}': {del_e}", xbmc.LOGERROR)
+    if CACHE_MAX_STALE_HOURS <= 0:
+        return None
+    entry = load_cache_entry(cache_name)
+    if entry and time.time() - entry.get('timestamp', 0) < CACHE_MAX_STALE_HOURS * 3600:
+        record_cache_event(cache_name, 'stale_hits')
+        return entry['data']
+    return None
 
-        finally:
-            if file_handle:
-                file_handle.close()
-            if cache_expired:
-                 try:
-                     if xbmcvfs.exists(cache_path):
-                         xbmcvfs.delete(cache_path)
-                         log(f"CACHE - Prošlá cache '{cache_name}' smazána v finally (TTL expired).", xbmc.LOGINFO)
-                 except Exception as del_exp_e:
-                      log(f"CACHE - Nepodařilo se smazat prošlou cache '{cache_name}' ve finally: {del_exp_e}", xbmc.LOGERROR)
 
-    else:
-         log(f"CACHE - Cache soubor '{cache_name}' neexistuje.", xbmc.LOGDEBUG)
+def cache_exists(cache_name):
+
+    """
+    CACHE :: EXISTS
+    -- Je záznam použitelný  ( čerstvý nebo v okně  CACHE_MAX_STALE_HOURS ) ?  Nepočítá se do statistik,
+    -- slouží jen k rozhodnutí, zda něco stahovat dopředu.
+    """
+
+    max_age_hours = max(CACHE_TTL_HOURS, CACHE_MAX_STALE_HOURS)
+    return _cache_store().exists(PLUGIN_CACHE_NAMESPACE, cache_name, max_age=max_age_hours * 3600)
 
-    return None
+
+def record_cache_event(cache_name, event):
+    _cache_store().record(PLUGIN_CACHE_NAMESPACE, cache_name, event)
 
 
 def save_cache(cache_name, data):
-    cache_dir = _get_cache_dir()
-    if not cache_dir:
-         log(f"CACHE - Nelze získat cache adresář pro uložení '{cache_name}'.", xbmc.LOGERROR)
-         return
+    if _cache_store().set(PLUGIN_CACHE_NAMESPACE, cache_name, data):
+        log(f"CACHE - Cache '{cache_name}' úspěšně uložena.", xbmc.LOGINFO)
+    else:
+        log(f"CACHE - Chyba při ukládání cache '{cache_name}'", xbmc.LOGERROR)
 
-    cache_path = os.path.join(cache_dir, f"{cache_name}.json")
-    file_handle = None
+
+def delete_cache_prefix(cache_prefix):
+    return _cache_store().delete_prefix(PLUGIN_CACHE_NAMESPACE, cache_prefix)
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} GB"
+
+
+def _run_cache_gc():
     try:
-        data_to_save = {
-            'timestamp': time.time(),
-            'data': data
-        }
-        file_handle = xbmcvfs.File(cache_path, 'w')
-        content_to_write = json.dumps(data_to_save, ensure_ascii=False, indent=2)
-        bytes_written = file_handle.write(content_to_write)
-        if bytes_written == 0 and content_to_write:
-             raise IOError(f"Nepodařilo se zapsat data do cache souboru '{cache_name}' (0 bytes zapsáno)")
-        log(f"CACHE - Cache '{cache_name}' úspěšně uložena.", xbmc.LOGINFO)
+        store = get_store()
+        store.flush_stats()
+        if abort_requested():
+            return
+        reclaimed = maybe_collect_garbage(store)
     except Exception as e:
-            detailed_error = traceback.format_exc()
-            log(f"CACHE - Chyba při ukládání cache '{cache_name}': {str(e)}\n{detailed_error}", xbmc.LOGERROR)
-    finally:
-        if file_handle:
-            file_handle.close()
+        log(f"CACHE - GC selhal : {e}", xbmc.LOGWARNING)
+        return
+    for namespace, (entries, size) in (reclaimed or {}).items():
+        log(f"CACHE - GC [{namespace}] smazáno {entries} záznamů, uvolněno {_format_bytes(size)}", xbmc.LOGINFO)
+
+
+def schedule_cache_gc():
+
+    """
+    CACHE :: BACKGROUND GC
+    -- Po obsloužení akce krátký úklid ve vlákně  ( sám si hlídá interval a časový strop, viz cache_store )
+    """
+
+    start_background(_run_cache_gc, name='playto-cache-gc')
+
+
+def cache_diagnostics():
+
+    """
+    CACHE :: DIAGNOSTICS
+    -- Přehled cache za posledních dní  ( cache_store.STATS_DAYS )  :  zásahy, minutí, prošlá data, vyřazení,
+    -- velikost a latence načtení / uložení  ( p50 / p95 )  po skupinách.
+    """
+
+    def _ms(value):
+        return f"{value:.2f}" if value is not None else "-"
+
+    report = get_store().load_stats()
+    lines = [f" [B]SKUPINA          ZÁSAHY    MINUTÍ   PROŠLÁ   VYŘAZENO   ZÁZNAMŮ   VELIKOST     NAČTENÍ ms p50/p95   ULOŽENÍ ms p50/p95[/B]\n"]
+    for group in sorted(report):
+        stats = report[group]
+        lookups = stats['hits'] + stats['misses']
+        ratio = f"{stats['hits'] * 100 // lookups} %" if lookups else "-"
+        lines.append(
+            f" [COLOR orange]·  [/COLOR]{group.upper():<13} {stats['hits']:>6} ({ratio:>5}) {stats['misses']:>6} {stats['stale_hits']:>8} {stats['evictions']:>10}"
+            f" {stats['entries']:>9} {_format_bytes(stats['bytes']):>10}     {_ms(stats['load_p50']):>7} / {_ms(stats['load_p95']):<7}"
+            f"     {_ms(stats['save_p50']):>7} / {_ms(stats['save_p95']):<7}"
+        )
+    if len(lines) == 1:
+        lines.append(" Zatím žádná data")
+    lines.append(f"\n DATABÁZE :  [B]{_format_bytes(get_store().file_size())}[/B]")
+    xbmcgui.Dialog().textviewer('|   CACHE  :  DIAGNOSTIKA   |', "\n".join(lines))
+
+
+def cache_maintenance():
+
+    """
+    CACHE :: MAINTENANCE
+    -- Ruční údržba z nastavení : prošlé záznamy, limity jmenných prostorů, VACUUM a přehled uvolněného místa.
+    """
+
+    store = get_store()
+    size_before = store.file_size()
+    usage_before = store.usage()
+    reclaimed = store.collect_garbage()
+    store.vacuum()
+    store.set_meta('gc:last', time.time())
+    size_after = store.file_size()
+    usage_after = store.usage()
+
+    lines = [f" DATABÁZE :  [B]{_format_bytes(size_before)}[/B]  ->  [B][COLOR limegreen]{_format_bytes(size_after)}[/COLOR][/B]\n"]
+    for namespace in sorted(set(usage_before) | set(reclaimed)):
+        entries, size = reclaimed.get(namespace, (0, 0))
+        remaining = usage_after.get(namespace, (0, 0))
+        lines.append(f" [COLOR orange]·  [/COLOR]{namespace.upper():<10} :  smazáno {entries} záznamů  ( {_format_bytes(size)} ),  zbývá {remaining[0]}  ( {_format_bytes(remaining[1])} )")
+    if not reclaimed:
+        lines.append("\n [B]Nic k úklidu, cache je v limitech[/B]")
+
+    log(f"CACHE - Údržba : {_format_bytes(size_before)} -> {_format_bytes(size_after)}, {reclaimed}", xbmc.LOGINFO)
+    xbmcgui.Dialog().textviewer('|   CACHE  :  ÚDRŽBA   |', "\n".join(lines))
 
 
 # =======================     D E P E N D E N C Y   :   CLIENTS     ===================================================== #
 
-tmdb_client = TMDB(addon, _handle, session, load_cache, save_cache)
-prehrajto_client = PrehrajTo(addon, _handle, session, tmdb_client)
+tmdb_client = TMDB(addon, _handle, session, load_cache, save_cache, load_stale_cache, PLUGIN_CACHE_NAMESPACE, cache_exists)
+prehrajto_client = PrehrajTo(addon, _handle, session, tmdb_client, load_cache_entry, save_cache, record_cache_event)
 
 
 
@@ -500,7 +598,7 @@ def check_run_file():
 # ======================================================================================================================= #
 
 
-def resolve_video(link, cookies, meta_json, return_url_only=False):
+def resolve_video(link, cookies, meta_json, return_url_only=False, stream=None):
 
     """
     ADDON CORE :: METADATA FOR PLAYER
@@ -508,18 +606,28 @@ def resolve_video(link, cookies, meta_json, return_url_only=False):
     -- NEBO vrátí URL, pokud je return_url_only=True.
     -- Přidává Trakt ID a metadata pro historii do Path pro KodiPlayerMonitor.
     -- Historii ukládá až monitor při 'onAVStarted'.
+    -- stream  =  už vyřešené  ( file_url, subtitle_url )  ( vítěz závodu auto-play ),  stránka videa se pak nestahuje.
     """
 
     meta = json.loads(meta_json) if isinstance(meta_json, str) else meta_json
-    link_full = link if 'prehraj.to' in link else 'https://prehraj.to' + urlparse(link).path
-    try:
-        # add timeout to avoid blocking the main thread indefinitely
-        resp = safe_get(session, link_full, cookies=cookies, headers=prehrajto_client.headers, timeout=15)
-        page_content = resp.content if resp is not None else None
-        file_url, subtitle_url = prehrajto_client.get_video_link(page_content) if page_content else (None, None)
-    except requests.exceptions.RequestException as e:
-        log(f"RESOLVE - Chyba při stahování stránky videa: {e}", xbmc.LOGERROR)
-        file_url, subtitle_url = None, None
+    link_full = prehrajto_client.full_link(link)
+
+    enable_trakt_scrobbling = addon.getSettingBool('enable_trakt_scrobbling')
+    tmdb_id = meta.get('tmdb_id')
+    log(f"RESOLVE - TMDB ID: {tmdb_id}, Media Type: {meta.get('media_type', 'movie')}, Scrobbling Enabled: {enable_trakt_scrobbling}", xbmc.LOGINFO)
+
+    trakt_lookup = None
+    if enable_trakt_scrobbling and trakt.scrobble_map_key(meta):
+        trakt_lookup = start_background(trakt.resolve_scrobble_id, meta, session, addon, name='playto-trakt-lookup')
+
+    if stream and stream[0]:
+        file_url, subtitle_url = stream
+    else:
+        try:
+            file_url, subtitle_url = prehrajto_client.get_stream(link_full, cookies)
+        except requests.exceptions.RequestException as e:
+            log(f"RESOLVE - Chyba při stahování stránky videa: {e}", xbmc.LOGERROR)
+            file_url, subtitle_url = None, None
 
     if not file_url:
         if return_url_only:
@@ -530,66 +638,14 @@ def resolve_video(link, cookies, meta_json, return_url_only=False):
             xbmcplugin.setResolvedUrl(handle=_handle, succeeded=False, listitem=xbmcgui.ListItem())
             return None
 
-    if cookies:
-        try:
-            res = safe_get(session, f"{link_full}?do=download", cookies=cookies, headers=prehrajto_client.headers, allow_redirects=False, timeout=10)
-            if res and 'Location' in res.headers:
-                file_url = res.headers['Location']
-        except requests.exceptions.RequestException as e:
-            log(f"RESOLVE - Chyba při získávání premium odkazu : {e}", xbmc.LOGERROR)
-
-    # --- RESOLVE : TRAKT SCROBBLING PŘÍPRAVA
-    
-    trakt_id_for_scrobbling = None
-    media_type = meta.get('media_type', 'movie')
-    tmdb_id = meta.get('tmdb_id')
-    enable_trakt_scrobbling = addon.getSettingBool('enable_trakt_scrobbling')
+    # --- RESOLVE : TRAKT SCROBBLING  ( ID z trvalé mapy nebo z vlákna spuštěného souběžně se stahováním stránky )
 
-    log(f"RESOLVE - TMDB ID: {tmdb_id}, Media Type: {media_type}, Scrobbling Enabled: {enable_trakt_scrobbling}", xbmc.LOGINFO)
-    media_type_for_monitor = None
-
-    if enable_trakt_scrobbling and tmdb_id:
-        trakt_media_type_id_search = 'show' if media_type == 'episode' else 'movie' # Search type for ID lookup
-        log(f"RESOLVE - Volám get_trakt_id pro TMDB ID {tmdb_id} (Typ: {trakt_media_type_id_search})...", xbmc.LOGINFO)
-
-        if media_type == 'episode':
-            show_tmdb_id = meta.get('tmdb_id')
-            season = meta.get('season')
-            episode_num = meta.get('episode')
-
-            try:
-                season_num_int = int(season)
-                episode_num_int = int(episode_num)
-            except (ValueError, TypeError):
-                 log(f"TRAKT - Neplatné číslo sezóny/epizody: {season}/{episode_num}", xbmc.LOGWARNING)
-                 season_num_int, episode_num_int = None, None
-
-            if show_tmdb_id and season_num_int is not None and episode_num_int is not None:
-                show_trakt_id = trakt.get_trakt_id(show_tmdb_id, 'show', session, addon)
-                if show_trakt_id:
-                    episode_url = f"https://api.trakt.tv/shows/{show_trakt_id}/seasons/{season_num_int}/episodes/{episode_num_int}"
-                    try:
-                        response = trakt.handle_trakt_401(episode_url, addon=addon, session=session, method='GET')
-                        if response and response.status_code == 200:
-                            episode_data = response.json()
-                            trakt_id_for_scrobbling = episode_data['ids']['trakt']
-                            media_type_for_monitor = 'episode'
-                            log(f"RESOLVE - TRAKT episode Trakt ID: {trakt_id_for_scrobbling}", xbmc.LOGINFO)
-                        elif response:
-                            log(f"RESOLVE - TRAKT selhalo získání episode Trakt ID: {response.status_code}, {response.text}", xbmc.LOGWARNING)
-                    except Exception as e:
-                        log(f"RESOLVE - TRAKT chyba při zpracování episode Trakt ID: {str(e)}", xbmc.LOGERROR)
-                else:
-                    log("RESOLVE - TRAKT selhalo získání show Trakt ID", xbmc.LOGWARNING)
-            else:
-                 log("RESOLVE - TRAKT chybí TMDB ID, číslo sezóny nebo epizody v metadatech", xbmc.LOGWARNING)
-
-        elif media_type == 'movie':
-            trakt_id_for_scrobbling = trakt.get_trakt_id(tmdb_id, 'movie', session, addon)
-            if trakt_id_for_scrobbling:
-                 media_type_for_monitor = 'movie'
-        else:
-             log(f"RESOLVE - TRAKT nepodporovaný media_type pro scrobbling: {media_type}", xbmc.LOGWARNING)
+    trakt_id_for_scrobbling, media_type_for_monitor = None, None
+    if trakt_lookup:
+        trakt_lookup.join(timeout=0.5)
+        trakt_id_for_scrobbling, media_type_for_monitor = trakt.resolve_scrobble_id(meta, session, addon, network=False)
+        if not trakt_id_for_scrobbling:
+            log("RESOLVE - TRAKT ID zatím není k dispozici, monitor ho při spuštění přehrávání vezme z mapy", xbmc.LOGINFO)
 
     # --- RESOLVE : Sjednocené přidávání parametrů do URL  ( TRAKT.TV + PLAYBACK )
 
@@ -607,7 +663,7 @@ def resolve_video(link, cookies, meta_json, return_url_only=False):
             query_params_original['media_type'] = media_type_for_monitor
             log(f"RESOLVE - TRAKT přidávám Trakt ID: {trakt_id_for_scrobbling}", xbmc.LOGINFO)
         elif enable_trakt_scrobbling and tmdb_id:
-            log("RESOLVE - TRAKT selhalo získání Trakt ID. Scrobbling nebude aktivní", xbmc.LOGWARNING)
+            log("RESOLVE - TRAKT Trakt ID v URL chybí, monitor ho dohledá z 'playback_meta'", xbmc.LOGINFO)
     
         file_url = parsed_file_url._replace(query=urlencode(query_params_original)).geturl()
         log(f"RESOLVE - Finální URL pro přehrávač (obsahuje meta): {file_url}", xbmc.LOGINFO)
@@ -677,8 +733,6 @@ def search(name, return_results=False, resolve_first=False):
     -- Hlavní funkce hledani a úpravy textu, formatování dat TMDB pro player.
     """
     
-    show_speed_info = addon.getSettingBool('show_speed_info')
-
     # --- SEARCH : Zabraňuje opětovnému spuštění vyhledávání po návratu z přehrávání
     current_list_item_path = xbmc.getInfoLabel('ListItem.Path')
     if name and name != 'None' and f"action=listing_search&name={quote(name)}" in current_list_item_path:
@@ -773,16 +827,36 @@ def search(name, return_results=False, resolve_first=False):
                 f.write(search_query)
 
     cookies = prehrajto_client.get_premium_cookies()
+
+    if not return_results and not resolve_first and addon.getSettingBool('search_paged'):
+        search_page(search_query, 1, meta_for_playback, cookies)
+        return
+
     filtered_videos = prehrajto_client.search_sources(search_query, cookies)
 
     if return_results:
         return filtered_videos
 
+    filtered_videos = prehrajto_client.rank_by_speed(filtered_videos, cookies)
+
     if resolve_first:
         if filtered_videos:
-            first_video = filtered_videos[0]
+
+            # --- SEARCH : Auto-play, nejlepší zdroje se řeší souběžně a hraje první, který projde
+
+            try:
+                race_count = int(addon.getSetting('autoplay_race_count') or '3')
+            except ValueError:
+                race_count = 3
+            winner = prehrajto_client.race_resolve(filtered_videos, cookies, race_count)
+            if not winner:
+                xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'RESOLVE : Nepodařilo se získat odkaz na video', xbmcgui.NOTIFICATION_ERROR, 5000)
+                xbmcplugin.setResolvedUrl(handle=_handle, succeeded=False, listitem=xbmcgui.ListItem())
+                return
+            first_video, file_url, subtitle_url = winner
             final_meta = meta_for_playback if meta_for_playback else {'title': first_video['title']}
-            resolve_video(first_video['link'], cookies, json.dumps(final_meta))
+            resolve_video(first_video['link'], cookies, json.dumps(final_meta), stream=(file_url, subtitle_url))
+            prehrajto_client.probe_speeds(filtered_videos[:race_count], cookies)
         return
 
     if not filtered_videos:
@@ -792,13 +866,21 @@ def search(name, return_results=False, resolve_first=False):
 
     # ---  set_view_mode('files', 'view_mode_search')
 
+    list_search_results(filtered_videos[:int(ls)], meta_for_playback)
+    xbmcplugin.endOfDirectory(_handle)
+    prehrajto_client.prefetch_streams(filtered_videos, cookies)
+
+
+def list_search_results(videos, meta_for_playback):
     show_size = addon.getSettingBool('show_size')
     show_duration_time = addon.getSettingBool('show_duration_time')
+    show_speed_info = addon.getSettingBool('show_speed_info')
 
-    for video in filtered_videos[:int(ls)]:
+    for video in videos:
         size_display = f'[LIGHT][COLOR orange][{video["size_str"]}][/LIGHT][/COLOR]  ' if show_size and video["size_str"] else ''
         duration_display = f'[LIGHT][COLOR limegreen]· {video["duration_str"] or "N/A"} ·[/LIGHT][/COLOR]' if show_duration_time else ''
-        label = f'{size_display}{video["title"]} {duration_display}'.strip()
+        speed_display = f'  [LIGHT][COLOR deepskyblue]· {video["speed_mbps"]:.0f} Mbps ·[/LIGHT][/COLOR]' if show_speed_info and video.get('speed_mbps') else ''
+        label = f'{size_display}{video["title"]} {duration_display}{speed_display}'.strip()
 
         list_item = xbmcgui.ListItem(label=label)
         list_item.setProperty('IsPlayable', 'true')
@@ -812,17 +894,141 @@ def search(name, return_results=False, resolve_first=False):
         final_meta = meta_for_playback if meta_for_playback else {'title': video['title']}
         url = get_url(action='play', link=video['link'], meta=json.dumps(final_meta))
         xbmcplugin.addDirectoryItem(_handle, url, list_item, isFolder=False)
+
+
+def search_page(search_query, page, meta_for_playback=None, cookies=None):
+
+    """
+    SEARCH :: PAGED LISTING
+    -- Vykreslí jednu stránku výsledků hned a přidá položku 'DALŠÍ STRANA'.
+    -- Další stránka se načte až na vyžádání  ( přes cache hledání, pokud je k dispozici )
+    """
+
+    if cookies is None:
+        cookies = prehrajto_client.get_premium_cookies()
+
+    videos, next_page = prehrajto_client.search_page(search_query, cookies, int(page))
+    videos = prehrajto_client.rank_by_speed(videos, cookies)
+    if not videos and not next_page:
+        xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'SEARCH : Žádný obsah nesplňuje kritéria', xbmcgui.NOTIFICATION_INFO, 4000, sound=False)
+        xbmcplugin.endOfDirectory(_handle, succeeded=False)
+        return
+
+    list_search_results(videos, meta_for_playback)
+
+    if next_page:
+        next_page_item = xbmcgui.ListItem(label='[COLOR orange]| DALŠÍ STRANA ==>[/COLOR]')
+        next_page_url = get_url(action='listing_search_page', query=search_query, page=str(next_page), meta=json.dumps(meta_for_playback or {}))
+        xbmcplugin.addDirectoryItem(_handle, next_page_url, next_page_item, isFolder=True)
     xbmcplugin.endOfDirectory(_handle)
+    prehrajto_client.prefetch_streams(videos, cookies)
 
 
 # =======================     P L A Y . T O   :   MOST WATCHED   ======================================================== #
 
 
+MOST_WATCHED_WORKERS = 4     # --- Souběžně stahované stránky 'SLEDOVANÉ'
+
+
+def _most_watched_cache_name(category, page):
+    return f"most_watched_{category.replace(' ', '_')}_p{page}"
+
+
+def _fetch_most_watched_page(url, cookies):
+    resp = safe_get(session, url, cookies=cookies, headers=prehrajto_client.headers, timeout=15)
+    if resp is None:
+        return None
+    videos = []
+    for card in parse_cards(resp.content):
+        if not card.href:
+            continue
+        videos.append({
+            'title': card.title or 'Neznámý titul',
+            'link': f'https://prehraj.to{card.href}' if card.href.startswith('/') else card.href,
+            'size_str': card.size,
+            'duration_str': card.duration
+        })
+    return videos
+
+
+def load_most_watched_pages(category, max_pages_count, cookies, ttl_hours, use_cache=True, show_progress=True):
+
+    """
+    WATCHED :: PAGE LOADER
+    -- Každá stránka má vlastní cache  ( a tedy vlastní TTL ), stahují se jen chybějící / prošlé stránky
+    -- a to souběžně  ( MOST_WATCHED_WORKERS ). Selhání jedné stránky nezahodí ostatní.
+    -- Vrací  ( seznam stránek v pořadí  [ videa nebo None ], zrušeno )
+    """
+
+    if category == '7 DNÍ':
+        base_url = 'https://prehraj.to/nejsledovanejsi-online-videa-7-dni'
+    elif category == '14 DNÍ':
+        base_url = 'https://prehraj.to/nejsledovanejsi-online-videa-14-dni'
+    else:
+        base_url = 'https://prehraj.to/nejsledovanejsi-online-videa'
+
+    pages = [None] * max_pages_count
+    missing = []
+    for i in range(max_pages_count):
+        cached = load_cache(_most_watched_cache_name(category, i + 1), ttl_hours=ttl_hours) if use_cache else None
+        if cached is not None:
+            pages[i] = cached
+        else:
+            missing.append(i)
+
+    if not missing:
+        return pages, False
+
+    log(f"WATCHED - Stahuji stránky {[i + 1 for i in missing]} z {max_pages_count} ( ostatní z cache )", xbmc.LOGINFO)
+    canceled = False
+    progress_dialog = None
+    if show_progress:
+        progress_dialog = xbmcgui.DialogProgress()
+        progress_dialog.create('[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', 'WATCHED : Načítám sledované položky ze serveru')
+
+    executor = ThreadPoolExecutor(max_workers=min(MOST_WATCHED_WORKERS, len(missing)))
+    pending = set()
+    try:
+        futures = {}
+        for i in missing:
+            url = base_url if i == 0 else f'{base_url}?vp-page={i + 1}'
+            futures[executor.submit(_fetch_most_watched_page, url, cookies)] = i
+
+        pending = set(futures)
+        done_count = 0
+        while pending:
+            if progress_dialog and progress_dialog.iscanceled():
+                log("WATCHED - Stahování zrušeno uživatelem.", xbmc.LOGINFO)
+                canceled = True
+                break
+            done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = futures[future]
+                done_count += 1
+                try:
+                    pages[i] = future.result()
+                except Exception as e:
+                    log(f"WATCHED - Neočekávaná chyba při zpracování stránky {i + 1}: {str(e)}\n{traceback.format_exc()}", xbmc.LOGERROR)
+                if pages[i] is None:
+                    log(f"WATCHED - Stránku {i + 1} se nepodařilo stáhnout", xbmc.LOGERROR)
+                elif pages[i] and use_cache:
+                    save_cache(_most_watched_cache_name(category, i + 1), pages[i])
+                if progress_dialog:
+                    progress_dialog.update(int(done_count / len(missing) * 100), f'[B][COLOR orange]NAČÍTÁM  [ FUCKING ]  STRÁNKY  :  [/COLOR][/B] {done_count}/{len(missing)}')
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+        if progress_dialog:
+            progress_dialog.close()
+
+    return pages, canceled
+
+
 def most_watched():
 
     succeeded = True
     videos = []
-    progress_dialog = None
 
     # --- FUTURE FIX : Potenciální oprava pro zamezení zbytečného znovunačítání po návratu z přehrávání.
     #
@@ -847,101 +1053,33 @@ def most_watched():
         except ValueError:
             most_watched_ttl_hours = 1
 
-        cache_name = f"most_watched_{current_category.replace(' ', '_')}_{current_max_pages}"
-        cached_data = None
-
-        if not disable_most_watched_cache:
-            cached_data = load_cache(cache_name, ttl_hours=most_watched_ttl_hours)
-        else:
+        if disable_most_watched_cache:
             log(f"WATCHED - Cache pro 'Sledované' je uživatelem VYPNUTA.", xbmc.LOGINFO)
 
-        if cached_data is not None:
-            videos = cached_data
-            log(f"WATCHED - Použita data z cache '{cache_name}'. Počet položek: {len(videos)}", xbmc.LOGINFO)
-        else:
-            log(f"WATCHED - Cache '{cache_name}' nenalezena nebo vypršela. Stahuji nová data...", xbmc.LOGINFO)
-            
-            if current_category == '7 DNÍ':
-                base_url = 'https://prehraj.to/nejsledovanejsi-online-videa-7-dni'
-            elif current_category == '14 DNÍ':
-                 base_url = 'https://prehraj.to/nejsledovanejsi-online-videa-14-dni'
-            else:
-                 base_url = 'https://prehraj.to/nejsledovanejsi-online-videa'
+        pages, canceled = load_most_watched_pages(current_category, current_max_pages, cookies, most_watched_ttl_hours,
+                                                  use_cache=not disable_most_watched_cache)
 
-            urls = [f'{base_url}' if i == 1 else f'{base_url}?vp-page={i}' for i in range(1, current_max_pages + 1)]
-            show_size = addon.getSettingBool('show_size')
-            show_duration_time = addon.getSettingBool('show_duration_time')
-            seen_links = set()
+        failed_pages = [i + 1 for i, page in enumerate(pages) if page is None]
+        if canceled or failed_pages:
+            succeeded = False
+            if failed_pages:
+                log(f"WATCHED - Nenačtené stránky: {failed_pages}, zobrazuji zbytek.", xbmc.LOGWARNING)
 
-            progress_dialog = xbmcgui.DialogProgress()
-            progress_dialog.create('[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', 'WATCHED : Načítám sledované položky ze serveru')
-            total_urls = len(urls)
-            
-            download_successful = True 
-
-            for i, url in enumerate(urls):
-                if progress_dialog.iscanceled():
-                     log("WATCHED - Stahování zrušeno uživatelem.", xbmc.LOGINFO)
-                     succeeded = False
-                     download_successful = False
-                     break 
-                
-                progress = int((i / total_urls) * 100)
-                progress_dialog.update(progress, f'[B][COLOR orange]NAČÍTÁM  [ FUCKING ]  STRÁNKY  :  [/COLOR][/B] {i+1}/{total_urls}\n{url}')
+        show_size = addon.getSettingBool('show_size')
+        show_duration_time = addon.getSettingBool('show_duration_time')
+        seen_links = set()
 
-                try:
-                     html = session.get(url, cookies=cookies, headers=prehrajto_client.headers, timeout=15).content # type: ignore
-                     soup = BeautifulSoup(html, 'html.parser')
-                     title_elems = soup.find_all('h3', attrs={'class': 'video__title'})
-                     size_elems = soup.find_all('div', attrs={'class': 'video__tag--size'})
-                     time_elems = soup.find_all('div', attrs={'class': 'video__tag--time'})
-                     link_elems = soup.find_all('a', {'class': 'video--link'})
-
-                     if not link_elems:
-                          log(f"WATCHED - Žádné odkazy na stránce {url}, možná konec?", xbmc.LOGINFO)
-                          break
-
-                     for t, s, l, m in zip(title_elems, size_elems, link_elems, time_elems):
-                         link_href = l.get('href')
-                         if not link_href or link_href in seen_links:
-                             continue
-                         seen_links.add(link_href)
-
-                         title_str = t.text.strip() if t else 'Neznámý titul'
-                         size_str = s.text.strip() if s else ''
-                         duration_str = m.text.strip() if m else ''
-
-                         size_display = f'[LIGHT][COLOR orange][{size_str}][/LIGHT][/COLOR]  ' if show_size and size_str else ''
-                         duration_display = f'[LIGHT][COLOR limegreen]· {duration_str or "N/A"} ·[/LIGHT][/COLOR]' if show_duration_time else ''
-                         formatted = f'{size_display}{title_str} {duration_display}'.strip()
-
-                         videos.append({
-                             'formatted': formatted,
-                             'link': f'https://prehraj.to{link_href}' if link_href.startswith('/') else link_href,
-                             'title': title_str
-                         })
-                         
-                except requests.exceptions.Timeout:
-                    log(f"WATCHED - Timeout při stahování {url}", xbmc.LOGERROR) 
-                    download_successful = False
-                    succeeded = False
-                    break
-                except requests.exceptions.RequestException as e:
-                    log(f"WATCHED - Chyba sítě/requestu {url}: {str(e)}", xbmc.LOGERROR)
-                    download_successful = False
-                    succeeded = False
-                    break
-                except Exception as e:
-                    log(f"WATCHED - Neočekávaná chyba při zpracování {url}: {str(e)}\n{traceback.format_exc()}", xbmc.LOGERROR)
-                    download_successful = False
-                    succeeded = False
-                    break
+        for page in pages:
+            for video in page or []:
+                link = video['link']
+                if link in seen_links:
+                    continue
+                seen_links.add(link)
 
-            if download_successful and videos and not disable_most_watched_cache:
-                log(f"WATCHED - Načteno {len(videos)} položek. Ukládám do cache '{cache_name}'.", xbmc.LOGINFO)
-                save_cache(cache_name, videos)
-            elif download_successful and not videos:
-                log(f"WATCHED - Nepodařilo se načíst žádná data pro 'Sledované'. Cache se neukládá.", xbmc.LOGWARNING)
+                size_str = video['size_str']
+                size_display = f'[LIGHT][COLOR orange][{size_str}][/LIGHT][/COLOR]  ' if show_size and size_str else ''
+                duration_display = f'[LIGHT][COLOR limegreen]· {video["duration_str"] or "N/A"} ·[/LIGHT][/COLOR]' if show_duration_time else ''
+                videos.append(dict(video, formatted=f'{size_display}{video["title"]} {duration_display}'.strip()))
 
         if not videos: 
             if succeeded: 
@@ -950,7 +1088,7 @@ def most_watched():
             else: 
                  xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'WATCHED : Načítání zrušeno nebo selhalo', xbmcgui.NOTIFICATION_WARNING, 4000, sound=False)
         
-        if succeeded and videos:
+        if videos:
             items_to_display = videos[:ls_limit]
             log(f"WATCHED - Zobrazuji {len(items_to_display)}/{len(videos)} položek (limit: {ls_limit}).", xbmc.LOGINFO)
 
@@ -983,12 +1121,6 @@ def most_watched():
         succeeded = False
 
     finally:
-        if progress_dialog:
-            try:
-                progress_dialog.close()
-            except:
-                pass
-
         xbmcplugin.endOfDirectory(_handle, succeeded=succeeded)
 
 
@@ -1658,6 +1790,123 @@ def play_tmdb_trailer(params):
 # ======================================================================================================================= #
 
 
+PLAYLIST_WORKERS = 3     # --- Souběžně hledané a resolvované epizody autoplay playlistu
+
+
+def _resolve_playlist_episode(search_query, episode_meta, cookies):
+
+    """
+    PLAYLIST :: EPISODE WORKER
+    -- Hledání + resolve jedné epizody  ( běží ve vlákně ),  vrací přehratelnou URL nebo None.
+    """
+
+    log(f"PLAYLIST - Hledám zdroj pro {search_query}", xbmc.LOGINFO)
+    results = prehrajto_client.search_sources(search_query, cookies)
+    if not results:
+        log(f"PLAYLIST - Žádné výsledky pro {search_query}", xbmc.LOGWARNING)
+        return None
+
+    playable_url = resolve_video(results[0]['link'], cookies, json.dumps(episode_meta), return_url_only=True)
+    if not playable_url:
+        log(f"PLAYLIST - Selhal resolve pro {search_query}", xbmc.LOGWARNING)
+    return playable_url
+
+
+def _playlist_episode_meta(ep, start_meta, season_num, genres):
+    ep_num = ep.get('episode_number')
+    still_path = ep.get('still_path')
+    thumb = f"{tmdb_client.image_base_url}w500{still_path}" if still_path else start_meta.get('poster')
+    return {
+        'tmdb_id': start_meta.get('tmdb_id'),
+        'title': ep.get('name') or f'Epizoda {ep_num}',
+        'tv_show_title': start_meta.get('tv_show_title'),
+        'season': season_num,
+        'episode': ep_num,
+        'poster': start_meta.get('poster'),
+        'fanart': start_meta.get('fanart'),
+        'genres': genres,
+        'media_type': 'episode',
+        'plot': ep.get('overview', ''),
+        'rating': ep.get('vote_average', 0.0),
+        'thumb': thumb,
+        'year': ep.get('air_date', '')[:4] if ep.get('air_date') else start_meta.get('year', '')
+    }
+
+
+def _playlist_episode_query(episode_meta):
+    return f"{episode_meta['tv_show_title']} S{int(episode_meta['season']):02d}E{int(episode_meta['episode']):02d}"
+
+
+def _playlist_list_item(ep, episode_meta):
+    li = xbmcgui.ListItem(label=f"S{int(episode_meta['season']):02d}E{int(episode_meta['episode']):02d} - {episode_meta['title']}")
+    li.setProperty("IsPlayable", "true")
+
+    info_tag = li.getVideoInfoTag()
+    info_tag.setMediaType('episode')
+    info_tag.setTitle(episode_meta['title'])
+    info_tag.setPlot(ep.get('overview', ''))
+    info_tag.setTvShowTitle(episode_meta['tv_show_title'])
+    info_tag.setSeason(int(episode_meta['season']))
+    info_tag.setEpisode(int(episode_meta['episode']))
+    info_tag.setPremiered(ep.get('air_date', ''))
+    info_tag.setGenres(episode_meta['genres'])
+
+    try:
+        info_tag.setRating(float(ep.get('vote_average', 0.0)))
+    except (ValueError, TypeError):
+        info_tag.setRating(0.0)
+
+    li.setArt({
+        'poster': episode_meta['poster'],
+        'fanart': episode_meta['fanart'],
+        'thumb': episode_meta['thumb'],
+        'icon': episode_meta['thumb']
+    })
+    return li
+
+
+def _prefetch_episode(search_query, cookies):
+
+    """
+    PLAYLIST :: PREFETCH NEXT
+    -- Na pozadí najde a vyřeší zdroj další epizody líného playlistu,
+    -- její  'play'  pak vezme hledání z cache a stream z úložiště vyřešených odkazů.
+    """
+
+    try:
+        results = prehrajto_client.search_sources(search_query, cookies)
+        if not results or abort_requested():
+            return
+        link_full = prehrajto_client.full_link(results[0]['link'])
+        file_url, subtitle_url = prehrajto_client.get_stream(link_full, cookies)
+        if file_url:
+            stream_cache.put_stream(link_full, bool(cookies), file_url, subtitle_url)
+            log(f"PLAYLIST - Další epizoda předem vyřešena : {search_query}", xbmc.LOGINFO)
+    except Exception as e:
+        log(f"PLAYLIST - Chyba při předběžném řešení {search_query}: {e}", xbmc.LOGWARNING)
+
+
+def play_lazy_episode(search_query, meta_param, next_query=None):
+
+    """
+    PLAYLIST :: LAZY ENTRY
+    -- Položka líného playlistu : hledání a resolve až ve chvíli, kdy na ni Kodi dojde.
+    -- Souběžně se připraví další epizoda  ( next_query ),  aby přechod byl okamžitý.
+    """
+
+    cookies = prehrajto_client.get_premium_cookies()
+    if next_query:
+        start_background(_prefetch_episode, next_query, cookies, name='playto-playlist-prefetch')
+
+    results = prehrajto_client.search_sources(search_query, cookies)
+    if not results:
+        log(f"PLAYLIST - Žádné výsledky pro {search_query}", xbmc.LOGWARNING)
+        xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', f'PLAYLIST : Nenalezeno - {search_query}', xbmcgui.NOTIFICATION_ERROR, 4000)
+        xbmcplugin.setResolvedUrl(handle=_handle, succeeded=False, listitem=xbmcgui.ListItem())
+        return
+    resolve_video(results[0]['link'], cookies, meta_param)
+
+
 def create_series_playlist(start_meta):
 
     """
@@ -1714,6 +1963,7 @@ def create_series_playlist(start_meta):
     progress_dialog.create('[COLOR orange]·   VYTVÁŘÍM  [ FUCKING ] PLAYLIST   ·[/COLOR]')
     
     current_season_num = start_season_num
+    playback_started = False
 
     genres_to_set = start_meta.get('genres', [])
 
@@ -1748,80 +1998,83 @@ def create_series_playlist(start_meta):
                     log(f"PLAYLIST - Start od S{current_season_num:02d}E{start_episode_num:02d} (index {i})", xbmc.LOGINFO)
                     break
 
-            for ep in episodes[start_index_in_season:]:
-                if progress_dialog.iscanceled() or items_added >= max_playlist_items:
-                    break
+            if addon.getSettingBool('autolist_lazy'):
 
-                ep_num = ep.get('episode_number')
-                ep_title = ep.get('name') or f'Epizoda {ep_num}'
-                search_query_ep = f"{tv_show_title} S{current_season_num:02d}E{ep_num:02d}"
-                log(f"PLAYLIST - Hledám zdroj pro {search_query_ep}", xbmc.LOGINFO)
-                results_ep = prehrajto_client.search_sources(search_query_ep, cookies)
+                # --- PLAYLIST : Líný režim, položky jsou  'plugin://...?action=play'  a řeší se až při přehrání
 
-                if not results_ep:
-                    log(f"PLAYLIST - Žádné výsledky pro {search_query_ep}", xbmc.LOGWARNING)
-                    continue
+                lazy_entries = [(ep, _playlist_episode_meta(ep, start_meta, current_season_num, genres_to_set)) for ep in episodes[start_index_in_season:start_index_in_season + max_playlist_items]]
+                for i, (ep, episode_meta) in enumerate(lazy_entries):
+                    next_query = _playlist_episode_query(lazy_entries[i + 1][1]) if i + 1 < len(lazy_entries) else ''
+                    entry_url = get_url(action='play', query=_playlist_episode_query(episode_meta), meta=json.dumps(episode_meta), next_query=next_query)
+                    playlist.add(entry_url, _playlist_list_item(ep, episode_meta))
+                    items_added += 1
+                if items_added:
+                    progress_dialog.close()
+                    xbmc.Player().play(playlist)
+                    playback_started = True
+                    log(f"PLAYLIST - Líný playlist s {items_added} epizodami spuštěn", xbmc.LOGINFO)
 
-                selected_source = results_ep[0]
-                source_link = selected_source['link']
-
-                still_path = ep.get('still_path')
-                thumb = f"{tmdb_client.image_base_url}w500{still_path}" if still_path else start_meta.get('poster')
-                
-                episode_full_meta = {
-                    'tmdb_id': tmdb_id,
-                    'title': ep_title,
-                    'tv_show_title': tv_show_title,
-                    'season': current_season_num,
-                    'episode': ep_num,
-                    'poster': start_meta.get('poster'),
-                    'fanart': start_meta.get('fanart'),
-                    'genres': genres_to_set,
-                    'media_type': 'episode',
-                    'plot': ep.get('overview', ''),
-                    'rating': ep.get('vote_average', 0.0),
-                    'thumb': thumb,
-                    'year': ep.get('air_date', '')[:4] if ep.get('air_date') else start_meta.get('year', '')
-                }
-
-                playable_url = resolve_video(
-                    source_link,
-                    cookies,
-                    json.dumps(episode_full_meta),
-                    return_url_only=True
-                )
-                
-                if not playable_url: #
-                    log(f"PLAYLIST - Selhal resolve pro {search_query_ep}", xbmc.LOGWARNING)
-                    continue
+            else:
 
-                li = xbmcgui.ListItem(label=f"S{current_season_num:02d}E{ep_num:02d} - {ep_title}")
-                li.setProperty("IsPlayable", "true")
-
-                info_tag = li.getVideoInfoTag()
-                info_tag.setMediaType('episode')
-                info_tag.setTitle(ep_title)
-                info_tag.setPlot(ep.get('overview', ''))
-                info_tag.setTvShowTitle(tv_show_title)
-                info_tag.setSeason(current_season_num)
-                info_tag.setEpisode(ep_num)
-                info_tag.setPremiered(ep.get('air_date', ''))
-                info_tag.setGenres(genres_to_set)
-                
-                try:
-                    info_tag.setRating(float(ep.get('vote_average', 0.0)))
-                except (ValueError, TypeError):
-                    info_tag.setRating(0.0)
+                # --- PLAYLIST : Epizody se hledají a resolvují souběžně  ( max PLAYLIST_WORKERS rozpracovaných ),
+                # --- do playlistu se ale přidávají v pořadí epizod. Přehrávání startuje hned s první hotovou epizodou.
+
+                pending_episodes = list(episodes[start_index_in_season:])
+                in_flight = {}
+                results = {}
+                next_submit = next_insert = 0
 
-                li.setArt({
-                    'poster': start_meta.get('poster'),
-                    'fanart': start_meta.get('fanart'),
-                    'thumb': thumb,
-                    'icon': thumb
-                })
-                
-                playlist.add(playable_url, li)
-                items_added += 1
+                executor = ThreadPoolExecutor(max_workers=PLAYLIST_WORKERS)
+                try:
+                    while next_insert < len(pending_episodes) and items_added < max_playlist_items:
+                        if not playback_started and progress_dialog.iscanceled():
+                            log("PLAYLIST - Uživatelské zrušení playlistu", xbmc.LOGINFO)
+                            break
+
+                        # --- Doplnit rozpracované epizody, nejvýš tolik, kolik ještě chybí do limitu
+                        needed = max_playlist_items - items_added
+                        while next_submit < len(pending_episodes) and len(in_flight) < min(PLAYLIST_WORKERS, needed):
+                            ep = pending_episodes[next_submit]
+                            episode_full_meta = _playlist_episode_meta(ep, start_meta, current_season_num, genres_to_set)
+                            search_query_ep = _playlist_episode_query(episode_full_meta)
+                            future = executor.submit(_resolve_playlist_episode, search_query_ep, episode_full_meta, cookies)
+                            in_flight[future] = (next_submit, episode_full_meta)
+                            next_submit += 1
+
+                        done, _ = wait(in_flight, timeout=0.5, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            index, episode_full_meta = in_flight.pop(future)
+                            try:
+                                results[index] = (future.result(), episode_full_meta)
+                            except Exception as e:
+                                log(f"PLAYLIST - Chyba při zpracování epizody : {e}", xbmc.LOGERROR)
+                                results[index] = (None, episode_full_meta)
+
+                        # --- Vložit hotové epizody v pořadí
+                        while next_insert in results and items_added < max_playlist_items:
+                            playable_url, episode_full_meta = results.pop(next_insert)
+                            ep = pending_episodes[next_insert]
+                            next_insert += 1
+                            if not playable_url:
+                                continue
+
+                            ep_num = ep.get('episode_number')
+                            li = _playlist_list_item(ep, episode_full_meta)
+                            playlist.add(playable_url, li)
+                            items_added += 1
+
+                            if not playback_started:
+                                progress_dialog.close()
+                                xbmc.Player().play(playlist)
+                                playback_started = True
+                                log(f"PLAYLIST - Spouštím playlist od S{current_season_num:02d}E{ep_num:02d}, další epizody se doplňují", xbmc.LOGINFO)
+
+                        if not playback_started:
+                            progress_dialog.update(int(next_insert * 100 / max(1, len(pending_episodes))), f"Zpracováno epizod : {next_insert} / {len(pending_episodes)}")
+                finally:
+                    for future in in_flight:
+                        future.cancel()
+                    executor.shutdown(wait=False)
 
     except Exception as e:
         log(f"PLAYLIST - Neočekávaná chyba : {e}\n{traceback.format_exc()}", xbmc.LOGERROR)
@@ -1834,8 +2087,7 @@ def create_series_playlist(start_meta):
 
     try:
         if items_added > 0:
-            xbmc.Player().play(playlist)
-            log(f"PLAYLIST - Spouštím playlist s {items_added} epizodami", xbmc.LOGINFO)
+            log(f"PLAYLIST - Playlist obsahuje {items_added} epizod", xbmc.LOGINFO)
         else:
             log("PLAYLIST - Playlist je prázdný, nespouštím", xbmc.LOGWARNING)
             xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'PLAYLIST : Nenašel jsem žádné další epizody', xbmcgui.NOTIFICATION_ERROR, 4000)
@@ -1864,6 +2116,7 @@ def menu():
         ('[B][COLOR orange]·  [/COLOR][/B]TIPY ČSFD', 'list_csfd_daily_tips', 'None', '', 'special://home/addons/plugin.video.play_to/resources/icons/CSFD.png'),
         ('[B][COLOR orange]·  [/COLOR][/B]MANAGER', 'series_menu', 'None', '', 'special://home/addons/plugin.video.play_to/resources/icons/PODCAST.png'),
         ('[B][COLOR orange]·  [/COLOR][/B]SPEEDTEST', 'diagnose_speed', 'None', '', 'special://home/addons/plugin.video.play_to/resources/icons/SPEED.png'),
+        ('[B][COLOR orange]·  [/COLOR][/B]CACHE', 'cache_diagnostics', 'None', '', 'special://home/addons/plugin.video.play_to/resources/icons/INFO.png'),
         ('[B][COLOR limegreen][ NASTAVENÍ ][/COLOR][/B]', 'open_settings', 'None', '', 'special://home/addons/plugin.video.play_to/resources/icons/SETTINGS.png')
     ]
 
@@ -1886,7 +2139,7 @@ def menu():
         list_item = xbmcgui.ListItem(label=label)
 
         is_folder = True
-        if action in ['open_settings', 'diagnose_speed']:
+        if action in ['open_settings', 'diagnose_speed', 'cache_diagnostics']:
             url = get_url(action=action)
             is_folder = False
 
@@ -1955,8 +2208,7 @@ def router(paramstring):
 
     if GLOBAL_TRAKT_MONITOR is None and not main_window.getProperty(monitor_initialized_flag) == "true":
         try:
-            monitor_session = requests.Session()
-            GLOBAL_TRAKT_MONITOR = trakt.KodiPlayerMonitor(session=monitor_session, addon=addon, save_playback_history_func=save_playback_history)
+            GLOBAL_TRAKT_MONITOR = trakt.KodiPlayerMonitor(session=session, addon=addon, save_playback_history_func=save_playback_history)
             main_window.setProperty(monitor_initialized_flag, "true")
             log("ROUTER - Globální monitor úspěšně inicializován  ( PRVNÍ INSTANCE )", xbmc.LOGINFO)
             monitor_initialized_by_this_instance = True
@@ -2054,15 +2306,18 @@ def router(paramstring):
     elif action == 'listing_on_the_air':
         tmdb_client.list_on_the_air(params.get('page', '1'), params.get('type'))
     elif action == 'find_sources':
-        prehrajto_client.find_and_list_sources(params.get('meta'))
+        prehrajto_client.find_and_list_sources(params.get('meta'), params.get('page', '1'))
     elif action == 'listing_tmdb_tv':
         tmdb_client.show_tv_detail(params.get('tmdb_id'), params.get('meta'))
     elif action == 'tmdb_tv_season':
         tmdb_client.show_tv_season(params.get('tmdb_id'), params.get('season'), params.get('meta'))
     elif action == 'play':
-        cookies = prehrajto_client.get_premium_cookies()
         meta_param = params.get('meta', '{}')
-        resolve_video(params.get('link'), cookies, meta_param)
+        if params.get('query') and not params.get('link'):
+            play_lazy_episode(params.get('query'), meta_param, params.get('next_query'))
+        else:
+            cookies = prehrajto_client.get_premium_cookies()
+            resolve_video(params.get('link'), cookies, meta_param)
     elif action == 'create_series_playlist_action':
         try:
             meta_json = params.get('meta')
@@ -2079,28 +2334,17 @@ def router(paramstring):
     elif action == 'clear_most_watched_cache':
         try:
             current_category = addon.getSetting('category') or '12 HODIN'
-            try:
-                current_max_pages = int(addon.getSetting('max_pages') or '2')
-                if current_max_pages <= 0: current_max_pages = 2
-            except ValueError:
-                current_max_pages = 2
-            cache_name_to_clear = f"most_watched_{current_category.replace(' ', '_')}_{current_max_pages}"
-            cache_dir = _get_cache_dir()
-            if cache_dir:
-                cache_file_to_clear = os.path.join(cache_dir, f"{cache_name_to_clear}.json")
-                if xbmcvfs.exists(cache_file_to_clear):
-                    log(f"| PLAY.TO DEBUG CACHE - Mažu cache soubor (podle aktuálního nastavení) : {cache_file_to_clear}", xbmc.LOGINFO)
-                    deleted = xbmcvfs.delete(cache_file_to_clear)
-                    if deleted:
-                        xbmcgui.Dialog().notification('[B][COLOR limegreen]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Byla vymazána', xbmcgui.NOTIFICATION_INFO, 3000)
-                    else:
-                         xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Nepodařilo se smazat', xbmcgui.NOTIFICATION_ERROR, 3000)
+            cache_prefix = f"most_watched_{current_category.replace(' ', '_')}_"
+            cache_keys = _cache_store().keys(PLUGIN_CACHE_NAMESPACE, cache_prefix)
+            if cache_keys:
+                log(f"| PLAY.TO DEBUG CACHE - Mažu cache : {cache_prefix}*  ( {len(cache_keys)} stránek )", xbmc.LOGINFO)
+                if delete_cache_prefix(cache_prefix):
+                    xbmcgui.Dialog().notification('[B][COLOR limegreen]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Byla vymazána', xbmcgui.NOTIFICATION_INFO, 3000)
                 else:
-                    log(f"| PLAY.TO DEBUG CACHE - Cache soubor pro smazání (podle aktuálního nastavení) nenalezen: {cache_file_to_clear}", xbmc.LOGINFO)
-                    xbmcgui.Dialog().notification('[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Již neexistuje, nebo nebyla vytvořena', xbmcgui.NOTIFICATION_INFO, 3000)
+                    xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Nepodařilo se smazat', xbmcgui.NOTIFICATION_ERROR, 3000)
             else:
-                 log("| PLAY.TO DEBUG CACHE - Nelze získat adresář cache pro smazání.", xbmc.LOGERROR)
-                 xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'CACHE : Nelze získat data', xbmcgui.NOTIFICATION_ERROR, 3000)
+                log(f"| PLAY.TO DEBUG CACHE - Cache pro smazání nenalezena: {cache_prefix}*", xbmc.LOGINFO)
+                xbmcgui.Dialog().notification('[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', f'CACHE  "{current_category}"  Již neexistuje, nebo nebyla vytvořena', xbmcgui.NOTIFICATION_INFO, 3000)
             xbmc.executebuiltin('Container.Refresh()')
         except Exception as e:
             log(f"ERROR - Chyba při mazání cache 'Sledované' : {e}\n{traceback.format_exc()}", xbmc.LOGERROR)
@@ -2110,31 +2354,25 @@ def router(paramstring):
     elif action == 'list_csfd_daily_tips':
         list_csfd_daily_tips()
     elif action == 'trakt_menu':
-        session = requests.Session()
         trakt.trakt_menu(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_watchlist':
-        session = requests.Session()
         trakt.trakt_watchlist(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_list_seasons' or action == 'trakt_list_episodes':
-        session = requests.Session()
         trakt.list_seasons(params, addon=addon, handle=_handle, session=session) if action == 'trakt_list_seasons' else trakt.list_episodes(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_add_to_watchlist':
-        session = requests.Session()
         trakt.trakt_add_to_watchlist(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_popular_lists':
-        session = requests.Session()
         trakt.trakt_popular_lists(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_recommended':
-        session = requests.Session()
         trakt.trakt_recommended(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_trending':
-        session = requests.Session()
         trakt.trakt_trending(params, addon=addon, handle=_handle, session=session)
     elif action == 'trakt_genres':
-        session = requests.Session()
         trakt.trakt_genres(params, addon=addon, handle=_handle, session=session) #
     elif action == 'listing_search':
         search(params.get('name'))
+    elif action == 'listing_search_page':
+        search_page(params.get('query'), params.get('page', '1'), json.loads(params.get('meta') or '{}'))
     elif action == 'find_meta_and_resolve':
         search(params.get('title'), resolve_first=True)
     elif action == 'listing_history':
@@ -2318,6 +2556,10 @@ def router(paramstring):
         xbmc.executebuiltin('Addon.OpenSettings(plugin.video.play_to)')
     elif action == 'diagnose_speed':
         speedtest.diagnose_speed(addon)
+    elif action == 'cache_maintenance':
+        cache_maintenance()
+    elif action == 'cache_diagnostics':
+        cache_diagnostics()
     elif action == 'series_menu':
         create_series_menu()
     elif action == 'series_search':
@@ -2355,6 +2597,10 @@ def router(paramstring):
     elif action:
          log(f"ROUTER - Neznámá akce : {action}", xbmc.LOGWARNING)
 
+    if action not in ('play', 'cache_maintenance', 'cache_diagnostics'):
+        schedule_cache_gc()
+    join_background()
+
     # ---------------------------
     #   MONITORU KEEP-ALIVE
     # ---------------------------
@@ -13,38 +13,113 @@
 
 
 import xbmc
+import xbmcvfs
 import xbmcgui
 import xbmcplugin
 
+import os
 import re
-import ast
 import json
+import time
+import hashlib
+import requests
+import threading
 
-from bs4 import BeautifulSoup
 from urllib.parse import quote, urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
-from resources.lib.utils import get_url, log, clean_title_for_tmdb, convert_size_to_bytes, duration_to_seconds, safe_get, safe_post
+from resources.lib.cards import parse_search_page
+from resources.lib.classifier import get_classifier
+from resources.lib import stream_cache
+from resources.lib import speedtest
+from resources.lib.stream_parser import parse_player_config
+from resources.lib.utils import get_url, log, clean_title_for_tmdb, safe_get, safe_post, start_background, abort_requested
+
+
+
+
+SEARCH_WORKERS = 4      # --- Maximální počet souběžně stahovaných stránek
+SEARCH_LOOKAHEAD = 2    # --- Počet stránek stahovaných spekulativně za první nedokončenou
+SEARCH_CACHE_MAX_STALE_HOURS = 72   # --- Starší záznam se už nevydává ani jako 'stale', stahuje se synchronně
+
+PREMIUM_SESSION_FILE = 'prehrajto_session.json'
+PREMIUM_PROBE_INTERVAL = 6 * 3600        # --- Jak často ověřit uložené přihlášení dotazem na server
+PREMIUM_SESSION_MAX_AGE = 7 * 86400      # --- Maximální stáří relace, pokud cookies nenesou vlastní expiraci
+
+_LOGGED_IN_RE = re.compile(rb'<span\b[^>]*class="[^"]*\bcolor-green\b', re.IGNORECASE)
 
 
 
 
 class PrehrajTo:
-    def __init__(self, addon, handle, session, tmdb_client):
+    _refreshing = set()
+    _refresh_lock = threading.Lock()
+    _login_lock = threading.Lock()
+    _premium_session = None
+
+    def __init__(self, addon, handle, session, tmdb_client, load_cache_entry_func=None, save_cache_func=None, record_cache_func=None):
         self.addon = addon
         self._handle = handle
         self.session = session
         self.tmdb = tmdb_client
+        self.load_cache_entry = load_cache_entry_func
+        self.save_cache = save_cache_func
+        self.record_cache = record_cache_func or (lambda cache_name, event: None)
         self.headers = {'user-agent': 'kodi/play.to'}
         self.base_url = 'https://prehraj.to'
 
 
-    def get_premium_cookies(self):
-        email = self.addon.getSetting('email')
-        password = self.addon.getSetting('password')
-        if not email or not password:
+    # --- PREMIUM : Perzistentní přihlášení  ( cookie jar v profilu )
+
+    def _premium_session_path(self):
+        return os.path.join(xbmcvfs.translatePath(self.addon.getAddonInfo('profile')), PREMIUM_SESSION_FILE)
+
+
+    def _credentials_key(self, email, password):
+        return hashlib.sha256(f"{email}\n{password}".encode('utf-8')).hexdigest()
+
+
+    def _load_premium_session(self):
+        path = self._premium_session_path()
+        if not xbmcvfs.exists(path):
             return None
+        try:
+            with xbmcvfs.File(path, 'r') as f:
+                content = f.read()
+            return json.loads(content) if content else None
+        except Exception as e:
+            log(f"PREHRAJTO - Chyba při načítání uložené relace: {e}", xbmc.LOGERROR)
+            return None
+
+
+    def _save_premium_session(self, state):
+        try:
+            with xbmcvfs.File(self._premium_session_path(), 'w') as f:
+                f.write(json.dumps(state))
+        except Exception as e:
+            log(f"PREHRAJTO - Chyba při ukládání relace: {e}", xbmc.LOGERROR)
+
+
+    def _cookies_to_jar(self, stored):
+        jar = requests.cookies.RequestsCookieJar()
+        for c in stored:
+            jar.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'), expires=c.get('expires'))
+        return jar
+
+
+    def _session_valid(self, state, credentials_key):
+        if not state or state.get('key') != credentials_key or not state.get('cookies'):
+            return False
+        return time.time() < state.get('expires', 0)
 
+
+    def _probe_premium_session(self, jar):
+        res = safe_get(self.session, self.base_url + '/', cookies=jar, headers=self.headers, timeout=10)
+        return bool(res is not None and _LOGGED_IN_RE.search(res.content))
+
+
+    def _login(self, email, password, credentials_key):
         login_data = {
             'password': password, 'email': email, '_submit': 'Přihlásit+se',
             'remember': 'on', '_do': 'login-loginForm-submit'
@@ -52,81 +127,476 @@ class PrehrajTo:
         try:
             # add timeout to prevent blocking indefinitely
             res = safe_post(self.session, self.base_url + '/', data=login_data, timeout=10)
-            soup = BeautifulSoup(res.content, 'html.parser')
-            if soup.find('span', {'class': 'color-green'}):
-                return res.cookies
+            if res is None or not _LOGGED_IN_RE.search(res.content):
+                log("PREHRAJTO - Přihlášení se nezdařilo", xbmc.LOGWARNING)
+                return None
+
+            stored = []
+            for r in res.history + [res]:
+                for c in r.cookies:
+                    stored.append({'name': c.name, 'value': c.value, 'domain': c.domain, 'path': c.path, 'expires': c.expires})
+            now = time.time()
+            cookie_expiry = [c['expires'] for c in stored if c['expires']]
+            state = {
+                'key': credentials_key,
+                'cookies': stored,
+                'expires': min(cookie_expiry + [now + PREMIUM_SESSION_MAX_AGE]),
+                'checked': now
+            }
+            self._save_premium_session(state)
+            log("PREHRAJTO - Přihlášeno, relace uložena do profilu", xbmc.LOGINFO)
+            return state
         except Exception as e:
             log(f"PREHRAJTO - Chyba při přihlašování: {e}", xbmc.LOGERROR)
         return None
 
 
+    def get_premium_cookies(self, force_check=False):
+
+        """
+        PREHRAJTO :: PREMIUM COOKIES
+        -- Vrací cookies uložené relace, přihlašuje se jen když relace chybí, vypršela
+        -- nebo ji server při ověření  ( nejvýše jednou za PREMIUM_PROBE_INTERVAL )  odmítne.
+        -- Souběžní volající čekají na jediné probíhající přihlášení  ( _login_lock )
+        """
+
+        email = self.addon.getSetting('email')
+        password = self.addon.getSetting('password')
+        if not email or not password:
+            return None
+
+        credentials_key = self._credentials_key(email, password)
+        with PrehrajTo._login_lock:
+            state = PrehrajTo._premium_session
+            if state is None or state.get('key') != credentials_key:
+                state = self._load_premium_session()
+
+            if self._session_valid(state, credentials_key):
+                jar = self._cookies_to_jar(state['cookies'])
+                if not force_check and time.time() - state.get('checked', 0) < PREMIUM_PROBE_INTERVAL:
+                    PrehrajTo._premium_session = state
+                    return jar
+                if self._probe_premium_session(jar):
+                    state['checked'] = time.time()
+                    self._save_premium_session(state)
+                    PrehrajTo._premium_session = state
+                    return jar
+                log("PREHRAJTO - Uložená relace je neplatná, přihlašuji znovu", xbmc.LOGINFO)
+
+            state = self._login(email, password, credentials_key)
+            PrehrajTo._premium_session = state
+            return self._cookies_to_jar(state['cookies']) if state else None
+
+
+    def get_video_streams(self, page_content):
+
+        """
+        PREHRAJTO :: VIDEO STREAMS
+        -- Všechny kvality  ( StreamSource )  a titulky  ( SubtitleTrack )  z konfigurace přehrávače na stránce videa.
+        """
+
+        return parse_player_config(page_content)
+
+
     def get_video_link(self, page_content):
-        soup = BeautifulSoup(page_content, 'html.parser')
-        pattern = re.compile(r'var sources = \[(.*?);', re.DOTALL)
-        script = soup.find('script', string=pattern)
-        if not script: return None, None
+        sources, tracks = self.get_video_streams(page_content)
+        return (sources[0].url if sources else None), (tracks[0].url if tracks else None)
+
+
+    def full_link(self, link):
+        return link if 'prehraj.to' in link else self.base_url + urlparse(link).path
+
+
+    def resolve_stream(self, link, cookies):
+
+        """
+        PREHRAJTO :: RESOLVE STREAM
+        -- Stránka videa  ->  ( file_url, subtitle_url ),  pro premium navíc přímý odkaz z '?do=download'
+        -- Pokud premium odkaz nepřijde, ověří relaci a po novém přihlášení to zkusí jednou znovu.
+        """
+
+        file_url, subtitle_url, _ = self._resolve_stream(link, cookies)
+        return file_url, subtitle_url
 
-        file_url, subtitle_url = None, None
+
+    def _resolve_stream(self, link, cookies):
+        # --- ( file_url, subtitle_url, dead ) :  dead = video definitivně není  ( 404 / 410, stránka bez zdroje ),
+        # --- ne jen dočasná chyba  ( timeout, spojení, 5xx )
+        link_full = self.full_link(link)
         try:
-            sources = pattern.findall(script.string)[0]
-            file_match = re.search(r'file:\s*"(.*?)"|src:\s*"(.*?)"', sources, re.DOTALL)
-            file_url = file_match.group(1) or file_match.group(2)
-        except:
-            pass
+            resp = self.session.get(link_full, cookies=cookies, headers=self.headers, timeout=15)
+        except requests.exceptions.RequestException as e:
+            log(f"PREHRAJTO - Stránku videa nelze načíst : {e}", xbmc.LOGWARNING)
+            return None, None, False
+        if resp.status_code in (404, 410):
+            return None, None, True
+        if resp.status_code != 200:
+            log(f"PREHRAJTO - Stránka videa vrátila {resp.status_code} : {link_full}", xbmc.LOGWARNING)
+            return None, None, False
+        file_url, subtitle_url = self.get_video_link(resp.content)
+        if not file_url:
+            return None, None, True
+        if not cookies:
+            return file_url, subtitle_url, False
 
         try:
-            pattern2 = re.compile(r'var tracks = (.*?);', re.DOTALL)
-            script2 = soup.find('script', string=pattern2)
-            if script2:
-                raw = pattern2.findall(script2.string)[0]
-                data = ast.literal_eval(raw.strip())
-                subtitle_url = data[0]['src']
-        except:
-            pass
+            res = safe_get(self.session, f"{link_full}?do=download", cookies=cookies, headers=self.headers, allow_redirects=False, timeout=10)
+            if not (res and 'Location' in res.headers):
+
+                # --- RESOLVE : Premium odkaz nevrácen, ověřit relaci a případně se jednou přihlásit znovu
+
+                log("PREHRAJTO - Premium odkaz nevrácen, ověřuji přihlášení ...", xbmc.LOGINFO)
+                previous_cookies = requests.utils.dict_from_cookiejar(cookies) if hasattr(cookies, 'items') else cookies
+                fresh_cookies = self.get_premium_cookies(force_check=True)
+                if fresh_cookies and requests.utils.dict_from_cookiejar(fresh_cookies) != previous_cookies:
+                    res = safe_get(self.session, f"{link_full}?do=download", cookies=fresh_cookies, headers=self.headers, allow_redirects=False, timeout=10)
+            if res and 'Location' in res.headers:
+                file_url = res.headers['Location']
+        except requests.exceptions.RequestException as e:
+            log(f"PREHRAJTO - Chyba při získávání premium odkazu : {e}", xbmc.LOGERROR)
+        return file_url, subtitle_url, False
+
+
+    def get_stream(self, link, cookies):
+
+        """
+        PREHRAJTO :: STREAM
+        -- 1. úložiště předem vyřešených odkazů  ( okno, krátké TTL )
+        -- 2. trvalé úložiště  ( expirace z podpisu CDN )  po ověření Range dotazem
+        -- 3. plné resolve_stream,  výsledek se uloží do trvalého úložiště
+        """
+
+        link_full = self.full_link(link)
+        premium = bool(cookies)
+        cached = stream_cache.get_stream(link_full, premium)
+        if cached and cached[0]:
+            log(f"PREHRAJTO - Odkaz z úložiště předem vyřešených : {link_full}", xbmc.LOGINFO)
+            return cached
+
+        stored = stream_cache.load_resolved(link_full, premium)
+        if stored and stored[0]:
+            if stream_cache.stream_alive(self.session, stored[0], self.headers):
+                log(f"PREHRAJTO - Odkaz z trvalého úložiště : {link_full}", xbmc.LOGINFO)
+                return stored
+            log(f"PREHRAJTO - Uložený odkaz už neplatí, řeším znovu : {link_full}", xbmc.LOGINFO)
+            stream_cache.forget_resolved(link_full, premium)
+
+        file_url, subtitle_url, dead = self._resolve_stream(link_full, cookies)
+        if file_url:
+            stream_cache.save_resolved(link_full, premium, file_url, subtitle_url)
+        elif dead:
+            stream_cache.mark_failed(link_full)
         return file_url, subtitle_url
 
 
+    def race_resolve(self, videos, cookies, count=3):
+
+        """
+        PREHRAJTO :: RACE RESOLVE
+        -- Souběžně vyřeší prvních  count  zdrojů z pořadí a vrátí první úspěšný  ( video, file_url, subtitle_url ),
+        -- případně None.  Vítěz se uloží do stream_cache,  resolve_video ho dostane rovnou  ( stream= ).
+        -- Po výhře se nezačaté úlohy zruší, rozběhnuté doběhnou na pozadí.
+        -- Odkazy z negativní cache  ( mrtvá videa, viz get_stream )  se do závodu nezařazují.
+        """
+
+        candidates = [v for v in videos if not stream_cache.is_failed(self.full_link(v['link']))][:max(1, count)]
+        if not candidates:
+            return None
+
+        premium = bool(cookies)
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        pending = {executor.submit(self.get_stream, v['link'], cookies): v for v in candidates}
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    video = pending.pop(future)
+                    try:
+                        file_url, subtitle_url = future.result()
+                    except Exception as e:
+                        log(f"PREHRAJTO - Chyba při řešení {video['link']}: {e}", xbmc.LOGWARNING)
+                        continue
+                    if file_url:
+                        log(f"PREHRAJTO - Závod vyhrál : {video['title']}", xbmc.LOGINFO)
+                        stream_cache.put_stream(self.full_link(video['link']), premium, file_url, subtitle_url)
+                        return video, file_url, subtitle_url
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+        return None
+
+
+    def cached_stream_url(self, link, cookies):
+        # --- Už vyřešená URL streamu z úložišť  ( bez síťového dotazu ),  jinak None
+        link_full = self.full_link(link)
+        premium = bool(cookies)
+        stored = stream_cache.get_stream(link_full, premium) or stream_cache.load_resolved(link_full, premium)
+        return stored[0] if stored else None
+
+
+    def rank_by_speed(self, videos, cookies):
+
+        """
+        PREHRAJTO :: SPEED RANKING
+        -- Odhad a filtr rychlosti  ( speedtest.rank_sources ),  pokud je zapnutý.
+        -- Použije jen rychlosti hostitelů změřené dříve  ( prefetch, probe_speeds ),  nic nestahuje.
+        """
+
+        return speedtest.rank_sources(videos, lambda v: self.cached_stream_url(v['link'], cookies), self.addon)
+
+
+    def probe_speeds(self, videos, cookies):
+        # --- Po závodu auto-play změří na pozadí hostitele už vyřešených zdrojů, příští řazení je pak zná
+        if not (self.addon.getSettingBool('show_speed_info') or self.addon.getSettingBool('enable_max_speed_filter')):
+            return
+        file_urls = [self.cached_stream_url(v['link'], cookies) for v in videos]
+        start_background(speedtest.probe_hosts, [u for u in file_urls if u], name='playto-speed-probe')
+
+
+    def prefetch_streams(self, videos, cookies):
+
+        """
+        PREHRAJTO :: PREFETCH
+        -- Volitelně  ( 'prefetch_sources' )  vyřeší na pozadí prvních N odkazů výpisu
+        -- a uloží je do stream_cache, aby následné přehrání nemuselo stahovat stránku videa.
+        """
+
+        if not self.addon.getSettingBool('prefetch_sources') or not videos:
+            return
+        try:
+            count = int(self.addon.getSetting('prefetch_count') or '3')
+        except ValueError:
+            count = 3
+        premium = bool(cookies)
+        links = [self.full_link(v['link']) for v in videos[:max(0, count)]]
+        links = [link for link in links if not stream_cache.get_stream(link, premium)]
+        if not links:
+            return
+
+        # --- Na pozadí se rovnou změří i hostitel CDN, další výpisy pak rychlost znají bez čekání
+        measure_speed = self.addon.getSettingBool('show_speed_info') or self.addon.getSettingBool('enable_max_speed_filter')
+
+        def _worker():
+            for link in links:
+                if abort_requested():
+                    log("PREHRAJTO - Předběžné řešení přerušeno, Kodi se ukončuje", xbmc.LOGINFO)
+                    return
+                try:
+                    file_url, subtitle_url = self.resolve_stream(link, cookies)
+                    if file_url:
+                        stream_cache.put_stream(link, premium, file_url, subtitle_url)
+                        stream_cache.save_resolved(link, premium, file_url, subtitle_url)
+                        if measure_speed:
+                            speedtest.host_speed(file_url)
+                except Exception as e:
+                    log(f"PREHRAJTO - Chyba při předběžném řešení {link}: {e}", xbmc.LOGWARNING)
+            log(f"PREHRAJTO - Předem vyřešeno {len(links)} odkazů", xbmc.LOGINFO)
+
+        start_background(_worker, name='playto-prefetch')
+
+
     def _scrape_search_page(self, url, cookies):
         videos = []
         try:
             resp = safe_get(self.session, url, cookies=cookies, headers=self.headers, timeout=15)
-            html = resp.content if resp is not None else b''
-            soup = BeautifulSoup(html, 'html.parser')
-            video_links = soup.find_all('a', {'class': 'video--link'})
-            for v in video_links:
-                title_elem = v.find('h3', {'class': 'video__title'})
-                size_elem = v.find('div', {'class': 'video__tag--size'})
-                time_elem = v.find('div', {'class': 'video__tag--time'})
-                if not title_elem or not v.get('href'):
+            if resp is None:
+                return None
+            cards, has_next = parse_search_page(resp.content)
+            for card in cards:
+                if not card.title or not card.href:
                     continue
 
                 videos.append({
-                    'title': title_elem.text.strip(),
-                    'link': self.base_url + v['href'],
-                    'size_str': size_elem.text.strip() if size_elem else '',
-                    'duration_str': time_elem.text.strip() if time_elem else ''
+                    'title': card.title,
+                    'link': self.base_url + card.href,
+                    'size_str': card.size,
+                    'duration_str': card.duration
                 })
-            next_page = soup.find('a', {'title': 'Zobrazit další'})
-            return videos, bool(next_page)
+            return videos, has_next
         except Exception as e:
             log(f"PREHRAJTO - Chyba při scrapování stránky {url}: {e}", xbmc.LOGERROR)
-            return [], False
+            return None
+
+
+    def _search_url(self, query, page):
+        return f'{self.base_url}/hledej/{quote(query)}?vp-page={page}'
+
+
+    # --- SEARCH CACHE : Stale-while-revalidate
 
+    def _search_cache_name(self, query, page):
+        normalized = ' '.join(query.lower().split())
+        digest = hashlib.md5(normalized.encode('utf-8')).hexdigest()[:16]
+        return f"search_{digest}_p{page}"
+
+
+    def _search_cache_ttl(self):
+        try:
+            return max(0, int(self.addon.getSetting('search_cache_ttl') or '6'))
+        except ValueError:
+            return 6
+
+
+    def _download_search_page(self, query, page, cookies, cache_name=None):
+        result = self._scrape_search_page(self._search_url(query, page), cookies)
+        if result is None:
+            return None
+        if cache_name and self.save_cache:
+            videos, has_next = result
+            self.save_cache(cache_name, {'videos': videos, 'has_next': has_next})
+        return result
 
-    def search_sources(self, query, cookies):
+
+    def _refresh_search_page(self, query, page, cookies, cache_name):
+        try:
+            if not abort_requested():
+                self._download_search_page(query, page, cookies, cache_name)
+        finally:
+            with PrehrajTo._refresh_lock:
+                PrehrajTo._refreshing.discard(cache_name)
+
+
+    def _schedule_refresh(self, query, page, cookies, cache_name):
+        with PrehrajTo._refresh_lock:
+            if cache_name in PrehrajTo._refreshing:
+                return
+            PrehrajTo._refreshing.add(cache_name)
+        log(f"PREHRAJTO - Cache hledání '{query}' str. {page} je prošlá, obnovuji na pozadí", xbmc.LOGINFO)
+        start_background(self._refresh_search_page, query, page, cookies, cache_name, name=f'playto-search-{cache_name}')
+
+
+    def _fetch_search_page(self, query, page, cookies):
+
+        """
+        PREHRAJTO :: SEARCH PAGE
+        -- Jedna stránka hledání přes cache  ( klíč : normalizovaný dotaz + stránka )
+        -- Čerstvý záznam se vrátí hned, prošlý  ( do SEARCH_CACHE_MAX_STALE_HOURS )  také,
+        -- ale zároveň se obnoví na pozadí. Jinak se stránka stáhne synchronně.
+        -- Výsledek je vždy nefiltrovaný, filtry z nastavení se aplikují až nad ním.
+        """
+
+        ttl_hours = self._search_cache_ttl()
+        if not ttl_hours or not self.load_cache_entry:
+            return self._download_search_page(query, page, cookies) or ([], False)
+
+        cache_name = self._search_cache_name(query, page)
+        entry = self.load_cache_entry(cache_name)
+        age_hours = None
+        if entry and isinstance(entry.get('data'), dict):
+            age_hours = (time.time() - entry.get('timestamp', 0)) / 3600
+            if age_hours < ttl_hours:
+                self.record_cache(cache_name, 'hits')
+                return entry['data'].get('videos', []), bool(entry['data'].get('has_next'))
+
+        # --- Stejně jako plugin.load_cache / load_stale_cache a trakt : prošlý záznam = 'misses' + 'stale_hits'
+
+        self.record_cache(cache_name, 'misses')
+        if age_hours is not None and age_hours < SEARCH_CACHE_MAX_STALE_HOURS:
+            self.record_cache(cache_name, 'stale_hits')
+            self._schedule_refresh(query, page, cookies, cache_name)
+            return entry['data'].get('videos', []), bool(entry['data'].get('has_next'))
+        return self._download_search_page(query, page, cookies, cache_name) or ([], False)
+
+
+    def search_sources(self, query, cookies, runtime=0):
         search_pages = int(self.addon.getSetting('search_pages') or '2')
         search_ls = int(self.addon.getSetting('search_ls') or '56')
+
+        if self.addon.getSettingBool('search_concurrent') and search_pages > 1:
+            all_videos = self._search_pages_concurrent(query, cookies, search_pages, search_ls)
+            return self._filter_and_sort_videos(all_videos, runtime)
+
         all_videos = []
         for p in range(1, search_pages + 1):
-            url = f'{self.base_url}/hledej/{quote(query)}?vp-page={p}'
-            videos, has_next = self._scrape_search_page(url, cookies)
+            videos, has_next = self._fetch_search_page(query, p, cookies)
             all_videos.extend(videos)
             if not has_next or len(all_videos) >= search_ls:
                 break
-        return self._filter_and_sort_videos(all_videos)
+        return self._filter_and_sort_videos(all_videos, runtime)
+
+
+    def search_page(self, query, cookies, page=1, runtime=0):
+
+        """
+        PREHRAJTO :: PAGED SEARCH
+        -- Jedna stránka hledání  ( přes cache )  už vyfiltrovaná a seřazená.
+        -- Pokud filtry stránku vyprázdní, pokračuje na další, nejvýše 'search_pages' stránek.
+        -- Vrací  ( videa, číslo_další_stránky  nebo  0 )
+        """
+
+        max_skip = int(self.addon.getSetting('search_pages') or '2')
+        for _ in range(max(1, max_skip)):
+            videos, has_next = self._fetch_search_page(query, page, cookies)
+            filtered = self._filter_and_sort_videos(videos, runtime)
+            if filtered or not has_next:
+                return filtered, page + 1 if has_next else 0
+            page += 1
+        return [], page
+
+
+    def _search_pages_concurrent(self, query, cookies, search_pages, search_ls):
+
+        """
+        PREHRAJTO :: CONCURRENT SEARCH
+        -- Stahuje stránky hledání paralelně v omezeném poolu  ( SEARCH_WORKERS )
+        -- Spekulativně drží rozjeté jen malé okno stránek  ( SEARCH_LOOKAHEAD )
+        -- Jakmile stránka nemá odkaz 'Zobrazit další', zbylé stránky se zruší.
+        -- Výsledky se skládají v pořadí stránek, výstup je tedy stejný jako sekvenční.
+        """
+
+        pages = {}
+        pending = {}
+        last_page = search_pages
+        next_page = 1
+        done_prefix = 0
+        prefix_count = 0
+
+        executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+        try:
+            while True:
+                window_end = min(last_page, done_prefix + 1 + SEARCH_LOOKAHEAD)
+                while next_page <= window_end:
+                    future = executor.submit(self._fetch_search_page, query, next_page, cookies)
+                    pending[future] = next_page
+                    next_page += 1
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    page = pending.pop(future)
+                    videos, has_next = future.result()
+                    pages[page] = videos
+                    if not has_next and page < last_page:
+                        last_page = page
+
+                while done_prefix + 1 in pages and done_prefix < last_page:
+                    done_prefix += 1
+                    prefix_count += len(pages[done_prefix])
+                    if prefix_count >= search_ls:
+                        last_page = done_prefix
+                        break
+
+                for future, page in list(pending.items()):
+                    if page > last_page:
+                        future.cancel()
+                        del pending[future]
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+        log(f"PREHRAJTO - Paralelní hledání '{query}' : staženo {len([p for p in pages if p <= last_page])} stránek", xbmc.LOGINFO)
+
+        all_videos = []
+        for p in range(1, last_page + 1):
+            all_videos.extend(pages.get(p, []))
+        return all_videos
 
 
-    def _filter_and_sort_videos(self, videos):
+    def _filter_and_sort_videos(self, videos, runtime=0):
     
         # --- PLAYTO : Načtení nastavení
 
@@ -136,15 +606,14 @@ class PrehrajTo:
         quality_toggle = self.addon.getSettingBool('quality_toggle')
         prefer_dubbed = self.addon.getSettingBool('prefer_dubbed')
         sort_by_size = self.addon.getSettingBool('sort_by_size')
+        sort_by_relevance = self.addon.getSettingBool('sort_by_relevance')
         exclude_suffix = self.addon.getSetting('exclude_suffix').strip().lower()
         exclude_lang = self.addon.getSetting('exclude_lang').strip().lower()
         exclude_quality = self.addon.getSetting('exclude_quality').strip().lower()
 
-        # --- PLAYTO : Filtrace
+        # --- PLAYTO : Filtrace  ( pravidla zkompilovaná jednou pro danou kombinaci nastavení )
 
-        exclude_terms = [t for t in [exclude_suffix, exclude_lang, exclude_quality] if t]
-        if exclude_terms:
-            videos = [v for v in videos if not any(ex in v['title'].lower() for ex in exclude_terms)]
+        exclude_terms = tuple(t for t in [exclude_suffix, exclude_lang, exclude_quality] if t)
 
         preferred_qualities = []
         if quality_1080p: preferred_qualities.append('1080p')
@@ -152,32 +621,20 @@ class PrehrajTo:
         if quality_480p: preferred_qualities.append('480p')
         if quality_toggle: preferred_qualities = []
 
-        processed_videos = []
-        for v in videos:
-            title_lower = v['title'].lower()
-            quality = ''
-            if '1080p' in title_lower or 'full hd' in title_lower: quality = '1080p'
-            elif '720p' in title_lower or 'hd' in title_lower: quality = '720p'
-            elif '480p' in title_lower or 'sd' in title_lower: quality = '480p'
-
-            v['quality'] = quality
-            v['dub'] = bool(re.search(r'cz\s*dabing|cz-dabing|český\s*dabing', title_lower, re.IGNORECASE))
-            v['bytes'] = convert_size_to_bytes(v['size_str'])
-
-            if prefer_dubbed and not v['dub']: continue
-            if preferred_qualities and v['quality'] not in preferred_qualities: continue
-
-            processed_videos.append(v)
+        classifier = get_classifier(exclude_terms, tuple(preferred_qualities), prefer_dubbed)
+        processed_videos = classifier.classify(videos, runtime=runtime)
 
         # --- PLAYTO : Řazení
         
-        if sort_by_size:
+        if sort_by_relevance:
+            processed_videos.sort(key=lambda v: (v['score'], v['bytes']), reverse=True)
+        elif sort_by_size:
             processed_videos.sort(key=lambda v: v['bytes'], reverse=True)
 
         return processed_videos
 
 
-    def find_and_list_sources(self, meta_json):
+    def find_and_list_sources(self, meta_json, page=1):
         meta = json.loads(meta_json)
         media_type = meta.get('media_type')
 
@@ -192,20 +649,32 @@ class PrehrajTo:
 
         log(f"PREHRAJTO - Hledám zdroje pro: '{search_query}'", xbmc.LOGINFO)
         cookies = self.get_premium_cookies()
-        results = self.search_sources(search_query, cookies)
-
-        if not results:
+        runtime = int(meta.get('runtime') or 0) * 60
+        if not runtime and media_type == 'movie' and self.addon.getSettingBool('sort_by_relevance'):
+            # --- Výpisy filmů runtime nenesou : detail z TMDB  ( cache ),  jen když se podle skóre řadí
+            runtime = self.tmdb.get_movie_runtime(meta.get('tmdb_id')) * 60
+        next_page = 0
+        if self.addon.getSettingBool('search_paged'):
+            results, next_page = self.search_page(search_query, cookies, int(page), runtime=runtime)
+        else:
+            results = self.search_sources(search_query, cookies, runtime=runtime)
+
+        results = self.rank_by_speed(results, cookies)
+
+        if not results and not next_page:
             xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'SOURCES : Žádné zdroje nenalezeny', xbmcgui.NOTIFICATION_INFO, 4000)
             xbmcplugin.endOfDirectory(self._handle, succeeded=False)
             return
 
         show_size = self.addon.getSettingBool('show_size')
         show_duration_time = self.addon.getSettingBool('show_duration_time')
+        show_speed_info = self.addon.getSettingBool('show_speed_info')
 
         for video in results:
             size_display = f'[LIGHT][COLOR orange][{video["size_str"]}][/LIGHT][/COLOR]  ' if show_size and video["size_str"] else ''
             duration_display = f'[LIGHT][COLOR limegreen]· {video["duration_str"] or "N/A"} ·[/LIGHT][/COLOR]' if show_duration_time else ''
-            label = f'{size_display}{video["title"]} {duration_display}'.strip()
+            speed_display = f'  [LIGHT][COLOR deepskyblue]· {video["speed_mbps"]:.0f} Mbps ·[/LIGHT][/COLOR]' if show_speed_info and video.get('speed_mbps') else ''
+            label = f'{size_display}{video["title"]} {duration_display}{speed_display}'.strip()
 
             list_item = xbmcgui.ListItem(label=label)
             list_item.setArt({'poster': meta.get('poster'), 'fanart': meta.get('fanart'), 'icon': meta.get('poster'), 'thumb': meta.get('poster')})
@@ -214,4 +683,10 @@ class PrehrajTo:
             play_url = get_url(action='play', link=video['link'], meta=json.dumps(meta))
             xbmcplugin.addDirectoryItem(handle=self._handle, url=play_url, listitem=list_item, isFolder=False)
 
+        if next_page:
+            next_page_item = xbmcgui.ListItem(label='[COLOR orange]| DALŠÍ STRANA ==>[/COLOR]')
+            next_page_url = get_url(action='find_sources', meta=meta_json, page=str(next_page))
+            xbmcplugin.addDirectoryItem(self._handle, next_page_url, next_page_item, isFolder=True)
+
         xbmcplugin.endOfDirectory(self._handle)
+        self.prefetch_streams(results, cookies)
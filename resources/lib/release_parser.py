@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  release_parser
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import re
+import unicodedata
+
+from collections import namedtuple
+from functools import lru_cache
+
+
+
+
+# --- RELEASE : Výsledek rozboru názvu vydání
+
+Release = namedtuple('Release', [
+    'title', 'year', 'season', 'episode', 'episode_end',
+    'quality', 'codec', 'languages', 'dubbed', 'subtitles'
+])
+
+
+
+# --- RELEASE : Epizody  ( pořadí = priorita )
+
+EPISODE_PATTERNS = [
+    r'[Ss](\d+)[Ee](\d+)',  # S01E01 format
+    r'(\d+)x(\d+)',         # 1x01 format
+    r'[Ee]pisode\s*(\d+)',  # Episode 1 format
+    r'[Ee]p\s*(\d+)',       # Ep 1 format
+    r'[Ee](\d+)',           # E1 format
+    r'(\d+)\.\s*(\d+)'      # 1.01 format
+]
+
+_EPISODE_RES = [re.compile(p) for p in EPISODE_PATTERNS]
+_EPISODE_RES_I = [re.compile(p, re.IGNORECASE) for p in EPISODE_PATTERNS]
+_EPISODE_KEYWORDS = ('episode', 'season', 'series', 'ep', 'complete', 'serie', 'disk')
+_SEASON_WORD_RE = re.compile(r'season\s*(\d+)')
+_FIRST_NUMBER_RE = re.compile(r'(\d+)')
+
+_SXXEXX_RE = re.compile(r'\b[Ss](\d{1,2})[Ee](\d{1,3})(?:-[Ee]?(\d{1,3}))?\b')
+_NXNN_RE = re.compile(r'\b(\d{1,2})x(\d{2,3})(?:-(\d{2,3}))?\b')
+_YEAR_RE = re.compile(r'\b(19[89]\d|20\d\d)\b')
+
+
+
+# --- RELEASE : Značky kvality, kodeku a jazyka
+# --- Samostatné slovo = nesousedí s písmenem  ( vč. diakritiky )  ani číslicí, podtržítko odděluje.
+
+_QUALITY_MARK_RE = re.compile(r'full\s*hd|(?<![^\W_])(?:fhd|hd|sd|uhd|4k)(?![^\W_])')
+
+_CODEC_RE = re.compile(r'(?<![^\W_])(x264|h\.?264|avc|x265|h\.?265|hevc|xvid|divx|av1)(?![^\W_])')
+_CODEC_MAP = {'x264': 'h264', 'h264': 'h264', 'h.264': 'h264', 'avc': 'h264',
+              'x265': 'h265', 'h265': 'h265', 'h.265': 'h265', 'hevc': 'h265',
+              'xvid': 'xvid', 'divx': 'xvid', 'av1': 'av1'}
+
+_LANGUAGE_RE = re.compile(r'(?<![^\W_])(cz|cze|czech|sk|svk|slovak|en|eng|english)(?![^\W_])')
+_LANGUAGE_MAP = {'cz': 'cz', 'cze': 'cz', 'czech': 'cz', 'sk': 'sk', 'svk': 'sk', 'slovak': 'sk',
+                 'en': 'en', 'eng': 'en', 'english': 'en'}
+
+DUB_RE = re.compile(r'cz\s*dabing|cz-dabing|český\s*dabing')
+_SUBTITLES_RE = re.compile(r'titulky|cz\s*tit(?![^\W_])|(?<![^\W_])subs?(?![^\W_])')
+
+
+
+# --- RELEASE : Úklid názvu pro TMDB
+
+JUNK_WORDS = [
+    'cz', 'czdab', 'dab', 'dabing', 'czaudio', 'dd', 'hevc',
+    '1080p', '720p', '2160p', '4k', 'hd', 'fullhd', 'ultra hd', 'uhd',
+    'topkvalita', 'web-dl', 'webrip', 'bluray', 'dvdrip',
+    'final', 'komplet', 'x264', 'x265', 'amzn'
+]
+
+_SEPARATORS = str.maketrans({'_': ' ', '.': ' ', '+': ' '})
+_JUNK_RE = re.compile(r'\b(?:' + '|'.join(JUNK_WORDS) + r')\b', re.IGNORECASE)
+_BRACKETS_RE = re.compile(r'[\(\[\{].*?[\)\]\}]')
+_SPACES_RE = re.compile(r'\s+')
+
+
+
+
+def strip_accents(string):
+    return ''.join(c for c in unicodedata.normalize('NFKD', string) if not unicodedata.combining(c))
+
+
+
+def detect_quality(name_lower):
+
+    """
+    RELEASE :: QUALITY
+    -- Vrací '2160p' / '1080p' / '720p' / '480p' / ''  z názvu v malých písmenech.
+    -- Čísla rozlišení jako prostý podřetězec, hd / sd / uhd / 4k jen jako samostatné slovo.
+    """
+
+    if '2160p' in name_lower:
+        return '2160p'
+    if '1080p' in name_lower:
+        return '1080p'
+    marks = _QUALITY_MARK_RE.findall(name_lower) if ('hd' in name_lower or 'sd' in name_lower or '4k' in name_lower) else ()
+    if 'uhd' in marks or '4k' in marks:
+        return '2160p'
+    if any(m[0] == 'f' for m in marks):
+        return '1080p'
+    if '720p' in name_lower or 'hd' in marks:
+        return '720p'
+    if '480p' in name_lower or 'sd' in marks:
+        return '480p'
+    return ''
+
+
+
+def detect_episode(filename, series_name=''):
+
+    """
+    RELEASE :: EPISODE INFO
+    -- ( sezóna, epizoda )  podle EPISODE_PATTERNS po odstranění názvu seriálu, jinak  ( None, None )
+    -- Vzory s jedinou skupinou  ( Episode 5, E5 )  se berou jako 1. sezóna.
+    """
+
+    cleaned = filename.lower().replace(series_name.lower(), '').strip()
+
+    for pattern in _EPISODE_RES:
+        match = pattern.search(cleaned)
+        if match:
+            groups = match.groups()
+            if len(groups) == 2:
+                return int(groups[0]), int(groups[1])
+            elif len(groups) == 1:
+                return 1, int(groups[0])
+
+    if 'season' in cleaned or 'serie' in cleaned:
+        season_match = _SEASON_WORD_RE.search(cleaned)
+        if season_match:
+            season_num = int(season_match.group(1))
+            ep_match = _FIRST_NUMBER_RE.search(cleaned.replace(season_match.group(0), ''))
+            if ep_match:
+                return season_num, int(ep_match.group(1))
+
+    return None, None
+
+
+
+def looks_like_episode(filename):
+    for pattern in _EPISODE_RES_I:
+        if pattern.search(filename):
+            return True
+    filename_lower = filename.lower()
+    return any(keyword in filename_lower for keyword in _EPISODE_KEYWORDS)
+
+
+
+@lru_cache(maxsize=4096)
+def parse_release(name):
+
+    """
+    RELEASE :: PARSE
+    -- Rozebere název vydání na  ( Release ) : očištěný titul pro TMDB, rok, sezóna / epizoda
+    -- ( SxxExx, SxxExx-yy, 1x01 ),  kvalita, kodek, jazyky, dabing a titulky.
+    -- Výsledek je neměnný, opakované názvy se berou z cache.
+    """
+
+    name_lower = name.lower()
+    search_title = strip_accents(name.translate(_SEPARATORS))
+
+    season = episode = episode_end = None
+    ep_match = _SXXEXX_RE.search(search_title) or _NXNN_RE.search(search_title)
+    if ep_match:
+        season = int(ep_match.group(1))
+        episode = int(ep_match.group(2))
+        episode_end = int(ep_match.group(3)) if ep_match.group(3) else None
+        search_title = search_title.replace(ep_match.group(0), '')
+
+    year_match = _YEAR_RE.search(search_title)
+    year = year_match.group(1) if year_match else None
+    if year:
+        search_title = re.sub(r'\b' + year + r'\b', '', search_title)
+
+    search_title = _JUNK_RE.sub('', search_title)
+    search_title = _BRACKETS_RE.sub('', search_title)
+    search_title = _SPACES_RE.sub(' ', search_title).strip()
+
+    codec_match = _CODEC_RE.search(name_lower)
+    languages = tuple(sorted({_LANGUAGE_MAP[m] for m in _LANGUAGE_RE.findall(name_lower)}))
+
+    return Release(
+        title=search_title,
+        year=year,
+        season=season,
+        episode=episode,
+        episode_end=episode_end,
+        quality=detect_quality(name_lower),
+        codec=_CODEC_MAP[codec_match.group(1)] if codec_match else '',
+        languages=languages,
+        dubbed='dabing' in name_lower and DUB_RE.search(name_lower) is not None,
+        subtitles=_SUBTITLES_RE.search(name_lower) is not None
+    )
+
+
+
+def parse_releases(names):
+    return [parse_release(name) for name in names]
+
+
+
+
+if __name__ == "__main__":
+
+    # --- BENCHMARK : python release_parser.py [korpus.tsv] [počet]
+    # --- Korpus : název <TAB> sezóna <TAB> epizoda <TAB> kvalita  ( prázdné = žádná hodnota )
+    # --- Výchozí korpus je resources/fixtures/release_names.tsv, pro měření se opakuje na  [počet]  názvů.
+
+    import os
+    import sys
+    import time
+
+    corpus_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), '..', 'fixtures', 'release_names.tsv')
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    rows = []
+    with open(corpus_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                rows.append((line.rstrip('\n').split('\t') + ['', '', ''])[:4])
+
+    errors = 0
+    for name, season, episode, quality in rows:
+        r = parse_release(name)
+        expected = (int(season) if season else None, int(episode) if episode else None, quality)
+        if (r.season, r.episode, r.quality) != expected:
+            errors += 1
+            print(f"    NESHODA : {name}  ->  {(r.season, r.episode, r.quality)}  očekáváno {expected}")
+    print(f"{len(rows)} názvů v korpusu, neshod : {errors}")
+
+    # --- Unikátní názvy, aby se neměřila jen cache
+    names = [f"{rows[i % len(rows)][0]} {i}" for i in range(total)]
+    parse_release.cache_clear()
+    start = time.perf_counter()
+    parse_releases(names)
+    elapsed = time.perf_counter() - start
+    print(f"{total} názvů : {elapsed * 1000:.1f} ms  ( {total / elapsed:,.0f} názvů/s )")
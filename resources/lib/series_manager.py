@@ -21,31 +21,23 @@ import io
 import re
 import json
 import time
-import requests
 
-from bs4 import BeautifulSoup
 from urllib.parse import quote, urlencode, parse_qsl
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 from resources.lib.utils import log, popinfo, safe_get
-
-
-
-
-EPISODE_PATTERNS = [
-    r'[Ss](\d+)[Ee](\d+)',  # S01E01 format
-    r'(\d+)x(\d+)',         # 1x01 format
-    r'[Ee]pisode\s*(\d+)',  # Episode 1 format
-    r'[Ee]p\s*(\d+)',       # Ep 1 format
-    r'[Ee](\d+)',           # E1 format
-    r'(\d+)\.\s*(\d+)'      # 1.01 format
-]
+from resources.lib.cards import parse_search_page
+from resources.lib.release_parser import detect_quality, detect_episode, looks_like_episode
 
 
 
 
 headers = {'user-agent': 'kodi/prehraj.to'}
 
+SEARCH_WORKERS = 4      # --- Souběžné požadavky přes všechny varianty dotazu
+MAX_SEARCH_PAGES = 5    # --- Limit to prevent excessive scraping
+
 
 
 
@@ -90,13 +82,11 @@ class SeriesManager:
         ]
 
         all_results = []
-        for query in search_queries:
-            results = self._perform_search(query, cookies)
-            for result in results:
-                if result not in all_results and self._is_likely_episode(result['name'], series_name):
-                    quality = self._detect_quality(result['name'])
-                    if quality not in ['4k', '2160p']:
-                        all_results.append({**result, 'quality': quality})
+        for result in self._search_all(search_queries, series_name, cookies):
+            if self._is_likely_episode(result['name'], series_name):
+                quality = self._detect_quality(result['name'])
+                if quality not in ['4k', '2160p']:
+                    all_results.append({**result, 'quality': quality})
 
         # --- Seřazení výsledků podle kvality (1080p první, pak 720p, 480p, neznámá)
 
@@ -125,87 +115,79 @@ class SeriesManager:
 
 
     def _detect_quality(self, filename):
-        filename_lower = filename.lower()
-        if '1080p' in filename_lower or 'full hd' in filename_lower:
-            return '1080p'
-        elif '720p' in filename_lower:
-            return '720p'
-        elif '480p' in filename_lower:
-            return '480p'
-        return 'unknown'
+        return detect_quality(filename.lower()) or 'unknown'
 
 
     def _is_likely_episode(self, filename, series_name):
-        if not re.search(re.escape(series_name), filename, re.IGNORECASE):
+        if series_name.lower() not in filename.lower():
             return False
+        return looks_like_episode(filename)
 
-        for pattern in EPISODE_PATTERNS:
-            if re.search(pattern, filename, re.IGNORECASE):
-                return True
 
-        episode_keywords = [
-            'episode', 'season', 'series', 'ep', 
-            'complete', 'serie', 'season', 'disk'
-        ]
+    def _search_page(self, search_query, page, cookies):
+        results = []
+        try:
+            url = f'https://prehraj.to:443/hledej/{quote(search_query)}?vp-page={page}'
+            # add timeout to prevent blocking the main thread
+            resp = safe_get(url, cookies=cookies, headers=headers, timeout=15)
+            if resp is None:
+                return results, False
+            cards, has_next = parse_search_page(resp.content)
+            for card in cards:
+                if card.title and card.href:
+                    results.append({'name': card.title, 'ident': card.href, 'size': card.size or '0'})
+            return results, has_next
+        except Exception as e:
+            log(f'TV-MANAGER - Server search error : {str(e)}', level=xbmc.LOGERROR)
+        return results, False
 
-        for keyword in episode_keywords:
-            if keyword in filename.lower():
-                return True
 
-        return False
+    def _search_all(self, search_queries, series_name, cookies):
 
+        """
+        TV-MANAGER :: CONCURRENT SEARCH
+        -- Všechny varianty dotazu běží souběžně ve sdíleném poolu  ( SEARCH_WORKERS ),
+        -- další stránka dané varianty se zařadí hned, jak předchozí ohlásí 'Zobrazit další'.
+        -- Slučuje se přes slovník podle 'ident'  ( první výskyt v pořadí dotaz / stránka vyhrává )
+        -- Průběh a počet dosud nalezených položek ukazuje DialogProgressBG.
+        """
 
-    def _perform_search(self, search_query, cookies):
-        results = []
-        p = 1
-        max_pages = 5   # --- Limit to prevent excessive scraping
+        pages = {}
+        seen = set()
+        progress = xbmcgui.DialogProgressBG()
+        progress.create('[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', f'TV-MANAGER : Hledám {series_name}')
+        executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+        pending = {}
         try:
-            while p <= max_pages:
-                url = f'https://prehraj.to:443/hledej/{quote(search_query)}?vp-page={p}'
-                # add timeout to prevent blocking the main thread
-                resp = safe_get(url, cookies=cookies, headers=headers, timeout=15)
-                content = resp.content if resp is not None else b''
-                soup = BeautifulSoup(content, 'html.parser')
-                video_links = soup.find_all('a', {'class': 'video--link'})
-                for v in video_links:
-                    name = v.find('h3', {'class': 'video__title'}).text.strip() if v.find('h3') else ''
-                    ident = v['href']  # Full path like '/video/ident'
-                    size_elem = v.find('div', {'class': 'video__tag--size'})
-                    size = size_elem.text.strip() if size_elem else '0'
-                    if name and ident:
-                        results.append({'name': name, 'ident': ident, 'size': size})
-                next_page = soup.find('a', {'title': 'Zobrazit další'})
-                if not next_page:
-                    break
-                p += 1
-        except requests.exceptions.RequestException as e:
-            log(f'TV-MANAGER - Network error during server search : {str(e)}', level=xbmc.LOGERROR)
-        except Exception as e:
-            log(f'TV-MANAGER - Server search error : {str(e)}', level=xbmc.LOGERROR)
-        return results
+            pending = {executor.submit(self._search_page, query, 1, cookies): (qi, 1) for qi, query in enumerate(search_queries)}
+            expected = len(search_queries)
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    qi, page = pending.pop(future)
+                    results, has_next = future.result()
+                    pages[(qi, page)] = results
+                    seen.update(r['ident'] for r in results)
+                    if has_next and page < MAX_SEARCH_PAGES:
+                        pending[executor.submit(self._search_page, search_queries[qi], page + 1, cookies)] = (qi, page + 1)
+                        expected += 1
+                progress.update(int(len(pages) / expected * 100), '[B][COLOR orange]| PLAY.TO |[/COLOR][/B]', f'TV-MANAGER : {series_name} · nalezeno {len(seen)} položek')
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False)
+            progress.close()
+
+        merged = {}
+        for key in sorted(pages):
+            for result in pages[key]:
+                merged.setdefault(result['ident'], result)
+        log(f'TV-MANAGER - Hledání {series_name} : {len(pages)} stránek, {len(merged)} unikátních položek', level=xbmc.LOGINFO)
+        return list(merged.values())
 
 
     def _detect_episode_info(self, filename, series_name):
-        cleaned = filename.lower().replace(series_name.lower(), '').strip()
-
-        for pattern in EPISODE_PATTERNS:
-            match = re.search(pattern, cleaned)
-            if match:
-                groups = match.groups()
-                if len(groups) == 2:
-                    return int(groups[0]), int(groups[1])
-                elif len(groups) == 1:
-                    return 1, int(groups[0])
-
-        if 'season' in cleaned.lower() or 'serie' in cleaned.lower():
-            season_match = re.search(r'season\s*(\d+)', cleaned.lower())
-            if season_match:
-                season_num = int(season_match.group(1))
-                ep_match = re.search(r'(\d+)', cleaned.replace(season_match.group(0), ''))
-                if ep_match:
-                    return season_num, int(ep_match.group(1))
-
-        return None, None
+        return detect_episode(filename, series_name)
 
 
     def _save_series_data(self, series_name, series_data):
@@ -12,11 +12,14 @@
 
 
 
+import xbmc
 import xbmcgui
+import json
 import time
-import requests
 
-from resources.lib.utils import log, popinfo
+from urllib.parse import urlparse
+
+from resources.lib.utils import log, popinfo, get_session, abort_requested
 
 
 
@@ -26,6 +29,18 @@ DOWNLOAD_URL = "https://prg.download.datapacket.com/100mb.bin"
 
 
 
+# --- SPEEDTEST : Měření propustnosti CDN pro zdroje  ( krátký Range dotaz na vyřešenou URL )
+
+PROBE_BYTES = 2 * 1024 * 1024     # --- Kolik dat se při měření stáhne nejvýš
+PROBE_MIN_BYTES = 256 * 1024      # --- Méně dat = měření se nepočítá
+PROBE_TIMEOUT = 4                 # --- Sekundy na jedno měření
+PROBE_TTL = 1800                  # --- Sekundy, po které platí změřená rychlost hostitele
+
+_PROPERTY_PREFIX = 'playto.speed.'
+_window = xbmcgui.Window(10000)
+
+
+
 def diagnose_speed(addon):
 
     """
@@ -43,7 +58,7 @@ def diagnose_speed(addon):
 
     try:
         start = time.time()
-        r = requests.get(DOWNLOAD_URL, stream=True, timeout=120)
+        r = get_session().get(DOWNLOAD_URL, stream=True, timeout=120)
         downloaded = 0
 
         for chunk in r.iter_content(chunk_size=1024 * 64):
@@ -72,3 +87,147 @@ def diagnose_speed(addon):
             10000
         )
 
+
+
+
+def cached_host_speed(host):
+    raw = _window.getProperty(_PROPERTY_PREFIX + host)
+    if not raw:
+        return None
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        return None
+    return entry['mbps'] if entry.get('expires', 0) > time.time() else None
+
+
+
+def probe_url(file_url, timeout=PROBE_TIMEOUT):
+
+    """
+    SPEEDTEST :: PROBE
+    -- Stáhne nejvýš  PROBE_BYTES  přes  Range  a vrátí trvalou propustnost v Mbps  ( bez doby do prvního bajtu ),
+    -- nebo None, pokud se nepodařilo stáhnout aspoň  PROBE_MIN_BYTES.
+    """
+
+    headers = {'Range': f'bytes=0-{PROBE_BYTES - 1}'}
+    try:
+        r = get_session().get(file_url, headers=headers, stream=True, timeout=timeout)
+        if r.status_code not in (200, 206):
+            r.close()
+            return None
+        deadline = time.time() + timeout
+        first_byte = None
+        downloaded = 0
+        for chunk in r.iter_content(chunk_size=1024 * 64):
+            if not chunk:
+                continue
+            if first_byte is None:
+                first_byte = time.time()
+            else:
+                downloaded += len(chunk)
+            if downloaded >= PROBE_BYTES or time.time() > deadline:
+                break
+        r.close()
+        duration = time.time() - first_byte if first_byte else 0
+        if downloaded < PROBE_MIN_BYTES or duration <= 0:
+            return None
+        return downloaded * 8 / 1000000 / duration
+    except Exception as e:
+        log(f"SPEEDTEST - Měření selhalo : {e}", xbmc.LOGDEBUG)
+        return None
+
+
+
+def host_speed(file_url):
+    host = urlparse(file_url).netloc
+    mbps = cached_host_speed(host)
+    if mbps is None:
+        mbps = probe_url(file_url)
+        if mbps is not None:
+            _window.setProperty(_PROPERTY_PREFIX + host, json.dumps({'mbps': mbps, 'expires': time.time() + PROBE_TTL}))
+            log(f"SPEEDTEST - {host} : {mbps:.1f} Mbps", xbmc.LOGINFO)
+    return mbps
+
+
+
+def probe_hosts(file_urls):
+
+    """
+    SPEEDTEST :: PROBE HOSTS
+    -- Postupně změří hostitele zadaných URL, kteří ještě nejsou v cache  ( každý jednou ).
+    -- Běží jen na pozadí  ( utils.start_background ),  výpis ani přehrání na něj nečeká.
+    """
+
+    seen = set()
+    for file_url in file_urls:
+        host = urlparse(file_url).netloc if file_url else ''
+        if not host or host in seen:
+            continue
+        seen.add(host)
+        if abort_requested():
+            return
+        host_speed(file_url)
+
+
+
+def required_mbps(video):
+    size_bytes = video.get('bytes') or 0
+    seconds = video.get('seconds') or 0
+    return size_bytes * 8 / 1000000 / seconds if size_bytes and seconds else 0
+
+
+
+def _speed_tiebreak(videos):
+    # --- Pořadí relevance zůstává, rychlost rozhoduje jen mezi sousedy se stejným skóre
+    ordered = []
+    run = []
+    for video in videos:
+        if run and video.get('score') != run[0].get('score'):
+            ordered.extend(sorted(run, key=lambda v: v.get('speed_mbps') or 0, reverse=True))
+            run = []
+        run.append(video)
+    ordered.extend(sorted(run, key=lambda v: v.get('speed_mbps') or 0, reverse=True))
+    return ordered
+
+
+
+def rank_sources(videos, resolver, addon):
+
+    """
+    SPEEDTEST :: RANK SOURCES
+    -- Doplní  'speed_mbps'  podle už změřené rychlosti hostitele CDN  ( resolver(video) -> file_url  nebo None,
+    -- bez síťového dotazu ).  Nic se tu neměří, měření běží na pozadí  ( probe_hosts ).
+    -- Filtr rychlosti vyřadí zdroje, jejichž datový tok  ( velikost / délka )  přesahuje známou rychlost
+    -- nebo  max_download_speed.  Rychlost pořadí relevance nemění, jen rozhoduje mezi stejným skóre.
+    """
+
+    show_speed_info = addon.getSettingBool('show_speed_info')
+    speed_filter = addon.getSettingBool('enable_max_speed_filter')
+    if not (show_speed_info or speed_filter) or not videos:
+        return videos
+
+    for video in videos:
+        try:
+            file_url = resolver(video)
+            video['speed_mbps'] = cached_host_speed(urlparse(file_url).netloc) if file_url else None
+        except Exception as e:
+            log(f"SPEEDTEST - Chyba u zdroje {video.get('title')}: {e}", xbmc.LOGWARNING)
+            video['speed_mbps'] = None
+
+    if speed_filter:
+        try:
+            limit = float(addon.getSetting('max_download_speed') or 0)
+        except ValueError:
+            limit = 0
+        kept = []
+        for video in videos:
+            available = [x for x in (video.get('speed_mbps'), limit) if x]
+            needed = required_mbps(video)
+            if needed and available and needed > min(available):
+                log(f"SPEEDTEST - Vyřazeno ( {needed:.1f} Mbps > {min(available):.1f} Mbps ) : {video.get('title')}", xbmc.LOGINFO)
+                continue
+            kept.append(video)
+        videos = kept
+
+    return _speed_tiebreak(videos)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  stream_cache
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import xbmc
+import xbmcgui
+
+import json
+import time
+import hashlib
+
+from urllib.parse import urlparse, parse_qsl
+
+from resources.lib.utils import log
+from resources.lib.cache_store import get_store
+
+
+
+
+# --- STREAM CACHE : Krátkodobé úložiště vyřešených odkazů na stream
+# --- Drží se ve vlastnostech domovského okna  ( sdílené mezi voláními pluginu, jen v paměti Kodi )
+
+RESOLVED_TTL = 600          # --- Sekundy, po které je předem vyřešený odkaz považován za platný
+FAILED_TTL = 900            # --- Sekundy, po které se mrtvý odkaz  ( 404 / 410, stránka bez zdroje )  nezařazuje do závodu auto-play
+_PROPERTY_PREFIX = 'playto.stream.'
+_FAILED_PREFIX = 'playto.stream_failed.'
+
+_window = xbmcgui.Window(10000)
+
+
+
+# --- STREAM CACHE : Trvalé úložiště  ( jmenný prostor 'streams' v cache_store )
+# --- Platnost podle podepsaných parametrů CDN URL, jinak STORE_DEFAULT_TTL.  Před použitím se ověří krátkým Range dotazem.
+
+STORE_NAMESPACE = 'streams'
+STORE_DEFAULT_TTL = 3600        # --- Sekundy, pokud URL nenese vlastní expiraci
+STORE_MAX_TTL = 24 * 3600       # --- Strop i pro URL s delší expirací
+STORE_EXPIRY_MARGIN = 120       # --- Rezerva, aby URL nevypršela během spouštění přehrávání
+_EXPIRY_PARAMS = ('expires', 'expire', 'exp', 'e', 'expiry', 'validto', 'valid_to', 'deadline', 'ttl_until')
+
+
+
+
+def _property_name(link, premium):
+    digest = hashlib.md5(f"{'P' if premium else 'F'}|{link}".encode('utf-8')).hexdigest()
+    return _PROPERTY_PREFIX + digest
+
+
+
+def get_stream(link, premium):
+
+    """
+    STREAM CACHE :: GET
+    -- Vrátí  ( file_url, subtitle_url )  pro odkaz na prehraj.to, pokud je v úložišti a neprošlý.
+    -- Premium a běžné odkazy se ukládají zvlášť.
+    """
+
+    name = _property_name(link, premium)
+    raw = _window.getProperty(name)
+    if not raw:
+        return None
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        _window.clearProperty(name)
+        return None
+    if entry.get('expires', 0) <= time.time():
+        _window.clearProperty(name)
+        return None
+    return entry.get('file_url'), entry.get('subtitle_url')
+
+
+
+def put_stream(link, premium, file_url, subtitle_url=None, ttl=RESOLVED_TTL):
+    entry = {'file_url': file_url, 'subtitle_url': subtitle_url, 'expires': time.time() + ttl}
+    _window.setProperty(_property_name(link, premium), json.dumps(entry))
+
+
+
+def discard_stream(link, premium):
+    _window.clearProperty(_property_name(link, premium))
+
+
+
+# --- STREAM CACHE : Negativní cache  ( mrtvé odkazy, bez ohledu na premium )
+
+def _failed_name(link):
+    return _FAILED_PREFIX + hashlib.md5(link.encode('utf-8')).hexdigest()
+
+
+
+def mark_failed(link, ttl=FAILED_TTL):
+    _window.setProperty(_failed_name(link), str(time.time() + ttl))
+
+
+
+def is_failed(link):
+    name = _failed_name(link)
+    raw = _window.getProperty(name)
+    if not raw:
+        return False
+    try:
+        if float(raw) > time.time():
+            return True
+    except ValueError:
+        pass
+    _window.clearProperty(name)
+    return False
+
+
+
+def signed_expiry(file_url):
+
+    """
+    STREAM CACHE :: SIGNED EXPIRY
+    -- Unix čas vypršení z podepsaných parametrů CDN URL  ( expires=, exp=, e= ... ),  jinak None.
+    -- Hodnoty v milisekundách se převedou, nesmyslné hodnoty  ( minulost o rok, daleká budoucnost )  se ignorují.
+    """
+
+    now = time.time()
+    for key, value in parse_qsl(urlparse(file_url).query):
+        if key.lower() not in _EXPIRY_PARAMS or not value.isdigit():
+            continue
+        expires = int(value)
+        if expires > 10 ** 12:
+            expires //= 1000
+        if now - 365 * 86400 < expires < now + 365 * 86400:
+            return expires
+    return None
+
+
+
+def load_resolved(link, premium):
+
+    """
+    STREAM CACHE :: LOAD RESOLVED
+    -- Trvale uložený  ( file_url, subtitle_url )  pro odkaz, pokud ještě nevypršel, jinak None.
+    """
+
+    entry = get_store().get(STORE_NAMESPACE, _property_name(link, premium))
+    if not entry:
+        return None
+    return entry.get('file_url'), entry.get('subtitle_url')
+
+
+
+def save_resolved(link, premium, file_url, subtitle_url=None):
+    now = time.time()
+    expires = signed_expiry(file_url)
+    expires = min(expires - STORE_EXPIRY_MARGIN, now + STORE_MAX_TTL) if expires else now + STORE_DEFAULT_TTL
+    if expires <= now:
+        return
+
+    get_store().set(STORE_NAMESPACE, _property_name(link, premium), {
+        'link': link,
+        'premium': bool(premium),
+        'file_url': file_url,
+        'subtitle_url': subtitle_url
+    }, ttl=expires - now)
+
+
+
+def forget_resolved(link, premium):
+    get_store().delete(STORE_NAMESPACE, _property_name(link, premium))
+
+
+
+def stream_alive(session, file_url, headers=None, timeout=5):
+
+    """
+    STREAM CACHE :: VALIDITY CHECK
+    -- Levné ověření URL : GET s  Range: bytes=0-0  bez stahování těla.  200 / 206 = platná.
+    """
+
+    request_headers = dict(headers or {})
+    request_headers['Range'] = 'bytes=0-0'
+    try:
+        res = session.get(file_url, headers=request_headers, timeout=timeout, stream=True, allow_redirects=True)
+        res.close()
+        return res.status_code in (200, 206)
+    except Exception as e:
+        log(f"STREAM CACHE - Ověření URL selhalo: {e}", xbmc.LOGDEBUG)
+        return False
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+
+# ========================================================================= #
+#
+#   Module:  stream_parser
+#   Author:  Mau!X ER
+#   Created on:  20.10.2025
+#   License: AGPL v.3 https://www.gnu.org/licenses/agpl-3.0.html
+#
+# ========================================================================= #
+
+
+
+import re
+
+from collections import namedtuple
+
+
+
+
+# --- STREAM PARSER : Konfigurace přehrávače ze stránky videa  ( var sources / var tracks )
+
+StreamSource = namedtuple('StreamSource', ['url', 'label', 'type'])
+SubtitleTrack = namedtuple('SubtitleTrack', ['url', 'label', 'lang', 'kind'])
+
+
+
+_SOURCES_RE = re.compile(rb'var\s+sources\s*=\s*')
+_TRACKS_RE = re.compile(rb'var\s+tracks\s*=\s*')
+_SCRIPT_END = b'</script'
+_FILE_FALLBACK_RE = re.compile(r'(?:file|src)\s*:\s*["\']([^"\']+)["\']')
+
+_NUMBER_RE = re.compile(r'-?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+_IDENT_RE = re.compile(r'[A-Za-z_$][\w$]*')
+_SPACE_RE = re.compile(r'(?:\s+|//[^\n]*|/\*.*?\*/)+', re.DOTALL)
+_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+_KEYWORDS = {'true': True, 'false': False, 'null': None, 'undefined': None}
+
+
+
+
+class JSLiteralError(ValueError):
+    pass
+
+
+
+class _JSLiteralParser:
+
+    """
+    STREAM PARSER :: JS LITERAL
+    -- Tolerantní rozbor JavaScriptového literálu  ( pole, objekty, řetězce, čísla, true / false / null )
+    -- Klíče bez uvozovek i v apostrofech, koncové čárky a komentáře jsou povolené.
+    -- Cokoli jiného  ( volání funkcí, proměnné )  se vrací jako None, aby rozbor nespadl.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+
+    def _skip(self):
+        match = _SPACE_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+
+
+    def _peek(self):
+        self._skip()
+        return self.text[self.pos] if self.pos < len(self.text) else ''
+
+
+    def value(self):
+        char = self._peek()
+        if not char:
+            raise JSLiteralError("neočekávaný konec literálu")
+        if char == '[':
+            return self._array()
+        if char == '{':
+            return self._object()
+        if char in '"\'':
+            return self._string()
+        match = _NUMBER_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if any(c in number for c in '.eE') else int(number)
+        match = _IDENT_RE.match(self.text, self.pos)
+        if match:
+            self.pos = match.end()
+            self._skip_expression()
+            return _KEYWORDS.get(match.group(0))
+        raise JSLiteralError(f"neočekávaný znak na pozici {self.pos}")
+
+
+    def _skip_expression(self):
+        # --- Neznámý výraz  ( proměnná, volání )  : přeskočit po nejbližší čárku / konec na stejné úrovni
+        depth = 0
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char in '"\'':
+                self._string()
+                continue
+            if char in '([{':
+                depth += 1
+            elif char in ')]}':
+                if depth == 0:
+                    return
+                depth -= 1
+            elif char in ',;' and depth == 0:
+                return
+            self.pos += 1
+
+
+    def _array(self):
+        self.pos += 1
+        items = []
+        while True:
+            char = self._peek()
+            if char == ']':
+                self.pos += 1
+                return items
+            if not char:
+                raise JSLiteralError("neukončené pole")
+            items.append(self.value())
+            if self._peek() == ',':
+                self.pos += 1
+
+
+    def _object(self):
+        self.pos += 1
+        obj = {}
+        while True:
+            char = self._peek()
+            if char == '}':
+                self.pos += 1
+                return obj
+            if not char:
+                raise JSLiteralError("neukončený objekt")
+            if char in '"\'':
+                key = self._string()
+            else:
+                match = _IDENT_RE.match(self.text, self.pos) or _NUMBER_RE.match(self.text, self.pos)
+                if not match:
+                    raise JSLiteralError(f"neplatný klíč na pozici {self.pos}")
+                key = match.group(0)
+                self.pos = match.end()
+            if self._peek() != ':':
+                raise JSLiteralError(f"chybí ':' na pozici {self.pos}")
+            self.pos += 1
+            obj[key] = self.value()
+            if self._peek() == ',':
+                self.pos += 1
+
+
+    def _string(self):
+        quote = self.text[self.pos]
+        self.pos += 1
+        parts = []
+        start = self.pos
+        text = self.text
+        while self.pos < len(text):
+            char = text[self.pos]
+            if char == quote:
+                parts.append(text[start:self.pos])
+                self.pos += 1
+                return ''.join(parts)
+            if char == '\\':
+                parts.append(text[start:self.pos])
+                escaped = text[self.pos + 1:self.pos + 2]
+                if escaped == 'u' and len(text) >= self.pos + 6:
+                    try:
+                        parts.append(chr(int(text[self.pos + 2:self.pos + 6], 16)))
+                        self.pos += 6
+                        start = self.pos
+                        continue
+                    except ValueError:
+                        pass
+                parts.append(_ESCAPES.get(escaped, escaped))
+                self.pos += 2
+                start = self.pos
+                continue
+            self.pos += 1
+        raise JSLiteralError("neukončený řetězec")
+
+
+
+def parse_js_literal(text, pos=0):
+
+    """
+    STREAM PARSER :: PARSE JS LITERAL
+    -- Vrátí  ( hodnota, konec )  literálu začínajícího na pozici  pos.  Při chybě JSLiteralError.
+    """
+
+    parser = _JSLiteralParser(text)
+    parser.pos = pos
+    return parser.value(), parser.pos
+
+
+
+def _script_literal(page, pattern):
+    # --- Najde přiřazení v surových bytes a dekóduje jen zbytek daného <script>
+    match = pattern.search(page)
+    if not match:
+        return None
+    end = page.find(_SCRIPT_END, match.end())
+    return page[match.end():end if end != -1 else len(page)].decode('utf-8', 'replace')
+
+
+
+def _to_bytes(page):
+    if page is None:
+        return b''
+    if isinstance(page, str):
+        return page.encode('utf-8')
+    return page
+
+
+
+def parse_sources(page):
+    raw = _script_literal(_to_bytes(page), _SOURCES_RE)
+    if raw is None:
+        return []
+    try:
+        data, _ = parse_js_literal(raw)
+    except JSLiteralError:
+        # --- Nečitelný literál : aspoň první URL jako dřív
+        match = _FILE_FALLBACK_RE.search(raw)
+        return [StreamSource(match.group(1), '', '')] if match else []
+
+    if isinstance(data, dict):
+        data = [data]
+    sources = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        url = item.get('file') or item.get('src')
+        if url:
+            sources.append(StreamSource(str(url), str(item.get('label') or item.get('res') or ''), str(item.get('type') or '')))
+    return sources
+
+
+
+def parse_tracks(page):
+    raw = _script_literal(_to_bytes(page), _TRACKS_RE)
+    if raw is None:
+        return []
+    try:
+        data, _ = parse_js_literal(raw)
+    except JSLiteralError:
+        return []
+
+    tracks = []
+    for item in data if isinstance(data, list) else []:
+        if not isinstance(item, dict):
+            continue
+        url = item.get('src') or item.get('file')
+        if url:
+            tracks.append(SubtitleTrack(str(url), str(item.get('label') or ''), str(item.get('srclang') or item.get('lang') or ''), str(item.get('kind') or 'captions')))
+    return tracks
+
+
+
+def parse_player_config(page):
+
+    """
+    STREAM PARSER :: PLAYER CONFIG
+    -- Vrátí  ( [StreamSource], [SubtitleTrack] )  se všemi kvalitami a titulky ze stránky videa  ( bytes nebo str )
+    """
+
+    page = _to_bytes(page)
+    return parse_sources(page), parse_tracks(page)
+
+
+
+
+if __name__ == "__main__":
+
+    # --- BENCHMARK : python -m resources.lib.stream_parser stranka1.html [stranka2.html ...]
+    # --- Uložené stránky videí z prehraj.to, porovnání s původním BeautifulSoup + ast.literal_eval
+
+    import ast
+    import sys
+    import time
+
+    from bs4 import BeautifulSoup
+
+    def _legacy(page_content):
+        soup = BeautifulSoup(page_content, 'html.parser')
+        pattern = re.compile(r'var sources = \[(.*?);', re.DOTALL)
+        script = soup.find('script', string=pattern)
+        if not script: return None, None
+
+        file_url, subtitle_url = None, None
+        try:
+            sources = pattern.findall(script.string)[0]
+            file_match = re.search(r'file:\s*"(.*?)"|src:\s*"(.*?)"', sources, re.DOTALL)
+            file_url = file_match.group(1) or file_match.group(2)
+        except:
+            pass
+        try:
+            pattern2 = re.compile(r'var tracks = (.*?);', re.DOTALL)
+            script2 = soup.find('script', string=pattern2)
+            if script2:
+                data = ast.literal_eval(pattern2.findall(script2.string)[0].strip())
+                subtitle_url = data[0]['src']
+        except:
+            pass
+        return file_url, subtitle_url
+
+    def _bench(func, page, rounds):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            func(page)
+        return (time.perf_counter() - start) / rounds * 1000
+
+    rounds = 20
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            page = f.read()
+        sources, tracks = parse_player_config(page)
+        legacy = _legacy(page)
+        fast = (sources[0].url if sources else None, tracks[0].url if tracks else None)
+        print(f"{path} : {len(sources)} zdrojů, {len(tracks)} titulků, původní {legacy}, nový {fast}")
+        print(f"    BeautifulSoup + ast  : {_bench(_legacy, page, rounds):8.2f} ms/stránka")
+        print(f"    stream_parser        : {_bench(parse_player_config, page, rounds):8.3f} ms/stránka")
@@ -19,22 +19,31 @@ import xbmcplugin
 
 import json
 import datetime
+import threading
 
 
 from resources.lib import tmdb_account
-from resources.lib.utils import get_url, log, popinfo
+from resources.lib.utils import get_url, log, popinfo, conditional_get, start_background, abort_requested
 
 
 
 
 class TMDB:
-    def __init__(self, addon, handle, session, load_cache_func, save_cache_func):
+
+    # --- TMDB : Klíče cache, které se právě obnovují na pozadí  ( sdílené mezi instancemi )
+    _refreshing = set()
+    _refresh_lock = threading.Lock()
+
+    def __init__(self, addon, handle, session, load_cache_func, save_cache_func, load_stale_cache_func=None, cache_namespace=None, cache_exists_func=None):
 
         self.addon = addon
         self._handle = handle
         self.session = session
         self.load_cache = load_cache_func
         self.save_cache = save_cache_func
+        self.load_stale_cache = load_stale_cache_func
+        self.cache_namespace = cache_namespace     # --- Jmenný prostor cache_store pro podmíněné dotazy  ( ETag ),  None = vypnuto
+        self.cache_exists = cache_exists_func      # --- Kontrola existence bez statistik  ( prefetch další stránky ),  None = vypnuto
 
         self.api_key = self.addon.getSetting('api_key').strip()
 
@@ -76,6 +85,13 @@ class TMDB:
 
 
     def _fetch(self, endpoint, params=None, cache_key=None):
+
+        """
+        TMDB :: FETCH
+        -- Čerstvá cache se vrátí hned.  Prošlá  ( do nastaveného maxima stáří, viz load_stale_cache )  také,
+        -- ale zároveň se obnoví na pozadí  ( stale-while-revalidate ).  Jinak se čeká na TMDB API.
+        """
+
         if not self.api_key:
             log("TMDB - FETCH Chybí TMDB API klíč v nastavení !", xbmc.LOGERROR)
             xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', 'TMDB FETCH : Chybí TMDB API klíč v nastavení !', xbmcgui.NOTIFICATION_ERROR, 4000)
@@ -86,7 +102,52 @@ class TMDB:
             if cached_data is not None:
                 log(f"TMDB - FETCH CACHE Používám cachovaná data pro '{cache_key}' (TMDB FETCH)", xbmc.LOGINFO)
                 return cached_data
+            stale_data = self.load_stale_cache(cache_key) if self.load_stale_cache else None
+            if stale_data is not None:
+                log(f"TMDB - FETCH CACHE Prošlá data pro '{cache_key}', obnovuji na pozadí", xbmc.LOGINFO)
+                self._schedule_refresh(endpoint, params, cache_key)
+                return stale_data
+
+        return self._download(endpoint, params, cache_key)
+
+
+    def _schedule_refresh(self, endpoint, params, cache_key):
+        with TMDB._refresh_lock:
+            if cache_key in TMDB._refreshing:
+                return
+            TMDB._refreshing.add(cache_key)
+        start_background(self._refresh, endpoint, dict(params or {}), cache_key, name=f'playto-tmdb-{cache_key}')
+
+
+    def _refresh(self, endpoint, params, cache_key):
+        try:
+            if not abort_requested():
+                self._download(endpoint, params, cache_key, notify=False)
+        finally:
+            with TMDB._refresh_lock:
+                TMDB._refreshing.discard(cache_key)
+
+
+    def _prefetch_next_page(self, endpoint, params, cache_key_prefix, page, data):
+
+        """
+        TMDB :: NEXT PAGE
+        -- Další stránku výpisu stáhne na pozadí do cache, pokud existuje a v cache ještě není  ( ani prošlá )
+        """
+
+        try:
+            next_page = int(page) + 1
+        except (TypeError, ValueError):
+            return
+        if not isinstance(data, dict) or next_page > int(data.get('total_pages') or 0):
+            return
+        cache_key = f"{cache_key_prefix}{next_page}"
+        if not self.cache_exists or self.cache_exists(cache_key):
+            return
+        self._schedule_refresh(endpoint, dict(params, page=next_page), cache_key)
+
 
+    def _download(self, endpoint, params=None, cache_key=None, notify=True):
 
         #########################################################################################################
         ####################################      VIETCONG FILTER      ##########################################
@@ -109,7 +170,13 @@ class TMDB:
 
 
         try:
-            response = self.session.get(url, params=params, timeout=15)
+            if cache_key and self.cache_namespace:
+                response, cached_data = conditional_get(self.session, url, self.cache_namespace, cache_key, params=params, timeout=15)
+                if cached_data is not None:
+                    log(f"TMDB - FETCH '{cache_key}' se nezměnil  ( 304 ),  platnost cache prodloužena", xbmc.LOGINFO)
+                    return cached_data
+            else:
+                response = self.session.get(url, params=params, timeout=15)
             response.raise_for_status()
             data = response.json()
 
@@ -157,27 +224,53 @@ class TMDB:
 
         except Exception as e:
             log(f"TMDB - FETCH Neočekávaná chyba : {str(e)}", xbmc.LOGERROR)
-            xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', f'FETCH : Chyba TMDB API : {e}', xbmcgui.NOTIFICATION_ERROR, 4000)
+            if notify:
+                xbmcgui.Dialog().notification('[B][COLOR red]| PLAY.TO |[/COLOR][/B]', f'FETCH : Chyba TMDB API : {e}', xbmcgui.NOTIFICATION_ERROR, 4000)
             return None
 
 
 
 
     def get_genres(self, media_type):
-        cache_key = f"genres_{media_type}"
-        cached_genres = self.load_cache(cache_key)
-        if cached_genres is not None:
-            return cached_genres
 
+        """
+        TMDB :: GENRES
+        -- { id : název }  z odpovědi  genre/<typ>/list.  Cache drží vždy surovou odpověď  ( {'genres': [...]} ),
+        -- aby ji šlo vrátit jako prošlou i obnovit přes 304.  Mapa se skládá až tady.
+        """
+
+        cache_key = f"genres_{media_type}"
         endpoint = f"genre/{media_type}/list"
         data = self._fetch(endpoint, cache_key=cache_key)
+
+        if isinstance(data, dict) and 'genres' not in data:
+            # --- Starší verze ukládala pod stejný klíč hotovou mapu : stáhnout znovu bez cache a přepsat
+            log(f"TMDB - GENRES Cache '{cache_key}' má starý formát, stahuji znovu", xbmc.LOGINFO)
+            data = self._download(endpoint)
+            if data and 'genres' in data:
+                self.save_cache(cache_key, data)
+
         if not data or 'genres' not in data:
             return {}
+        return {g['id']: g['name'] for g in data.get('genres', [])}
+
 
-        genres_dict = {g['id']: g['name'] for g in data.get('genres', [])}
-        if genres_dict:
-            self.save_cache(cache_key, genres_dict)
-        return genres_dict
+
+    def get_movie_runtime(self, tmdb_id):
+
+        """
+        TMDB :: MOVIE RUNTIME
+        -- Délka filmu v minutách z detailu  movie/<id>  ( přes cache ),  0 pokud není známa.
+        -- Výpisy filmů runtime nenesou, detail se stahuje až při hledání zdrojů.
+        """
+
+        if not tmdb_id:
+            return 0
+        data = self._fetch(f"movie/{tmdb_id}", cache_key=f"movie_details_{tmdb_id}")
+        try:
+            return int((data or {}).get('runtime') or 0)
+        except (TypeError, ValueError):
+            return 0
 
 
 
@@ -351,6 +444,7 @@ class TMDB:
         data = self._fetch(endpoint, params, cache_key)
         if data:
             self.list_items(data, media_type, page, 'listing_trending')
+            self._prefetch_next_page(endpoint, params, f"trending_{media_type}_page_", page, data)
 
 
 
@@ -361,6 +455,7 @@ class TMDB:
         data = self._fetch(endpoint, params, cache_key)
         if data:
             self.list_items(data, media_type, page, 'listing_discover')
+            self._prefetch_next_page(endpoint, params, f"discover_{media_type}_page_", page, data)
 
 
     def list_top_rated(self, page, media_type):
@@ -370,6 +465,7 @@ class TMDB:
         data = self._fetch(endpoint, params, cache_key)
         if data:
             self.list_items(data, media_type, page, 'listing_top_rated')
+            self._prefetch_next_page(endpoint, params, f"top_rated_{media_type}_page_", page, data)
 
 
 
@@ -529,7 +625,8 @@ class TMDB:
             episode_meta.update({
                 'media_type': 'episode', 'title': ep_title, 'plot': episode.get('overview', ''),
                 'thumb': thumb, 'season': season_number, 'episode': episode_number,
-                'tv_show_title': parent_meta.get('title'), 'rating': episode.get('vote_average', 0.0)
+                'tv_show_title': parent_meta.get('title'), 'rating': episode.get('vote_average', 0.0),
+                'runtime': episode.get('runtime') or 0
             })
 
             context_menu_items = [
@@ -20,7 +20,7 @@ import requests
 from urllib.parse import urlencode
 
 
-from resources.lib.utils import log, popinfo, safe_get, safe_post
+from resources.lib.utils import log, popinfo, safe_get, safe_post, get_session
 
 
 try:
@@ -57,7 +57,7 @@ ADDON = xbmcaddon.Addon()
 API_KEY = ADDON.getSetting('api_key')
 LANGUAGE = ADDON.getSetting('tmdb_language') or 'cs_CZ'
 BASE_URL = 'https://api.themoviedb.org/3'
-SESSION = requests.Session()
+SESSION = get_session()
 
 
 
@@ -18,17 +18,18 @@ import xbmcvfs
 import xbmcaddon
 import xbmcplugin
 
-import os
 import time
 import json
-import requests
+import threading
 import traceback
 
 from datetime import datetime, date
+from requests.exceptions import RequestException
 from urllib.parse import parse_qsl, urlencode, urlparse
 
 
-from resources.lib.utils import get_url, log, popinfo, safe_get, safe_post
+from resources.lib.utils import get_url, log, popinfo, safe_get, safe_post, get_session, conditional_get, start_background, abort_requested
+from resources.lib.cache_store import get_store, migrate_json_dir
 
 
 
@@ -42,13 +43,13 @@ TRAKT_DEVICE_TOKEN_URL = TRAKT_OAUTH_URL + 'device/token'
 
 _CACHE_ROOT = None
 _addon = xbmcaddon.Addon()
-_session = requests.Session()
+_session = get_session()
 _handle = None
-_trakt_cache = {}
 
 
 
 CACHE_TTL_HOURS = int(_addon.getSetting('trakt_cache_ttl') or '24')
+CACHE_MAX_STALE_HOURS = int(_addon.getSetting('cache_max_stale_hours') or '72')
 SHARED_CACHE_PATH = _addon.getSetting('shared_cache_path').strip()
 
 
@@ -73,58 +74,106 @@ def _get_cache_dir():
     return _CACHE_ROOT
 
 
+TRAKT_CACHE_NAMESPACE = 'trakt'
+TRAKT_ID_NAMESPACE = 'trakt_ids'
+_store = None
+
+
+def _cache_store():
+    global _store
+    if _store is None:
+        store = get_store()
+        imported = migrate_json_dir(store, TRAKT_CACHE_NAMESPACE, _get_cache_dir(),
+                                    lambda c: (c['data'], c.get('timestamp', 0), None) if isinstance(c, dict) and set(c) == {'timestamp', 'data'} else None)
+        if imported:
+            log(f"TRAKT - Převedeno {imported} starých cache souborů do databáze", xbmc.LOGINFO)
+        _store = store
+    return _store
+
+
 def save_trakt_cache(cache_name, data):
-    cache_path = os.path.join(_get_cache_dir(), f"{cache_name}.json")
-    try:
-        data_to_save = {'timestamp': time.time(), 'data': data}
-        with xbmcvfs.File(cache_path, 'w') as f:
-            content_to_write = json.dumps(data_to_save, ensure_ascii=False, indent=2)
-            bytes_written = f.write(content_to_write)
-            if bytes_written == 0 and content_to_write:
-                raise IOError(f"Nepodařilo se zapsat data do cache souboru '{cache_name}' (0 bytes zapsáno)")
+    if _cache_store().set(TRAKT_CACHE_NAMESPACE, cache_name, data):
         log(f"TRAKT - Cache '{cache_name}' úspěšně uložena ...", xbmc.LOGINFO)
-    except Exception as e:
-        log(f"TRAKT - Chyba při ukládání cache '{cache_name}': {e}\n{traceback.format_exc()}", xbmc.LOGERROR)
+    else:
+        log(f"TRAKT - Chyba při ukládání cache '{cache_name}'", xbmc.LOGERROR)
 
 
-def load_trakt_cache(cache_name):
-    cache_path = os.path.join(_get_cache_dir(), f"{cache_name}.json")
-    if xbmcvfs.exists(cache_path):
-        try:
-            f = None
-            try:
-                f = xbmcvfs.File(cache_path, 'r')
-                content = f.read()
-                if not content:
-                    return None
-                data = json.loads(content)
-            finally:
-                if f:
-                    f.close()
-            
-            cache_age_seconds = time.time() - data.get('timestamp', 0)
-            if cache_age_seconds < CACHE_TTL_HOURS * 3600:
-                log(f"TRAKT - Používám cachovaná data pro '{cache_name}'.", xbmc.LOGINFO)
-                return data.get('data')
-            else:
-                log(f"TRAKT - Cache pro '{cache_name}' vypršela. Stahuji nová data ...", xbmc.LOGINFO)
-        except Exception as e:
-            log(f"TRAKT - Chyba při načítání cache '{cache_name}': {str(e)}", xbmc.LOGERROR)
-            traceback.print_exc()
-            
+def load_trakt_cache(cache_name, refresh=None):
+
+    """
+    TRAKT :: LOAD CACHE
+    -- Čerstvý záznam  ( CACHE_TTL_HOURS )  se vrátí hned.  S  refresh  ( funkce, která data stáhne a uloží, viz _get_cached )
+    -- se vrátí i prošlý záznam do  CACHE_MAX_STALE_HOURS  a zároveň se obnoví na pozadí.
+    """
+
+    store = _cache_store()
+    entry = store.get_entry(TRAKT_CACHE_NAMESPACE, cache_name)
+    age = time.time() - entry['timestamp'] if entry else None
+    if entry and age < CACHE_TTL_HOURS * 3600:
+        log(f"TRAKT - Používám cachovaná data pro '{cache_name}'.", xbmc.LOGINFO)
+        store.record(TRAKT_CACHE_NAMESPACE, cache_name, 'hits')
+        return entry['data']
+    store.record(TRAKT_CACHE_NAMESPACE, cache_name, 'misses')
+    if entry and refresh and age < CACHE_MAX_STALE_HOURS * 3600:
+        log(f"TRAKT - Prošlá cache '{cache_name}', obnovuji na pozadí", xbmc.LOGINFO)
+        store.record(TRAKT_CACHE_NAMESPACE, cache_name, 'stale_hits')
+        _schedule_refresh(cache_name, refresh)
+        return entry['data']
     return None
 
 
+def _get_cached(cache_name, url, headers):
+
+    """
+    TRAKT :: CONDITIONAL GET
+    -- GET s ETag / Last-Modified uloženými u záznamu cache.  200 = nová data se uloží,  304 = jen se prodlouží platnost.
+    -- Vrátí data, nebo None při chybové odpovědi.
+    """
+
+    response, cached = conditional_get(_session, url, TRAKT_CACHE_NAMESPACE, cache_name, headers=headers, timeout=10)
+    if cached is not None:
+        log(f"TRAKT - '{cache_name}' se nezměnil  ( 304 ),  platnost cache prodloužena", xbmc.LOGINFO)
+        return cached
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    save_trakt_cache(cache_name, data)
+    return data
+
+
+_refreshing = set()
+_refresh_lock = threading.Lock()
+
+
+def _refresh_cache(cache_name, refresh):
+    try:
+        if not abort_requested():
+            refresh()
+    except Exception as e:
+        log(f"TRAKT - Obnova cache '{cache_name}' selhala : {e}", xbmc.LOGWARNING)
+    finally:
+        with _refresh_lock:
+            _refreshing.discard(cache_name)
+
+
+def _schedule_refresh(cache_name, refresh):
+    with _refresh_lock:
+        if cache_name in _refreshing:
+            return
+        _refreshing.add(cache_name)
+    start_background(_refresh_cache, cache_name, refresh, name=f'playto-trakt-{cache_name}')
+
+
 # =======================     CONFIGURE ID     ========================================================================== #
 
 
 def get_tmdb_id(trakt_id, media_type):
 
-    key = f"{media_type}_{trakt_id}_tmdb"
+    key = f"tmdb:{media_type}:{trakt_id}"
+    cached_id = _cache_store().get(TRAKT_ID_NAMESPACE, key)
+    if cached_id is not None:
+        return cached_id
 
-    if key in _trakt_cache:
-        return _trakt_cache[key]
-    
     url = f"https://api.trakt.tv/{media_type}s/{trakt_id}"
 
     try:
@@ -132,24 +181,47 @@ def get_tmdb_id(trakt_id, media_type):
         if response is not None and response.status_code == 200:
             data = response.json()
             tmdb_id = data['ids']['tmdb']
-            _trakt_cache[key] = tmdb_id
+            if tmdb_id is not None:
+                _cache_store().set(TRAKT_ID_NAMESPACE, key, tmdb_id)
             return tmdb_id
         else:
             log(f"TRAKT - Chyba API pro Trakt ID {trakt_id} ({media_type}): {response.status_code if response is not None else 'no response'}", xbmc.LOGERROR)
     except Exception as e:
         log(f"TRAKT - Chyba při hledání TMDB ID pro {trakt_id} ({media_type}): {str(e)}", xbmc.LOGERROR)
-    
-    _trakt_cache[key] = None
 
     return None
 
 
+# --- ID MAP : Trvalá mapa TMDB -> Trakt ID  ( ID se nemění, proto bez TTL )
+# --- Klíče  'movie:<tmdb>',  'show:<tmdb>',  'episode:<tmdb>:<sezóna>:<epizoda>'
+
+
+def get_mapped_trakt_id(key):
+
+    # --- Opakované dotazy v rámci procesu obslouží paměťová vrstva cache_store
+
+    return _cache_store().get(TRAKT_ID_NAMESPACE, key)
+
+
+def set_mapped_trakt_id(key, trakt_id):
+    if _cache_store().get(TRAKT_ID_NAMESPACE, key) == trakt_id:
+        return
+    if not _cache_store().set(TRAKT_ID_NAMESPACE, key, trakt_id):
+        log(f"TRAKT - Chyba při ukládání mapy ID pro '{key}'", xbmc.LOGERROR)
+
+
 def get_trakt_id(tmdb_id, media_type, session, addon):
 
+    map_key = f"{media_type}:{tmdb_id}"
+    mapped_id = get_mapped_trakt_id(map_key)
+    if mapped_id is not None:
+        return mapped_id
+
     cache_key = f"tmdb_to_trakt_id_{media_type}_{tmdb_id}"
     cached_id = load_trakt_cache(cache_key)
 
     if cached_id is not None:
+        set_mapped_trakt_id(map_key, cached_id)
         return cached_id
     
     url = f"https://api.trakt.tv/search/tmdb/{tmdb_id}?type={media_type}"
@@ -160,7 +232,7 @@ def get_trakt_id(tmdb_id, media_type, session, addon):
             data = response.json()
             if data and len(data) > 0:
                 trakt_id = data[0][media_type]['ids']['trakt']
-                save_trakt_cache(cache_key, trakt_id)
+                set_mapped_trakt_id(map_key, trakt_id)
                 return trakt_id
             else:
                 log(f"TRAKT - Žádná data pro TMDB ID {tmdb_id} ({media_type})", xbmc.LOGWARNING)
@@ -172,6 +244,66 @@ def get_trakt_id(tmdb_id, media_type, session, addon):
     return None
 
 
+def scrobble_map_key(meta):
+
+    """
+    TRAKT.TV :: SCROBBLE KEY
+    -- Klíč mapy ID pro metadata přehrávání  ( film / epizoda ),  None pokud metadata nestačí.
+    """
+
+    tmdb_id = meta.get('tmdb_id')
+    media_type = meta.get('media_type', 'movie')
+    if not tmdb_id:
+        return None
+    if media_type == 'movie':
+        return f"movie:{tmdb_id}"
+    if media_type == 'episode':
+        try:
+            return f"episode:{tmdb_id}:{int(meta.get('season'))}:{int(meta.get('episode'))}"
+        except (ValueError, TypeError):
+            return None
+    return None
+
+
+def resolve_scrobble_id(meta, session, addon, network=True):
+
+    """
+    TRAKT.TV :: SCROBBLE ID
+    -- ( trakt_id, 'movie' | 'episode' )  pro metadata přehrávání, jinak  ( None, None )
+    -- Nejdřív trvalá mapa, dotaz na Trakt jen pokud  network=True.  Výsledek se do mapy uloží.
+    """
+
+    map_key = scrobble_map_key(meta)
+    if not map_key:
+        return None, None
+    media_type = map_key.split(':', 1)[0]
+
+    trakt_id = get_mapped_trakt_id(map_key)
+    if trakt_id is not None or not network or abort_requested():
+        return (trakt_id, media_type) if trakt_id is not None else (None, None)
+
+    if media_type == 'movie':
+        trakt_id = get_trakt_id(meta.get('tmdb_id'), 'movie', session, addon)
+    else:
+        show_trakt_id = get_trakt_id(meta.get('tmdb_id'), 'show', session, addon)
+        if not show_trakt_id:
+            log("TRAKT - Selhalo získání show Trakt ID", xbmc.LOGWARNING)
+            return None, None
+        _, _, season, episode = map_key.split(':')
+        episode_url = f"https://api.trakt.tv/shows/{show_trakt_id}/seasons/{season}/episodes/{episode}"
+        try:
+            response = handle_trakt_401(episode_url, addon=addon, session=session, method='GET')
+            if response and response.status_code == 200:
+                trakt_id = response.json()['ids']['trakt']
+                set_mapped_trakt_id(map_key, trakt_id)
+            elif response:
+                log(f"TRAKT - Selhalo získání episode Trakt ID: {response.status_code}, {response.text}", xbmc.LOGWARNING)
+        except Exception as e:
+            log(f"TRAKT - Chyba při zpracování episode Trakt ID: {str(e)}", xbmc.LOGERROR)
+
+    return (trakt_id, media_type) if trakt_id else (None, None)
+
+
 # =======================     LISTS  :  WATCHLISTS     ================================================================== #
 
 
@@ -247,17 +379,17 @@ def trakt_popular_lists(params, addon, handle, session=None):
     try:
         if 'list_id' not in params:
             cache_key = "trakt_popular_lists"
-            lists = load_trakt_cache(cache_key)
+            url = 'https://api.trakt.tv/lists/popular?extended=full'
+
+            def _fetch_lists():
+                return _get_cached(cache_key, url, trakt_get_headers(addon=_addon))
+
+            lists = load_trakt_cache(cache_key, refresh=_fetch_lists)
             if not lists:
-                url = 'https://api.trakt.tv/lists/popular?extended=full'
-                response = _session.get(url, headers=trakt_get_headers(addon=_addon), timeout=10)
-                
-                if response.status_code != 200:
+                lists = _fetch_lists()
+                if lists is None:
                     popinfo("[COLOR red]TRAKT.TV : [/COLOR]Chyba při načítání populárních seznamů", icon=xbmcgui.NOTIFICATION_ERROR)
                     return
-
-                lists = response.json()
-                save_trakt_cache(cache_key, lists)
             
             for item in lists:
                 list_data = item['list']
@@ -280,18 +412,21 @@ def trakt_popular_lists(params, addon, handle, session=None):
 
         list_id = params['list_id']
         cache_key = f"trakt_list_items_{list_id}"
-        items = load_trakt_cache(cache_key)
+        url = f'https://api.trakt.tv/lists/{list_id}/items?extended=full,images'
+
+        def _fetch_items():
+            try:
+                return _get_cached(cache_key, url, trakt_get_headers(addon=_addon))
+            except RequestException as e:
+                log(f"TRAKT - Chyba při načítání položek seznamu : {e}", xbmc.LOGERROR)
+                return None
 
+        items = load_trakt_cache(cache_key, refresh=_fetch_items)
         if not items:
-            url = f'https://api.trakt.tv/lists/{list_id}/items?extended=full,images'
-            response = safe_get(_session, url, headers=trakt_get_headers(addon=_addon), timeout=10)
-            
-            if response is None or response.status_code != 200:
+            items = _fetch_items()
+            if items is None:
                 popinfo("[COLOR red]TRAKT.TV : [/COLOR]Chyba při načítání položek seznamu", icon=xbmcgui.NOTIFICATION_ERROR)
                 return
-
-            items = response.json()
-            save_trakt_cache(cache_key, items)
             
         for item in items:
             media_type = item.get('type')
@@ -573,19 +708,18 @@ def trakt_trending(params, addon, handle, session=None):
 
     category = params.get('category', 'movies')
     cache_key = f"trakt_trending_{category}"
-    items = load_trakt_cache(cache_key)
+    url = f'https://api.trakt.tv/{category}/trending?extended=full,images'
 
-    if not items:
-        url = f'https://api.trakt.tv/{category}/trending?extended=full,images'
-        response = _session.get(url, headers=trakt_get_headers(addon=_addon), timeout=10)
+    def _fetch_trending():
+        return _get_cached(cache_key, url, trakt_get_headers(addon=_addon))
 
-        if response.status_code != 200:
+    items = load_trakt_cache(cache_key, refresh=_fetch_trending)
+    if not items:
+        items = _fetch_trending()
+        if items is None:
             popinfo("[COLOR red]TRAKT.TV : [/COLOR]Chyba při načítání trendů", icon=xbmcgui.NOTIFICATION_ERROR)
             return
 
-        items = response.json()
-        save_trakt_cache(cache_key, items)
-
     media_type = 'movie' if category == 'movies' else 'show'
 
     for item in items:
@@ -721,19 +855,18 @@ def trakt_genres(params, addon, handle, session=None):
 
     if 'genre' not in params:
         cache_key = f"trakt_genres_{category}"
-        genres = load_trakt_cache(cache_key)
+        url = f'https://api.trakt.tv/genres/{category}'
 
-        if not genres:
-            url = f'https://api.trakt.tv/genres/{category}'
-            response = _session.get(url, headers=trakt_get_headers(addon=_addon), timeout=10)
+        def _fetch_genres():
+            return _get_cached(cache_key, url, trakt_get_headers(addon=_addon))
 
-            if response.status_code != 200:
+        genres = load_trakt_cache(cache_key, refresh=_fetch_genres)
+        if not genres:
+            genres = _fetch_genres()
+            if genres is None:
                 popinfo("[COLOR red]TRAKT.TV : [/COLOR]Chyba při načítání žánrů", icon=xbmcgui.NOTIFICATION_ERROR)
                 return
 
-            genres = response.json()
-            save_trakt_cache(cache_key, genres)
-
         for genre in genres:
             title = genre['name']
             slug = genre['slug']
@@ -768,22 +901,21 @@ def trakt_genres(params, addon, handle, session=None):
             year = kb.getText().strip()
 
     cache_key = f"trakt_genre_items_{category}_{genre}_{year}"
-    items = load_trakt_cache(cache_key)
+    query = f'genres={genre}'
+    if year:
+        query += f'&years={year}'
+    url = f'https://api.trakt.tv/{category}/popular?extended=full,images&{query}'
 
-    if not items:
-        query = f'genres={genre}'
-        if year:
-            query += f'&years={year}'
-        url = f'https://api.trakt.tv/{category}/popular?extended=full,images&{query}'
-        response = _session.get(url, headers=trakt_get_headers(addon=_addon), timeout=10)
+    def _fetch_genre_items():
+        return _get_cached(cache_key, url, trakt_get_headers(addon=_addon))
 
-        if response.status_code != 200:
+    items = load_trakt_cache(cache_key, refresh=_fetch_genre_items)
+    if not items:
+        items = _fetch_genre_items()
+        if items is None:
             popinfo("[COLOR red]TRAKT.TV : [/COLOR]Chyba při načítání položek žánru", icon=xbmcgui.NOTIFICATION_ERROR)
             return
 
-        items = response.json()
-        save_trakt_cache(cache_key, items)
-
     for media in items:
         media_id = media['ids']['trakt']
         tmdb_id = media['ids'].get('tmdb')
@@ -1498,14 +1630,11 @@ def list_episodes(params, addon, handle, session=None):
         
         if not ep_data:
             episode_url = f"https://api.trakt.tv/shows/{show_id}/seasons/{season_num}/episodes/{ep_num}?extended=full,images"
-            episode_response = _session.get(episode_url, headers=trakt_get_headers(addon=_addon), timeout=10)
-            
-            if episode_response.status_code != 200:
-                log(f"TRAKT - Chyba při načítání epizody S{season_num}E{ep_num}: {episode_response.status_code}", xbmc.LOGERROR)
+            ep_data = _get_cached(cache_key_ep, episode_url, trakt_get_headers(addon=_addon))
+
+            if ep_data is None:
+                log(f"TRAKT - Chyba při načítání epizody S{season_num}E{ep_num}", xbmc.LOGERROR)
                 continue
-                
-            ep_data = episode_response.json()
-            save_trakt_cache(cache_key_ep, ep_data)
         
         ep_title = ep_data.get('title', 'Neznámý název')
         ep_air_date = ep_data.get('first_aired')
@@ -1955,6 +2084,15 @@ class KodiPlayerMonitor(xbmc.Player):
             new_trakt_id = query_params.get('trakt_id')
             new_media_type = query_params.get('media_type')
 
+            # --- MONITOR : Trakt ID nebylo při resolve k dispozici, mezitím ho mohlo do mapy uložit vlákno z resolve  ( bez sítě )
+
+            if not new_trakt_id and query_params.get('playback_meta'):
+                try:
+                    new_trakt_id, new_media_type = resolve_scrobble_id(json.loads(query_params['playback_meta']), self.session, self.addon, network=False)
+                    new_trakt_id = str(new_trakt_id) if new_trakt_id else None
+                except Exception as e:
+                    log(f"MONITOR - Chyba při dohledání Trakt ID : {e}", xbmc.LOGERROR)
+
             if not new_trakt_id or not new_media_type:
                 log("MONITOR - Chybí 'trakt_id' nebo 'media_type' v URL. Nelze scrobblovat.", xbmc.LOGWARNING)
                 return
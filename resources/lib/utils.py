@@ -18,12 +18,17 @@ import xbmcaddon
 
 import re
 import math
-import unicodedata
+import time
+import random
+import threading
 
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
+from resources.lib.release_parser import parse_release, strip_accents
+
 
 
 
@@ -88,12 +93,58 @@ def popinfo(message, title="[B][COLOR orange]| PLAY.TO |[/COLOR][/B]", time=5000
 
 
 def encode(string):
-    line = unicodedata.normalize('NFKD', string)
-    output = ''
-    for c in line:
-        if not unicodedata.combining(c):
-            output += c
-    return output
+    return strip_accents(string)
+
+
+
+# --- BACKGROUND : Vlákna na pozadí  ( obnova cache, předběžné řešení, úklid )
+
+BACKGROUND_JOIN_TIMEOUT = 1     # --- Sekundy, déle konec routeru nečeká  ( reuselanguageinvoker : vlákna doběhnou i po návratu )
+
+_background_threads = []
+_background_lock = threading.Lock()
+
+
+def start_background(target, *args, name=None):
+
+    """
+    UTILS :: BACKGROUND THREAD
+    -- Spustí daemon vlákno a zapamatuje si ho, konec routeru na něj počká nejvýš  BACKGROUND_JOIN_TIMEOUT  ( join_background ).
+    -- Dlouhé úlohy mají mezi kroky kontrolovat  abort_requested().
+    """
+
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    with _background_lock:
+        _background_threads[:] = [t for t in _background_threads if t.is_alive()]
+        _background_threads.append(thread)
+    thread.start()
+    return thread
+
+
+def abort_requested():
+    return xbmc.Monitor().abortRequested()
+
+
+def join_background(timeout=BACKGROUND_JOIN_TIMEOUT):
+
+    """
+    UTILS :: JOIN BACKGROUND
+    -- Počká na běžící vlákna na pozadí nejvýš  timeout  sekund celkem, při ukončování Kodi hned skončí.
+    -- Nedokončená vlákna se opouštějí  ( daemon ),  výpis na spekulativní stahování nečeká.
+    """
+
+    with _background_lock:
+        threads = list(_background_threads)
+    monitor = xbmc.Monitor()
+    deadline = time.time() + timeout
+    for thread in threads:
+        while thread.is_alive() and time.time() < deadline:
+            if monitor.waitForAbort(0.1):
+                return
+            thread.join(0.1)
+    alive = [t.name for t in threads if t.is_alive()]
+    if alive:
+        log(f"BACKGROUND - Vlákna po {timeout} s stále běží, doběhnou na pozadí : {alive}", xbmc.LOGDEBUG)
 
 
 
@@ -140,16 +191,85 @@ def duration_to_seconds(duration_str):
 # ----------------------
 DEFAULT_HTTP_TIMEOUT = 15
 
+HTTP_POOL_HOSTS = 10            # --- Počet hostů s vlastním poolem spojení
+HTTP_POOL_MAXSIZE = 8           # --- Keep-alive spojení na jeden host
+HTTP_HOST_CONCURRENCY = 6       # --- Maximum souběžných požadavků na jeden host
+HTTP_RETRY_STATUS = (429, 500, 502, 503, 504)
+HTTP_RETRY_ATTEMPTS = 2
+HTTP_RETRY_BACKOFF = 0.5        # --- Základ prodlevy v sekundách  ( exponenciálně, s náhodným rozptylem )
+HTTP_RETRY_AFTER_MAX = 10
+
+_IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class PooledSession(requests.Session):
+
+    """
+    HTTP :: POOLED SESSION
+    -- Jedna sdílená session pro všechny moduly  ( keep-alive se opravdu znovu používá )
+    -- Pool spojení na host, limit souběžných požadavků na host,
+    -- opakování při 429 / 5xx s náhodně rozptýlenou prodlevou  ( POST jen při 429 )
+    """
+
+    def __init__(self):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc.lower()
+        with self._host_lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = self._host_limits[host] = threading.BoundedSemaphore(HTTP_HOST_CONCURRENCY)
+            return semaphore
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(int(retry_after), HTTP_RETRY_AFTER_MAX)
+        return HTTP_RETRY_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def request(self, method, url, *args, **kwargs):
+        semaphore = self._host_semaphore(url)
+        retry_statuses = HTTP_RETRY_STATUS if method.upper() in _IDEMPOTENT_METHODS else (429,)
+        attempt = 0
+        while True:
+            with semaphore:
+                response = super().request(method, url, *args, **kwargs)
+            if response.status_code not in retry_statuses or attempt >= HTTP_RETRY_ATTEMPTS:
+                return response
+            delay = self._retry_delay(response, attempt)
+            log(f"HTTP - {response.status_code} pro {url}, opakuji za {delay:.1f}s ({attempt + 1}/{HTTP_RETRY_ATTEMPTS})", xbmc.LOGWARNING)
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def get_session():
+    global _http_session
+    with _http_session_lock:
+        if _http_session is None:
+            _http_session = PooledSession()
+        return _http_session
+
 
 def safe_get(session_or_url, url=None, timeout=None, **kwargs):
     """Safe GET helper. Accepts either (session, url) or (url) where session_or_url is requests.Session or a URL string.
-    Returns Response or None on error.
+    A bare URL goes through the shared pooled session. Returns Response or None on error.
     """
     _timeout = timeout or DEFAULT_HTTP_TIMEOUT
     try:
         if url is None:
             # called as safe_get(url=..., ...)
-            resp = requests.get(session_or_url, timeout=_timeout, **kwargs)
+            resp = get_session().get(session_or_url, timeout=_timeout, **kwargs)
         else:
             session = session_or_url
             resp = session.get(url, timeout=_timeout, **kwargs)
@@ -163,14 +283,34 @@ def safe_get(session_or_url, url=None, timeout=None, **kwargs):
         return None
 
 
+def conditional_get(session, url, namespace, key, headers=None, **kwargs):
+    """Conditional GET for a cached response. Sends If-None-Match / If-Modified-Since stored with the cache
+    entry (namespace, key) and returns (response, data). On 304 the entry is only touched (TTL extended) and its
+    data is returned, otherwise data is None and the caller parses and saves the body as before.
+    Validators of a 200 response are remembered for the next refresh. Network errors propagate like session.get.
+    """
+    from resources.lib.cache_store import get_store
+
+    store = get_store()
+    entry, validators = store.validators(namespace, key)
+    resp = session.get(url, headers={**(headers or {}), **validators}, **kwargs)
+    if resp.status_code == 304 and entry is not None:
+        store.touch(namespace, key)
+        log(f"HTTP 304 Not Modified, cache '{namespace}:{key}' prodloužena", level=xbmc.LOGDEBUG)
+        return resp, entry['data']
+    if resp.status_code == 200:
+        store.save_validators(namespace, key, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+    return resp, None
+
+
 def safe_post(session_or_url, url=None, timeout=None, **kwargs):
     """Safe POST helper. Accepts either (session, url) or (url) where session_or_url is requests.Session or a URL string.
-    Returns Response or None on error.
+    A bare URL goes through the shared pooled session. Returns Response or None on error.
     """
     _timeout = timeout or DEFAULT_HTTP_TIMEOUT
     try:
         if url is None:
-            resp = requests.post(session_or_url, timeout=_timeout, **kwargs)
+            resp = get_session().post(session_or_url, timeout=_timeout, **kwargs)
         else:
             session = session_or_url
             resp = session.post(url, timeout=_timeout, **kwargs)
@@ -195,53 +335,10 @@ def clean_title_for_tmdb(title):
     log(f"UTILS CLEAN - VSTUP : '{title}'", level=xbmc.LOGINFO)
 
 
-    search_title = title
-
-
-    # --- normalizace znaků a odstranění diakritiky
-
-    search_title = search_title.replace('_', ' ').replace('.', ' ').replace('+', ' ')
-    search_title = encode(search_title)
-
-
-    # --- extrakce sezóny a epizody SxxExx nebo rozsah S01E02-08
-
-    season = None
-    episode = None
-    ep_end = None
-    ep_match = re.search(r'\b[Ss](\d{1,2})[Ee](\d{1,2})(?:-(\d{1,2}))?\b', search_title)
-    if ep_match:
-        season = int(ep_match.group(1))
-        episode = int(ep_match.group(2))
-        ep_end = int(ep_match.group(3)) if ep_match.group(3) else None
-        search_title = re.sub(re.escape(ep_match.group(0)), '', search_title, flags=re.IGNORECASE)
-
-
-    # --- extrakce roku (19xx, 20xx) pokud je na konci nebo před SxxExx
-
-    year_match = re.search(r'\b(19[89]\d|20\d\d)\b', search_title)
-    year = year_match.group(1) if year_match else None
-    if year:
-        search_title = re.sub(r'\b' + year + r'\b', '', search_title)
-
-
-    # --- odstranění “junk slov”
-
-    junk_words = [
-        'cz', 'czdab', 'dab', 'dabing', 'czaudio', 'dd', 'hevc',
-        '1080p', '720p', '2160p', '4k', 'hd', 'fullhd', 'ultra hd', 'uhd',
-        'topkvalita', 'web-dl', 'webrip', 'bluray', 'dvdrip',
-        'final', 'komplet', 'x264', 'x265', 'amzn'
-    ]
-    pattern = r'\b(?:' + '|'.join(junk_words) + r')\b'
-    search_title = re.sub(pattern, '', search_title, flags=re.IGNORECASE)
-
-
-    # --- odstranění závorek a vícenásobných mezer
-
-    search_title = re.sub(r'[\(\[\{].*?[\)\]\}]', '', search_title)
-    search_title = re.sub(r'\s+', ' ', search_title).strip()
+    # --- rozbor názvu sdíleným parserem  ( normalizace, SxxExx / 1x01 / rozsah, rok, junk slova, závorky )
 
+    release = parse_release(title)
+    search_title, year, season, episode, ep_end = release.title, release.year, release.season, release.episode, release.episode_end
 
 
     log(f"UTILS CLEAN - VÝSTUP : '{search_title}', ROK : '{year}', SEZÓNA : '{season}', EPIZODA : '{episode}', EP_END : '{ep_end}'", level=xbmc.LOGINFO)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+# --- TESTS : Čisté moduly bez Kodi  ( release_parser, cards, stream_parser ),  spuštění :  python -m pytest tests
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'resources', 'fixtures')
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from conftest import FIXTURES
+from resources.lib.cards import VideoCard, parse_cards, parse_search_page, has_next_page, _parse_cards_soup
+
+
+def _page():
+    with open(os.path.join(FIXTURES, 'search_page.html'), 'rb') as f:
+        return f.read()
+
+
+def test_search_page():
+    cards, has_next = parse_search_page(_page())
+    assert has_next
+    assert cards == [
+        VideoCard('Matrix (1999) 1080p CZ dabing', '/matrix-1999-1080p-cz-dabing/5a1b2c3d4e5f6', '4.37 GB', '02:16:17'),
+        VideoCard('Matrix Reloaded (2003) 720p & titulky', '/matrix-reloaded-2003-720p/6b2c3d4e5f607', '1.9 GB', '02:18:04'),
+        VideoCard('Matrix trailer', '/matrix-trailer/7c3d4e5f60718', '', ''),
+    ]
+
+
+def test_bytes_and_str_give_same_cards():
+    page = _page()
+    assert parse_cards(page) == parse_cards(page.decode('utf-8'))
+
+
+def test_fast_path_matches_soup_fallback():
+    text = _page().decode('utf-8')
+    fast = parse_cards(text)
+    soup = _parse_cards_soup(text)
+    assert [(c.href, c.size, c.duration) for c in fast] == [(c.href, c.size, c.duration) for c in soup]
+    assert [c.title.split() for c in fast] == [c.title.split() for c in soup]
+
+
+def test_last_page_and_empty_input():
+    assert not has_next_page('<a class="button" href="/x">Předchozí</a>')
+    assert parse_cards(None) == []
+    assert parse_search_page(b'') == ([], False)
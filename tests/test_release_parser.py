@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from conftest import FIXTURES
+from resources.lib.release_parser import parse_release, parse_releases, detect_quality
+
+
+def _corpus():
+    rows = []
+    with open(os.path.join(FIXTURES, 'release_names.tsv'), encoding='utf-8') as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                rows.append(tuple((line.rstrip('\n').split('\t') + ['', '', ''])[:4]))
+    return rows
+
+
+CORPUS = _corpus()
+
+
+def test_corpus_is_not_empty():
+    assert len(CORPUS) > 10
+
+
+@pytest.mark.parametrize('name, season, episode, quality', CORPUS, ids=[row[0] for row in CORPUS])
+def test_corpus(name, season, episode, quality):
+    r = parse_release(name)
+    assert (r.season, r.episode, r.quality) == (int(season) if season else None, int(episode) if episode else None, quality)
+
+
+def test_batch_matches_single():
+    names = [row[0] for row in CORPUS]
+    assert parse_releases(names) == [parse_release(name) for name in names]
+
+
+def test_hd_inside_word_is_not_quality():
+    assert detect_quality('shadow hunters cz dabing') == ''
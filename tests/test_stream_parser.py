@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from resources.lib.stream_parser import (
+    StreamSource, SubtitleTrack, JSLiteralError, parse_js_literal, parse_sources, parse_tracks, parse_player_config
+)
+
+
+PAGE = '''<html><body>
+<script>
+    var sources = [
+        { file: "https://cdn.example/v/1080.mp4?token=a&expires=1", label: '1080p', type: "video/mp4", },
+        { src: 'https://cdn.example/v/720.mp4', res: 720 },   // druhá kvalita
+        { label: "bez URL" },
+    ];
+    var tracks = [
+        /* titulky */
+        { src: "https://cdn.example/s/cz.vtt", label: "Čeština", srclang: 'cs', kind: "captions", },
+        { file: "https://cdn.example/s/en.vtt", label: "English" },
+    ];
+    var player = jwplayer("player").setup({ sources: sources });
+</script>
+</body></html>'''
+
+
+def test_unquoted_keys_and_trailing_commas():
+    value, end = parse_js_literal("{ file: 'a', 'label': \"b\", n: 1.5, ok: true, none: null, list: [1, 2,], }")
+    assert value == {'file': 'a', 'label': 'b', 'n': 1.5, 'ok': True, 'none': None, 'list': [1, 2]}
+    assert end > 0
+
+
+def test_unknown_expressions_become_none():
+    value, _ = parse_js_literal('{ file: getUrl("x", [1, 2]), label: "HD" }')
+    assert value == {'file': None, 'label': 'HD'}
+
+
+def test_string_escapes():
+    value, _ = parse_js_literal(r'["a\"b", "čeština", "c\/d"]')
+    assert value == ['a"b', 'čeština', 'c/d']
+
+
+def test_unterminated_literal_raises():
+    with pytest.raises(JSLiteralError):
+        parse_js_literal('[{ file: "x" ')
+
+
+def test_sources():
+    assert parse_sources(PAGE) == [
+        StreamSource('https://cdn.example/v/1080.mp4?token=a&expires=1', '1080p', 'video/mp4'),
+        StreamSource('https://cdn.example/v/720.mp4', '720', ''),
+    ]
+
+
+def test_tracks():
+    assert parse_tracks(PAGE.encode('utf-8')) == [
+        SubtitleTrack('https://cdn.example/s/cz.vtt', 'Čeština', 'cs', 'captions'),
+        SubtitleTrack('https://cdn.example/s/en.vtt', 'English', '', 'captions'),
+    ]
+
+
+def test_unreadable_sources_fall_back_to_first_url():
+    page = '<script>var sources = [{ file: "https://cdn.example/v.mp4", label: </script>'
+    assert parse_sources(page) == [StreamSource('https://cdn.example/v.mp4', '', '')]
+
+
+def test_page_without_player():
+    assert parse_player_config('<html><body>Video bylo smazáno</body></html>') == ([], [])